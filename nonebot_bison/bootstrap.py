@@ -1,10 +1,18 @@
+from nonebot import get_driver
 from nonebot.log import logger
+from nonebot_plugin_apscheduler import scheduler
 from nonebot_plugin_datastore.db import get_engine, post_db_init, pre_db_init
 from sqlalchemy import inspect, text
 
 from .config.config_legacy import start_up as legacy_db_startup
 from .config.db_migration import data_migrate
+from .platform.state_store import flush_platform_states, load_platform_states
+from .plugin_config import plugin_config
 from .scheduler.manager import init_scheduler
+from .send import flush_pending_msgs, load_pending_msgs, restore_pending_msgs
+from .utils.cookie_pool import flush_cookie_pools
+from .utils.http import close_shared_transports
+from .utils.page_pool import page_pool
 
 
 @pre_db_init
@@ -44,6 +52,49 @@ async def post():
     legacy_db_startup()
     # migrate data
     await data_migrate()
+    # 恢复平台抓取状态
+    await load_platform_states()
+    scheduler.add_job(
+        flush_platform_states,
+        "interval",
+        seconds=plugin_config.bison_state_flush_interval,
+        id="bison_platform_state_flush",
+        replace_existing=True,
+    )
+    # 定期写回 cookie 的使用记录
+    scheduler.add_job(
+        flush_cookie_pools,
+        "interval",
+        seconds=plugin_config.bison_cookie_flush_interval,
+        id="bison_cookie_pool_flush",
+        replace_existing=True,
+    )
+    # 读取上次关闭时未发出的消息，并定期保存发送队列
+    await load_pending_msgs()
+    scheduler.add_job(
+        flush_pending_msgs,
+        "interval",
+        seconds=plugin_config.bison_send_queue_flush_interval,
+        id="bison_send_queue_flush",
+        replace_existing=True,
+    )
     # init scheduler
     await init_scheduler()
     logger.info("nonebot-bison bootstrap done")
+
+
+@get_driver().on_bot_connect
+async def restore_send_queue():
+    # 待发送的消息在第一个 bot 连接后放回队列
+    restore_pending_msgs()
+
+
+@get_driver().on_shutdown
+async def shutdown():
+    await flush_pending_msgs()
+    await flush_platform_states()
+    await flush_cookie_pools()
+    # 关闭复用的浏览器页面
+    await page_pool.close()
+    # 关闭共享连接池
+    await close_shared_transports()
@@ -2,20 +2,35 @@ import asyncio
 from collections import defaultdict
 from collections.abc import Awaitable, Callable, Sequence
 from datetime import datetime, time
+from typing import Any
 
 from nonebot.compat import model_dump
 from nonebot_plugin_datastore import create_session
 from nonebot_plugin_saa import PlatformTarget
-from sqlalchemy import delete, func, select
+from sqlalchemy import delete, func, select, tuple_, update
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import selectinload
 
+from nonebot_bison.plugin_config import plugin_config
 from nonebot_bison.types import Category, PlatformWeightConfigResp, Tag, TimeWeightConfig, UserSubInfo, WeightConfig
 from nonebot_bison.types import Target as T_Target
 
-from .db_model import Cookie, CookieTarget, ScheduleTimeWeight, Subscribe, Target, User
+from .db_model import (
+    Cookie,
+    CookieTarget,
+    PendingMessage,
+    PlatformState,
+    ScheduleTimeWeight,
+    Subscribe,
+    Target,
+    User,
+)
+from .subscriber_index import SubscriberIndex
 from .utils import DuplicateCookieTargetException, NoSuchTargetException
 
+# 每次查询的 (state_key, target) 数量上限
+_STATE_QUERY_BATCH = 400
+
 
 def _get_time():
     dt = datetime.now()
@@ -30,6 +45,9 @@ class DBConfig:
     def __init__(self):
         self.add_target_hook: list[Callable[[str, T_Target], Awaitable]] = []
         self.delete_target_hook: list[Callable[[str, T_Target], Awaitable]] = []
+        self.update_weight_hook: list[Callable[[str, T_Target], Awaitable]] = []
+        self.cookie_change_hook: list[Callable[[], Awaitable]] = []
+        self.subscriber_index = SubscriberIndex()
 
     def register_add_target_hook(self, fun: Callable[[str, T_Target], Awaitable]):
         self.add_target_hook.append(fun)
@@ -37,6 +55,15 @@ class DBConfig:
     def register_delete_target_hook(self, fun: Callable[[str, T_Target], Awaitable]):
         self.delete_target_hook.append(fun)
 
+    def register_update_weight_hook(self, fun: Callable[[str, T_Target], Awaitable]):
+        self.update_weight_hook.append(fun)
+
+    def register_cookie_change_hook(self, fun: Callable[[], Awaitable]):
+        self.cookie_change_hook.append(fun)
+
+    async def _run_cookie_change_hook(self):
+        await asyncio.gather(*[hook() for hook in self.cookie_change_hook])
+
     async def add_subscribe(
         self,
         user: PlatformTarget,
@@ -54,9 +81,9 @@ class DBConfig:
                 session.add(db_user)
             db_target_stmt = select(Target).where(Target.platform_name == platform_name).where(Target.target == target)
             db_target: Target | None = await session.scalar(db_target_stmt)
+            new_target = not db_target
             if not db_target:
                 db_target = Target(target=target, platform_name=platform_name, target_name=target_name)
-                await asyncio.gather(*[hook(platform_name, target) for hook in self.add_target_hook])
             else:
                 db_target.target_name = target_name
             subscribe = Subscribe(
@@ -72,6 +99,11 @@ class DBConfig:
                 if len(e.args) > 0 and "UNIQUE constraint failed" in e.args[0]:
                     raise SubscribeDupException()
                 raise e
+        # 提交后再通知，hook 中重新读取数据库时能读到新的 target
+        if new_target:
+            await asyncio.gather(*[hook(platform_name, target) for hook in self.add_target_hook])
+        if self.subscriber_index.loaded:
+            self.subscriber_index.upsert(platform_name, target, UserSubInfo(user, cats, tags))
 
     async def list_subscribe(self, user: PlatformTarget) -> Sequence[Subscribe]:
         async with create_session() as session:
@@ -104,10 +136,11 @@ class DBConfig:
             target_count = await session.scalar(
                 select(func.count()).select_from(Subscribe).where(Subscribe.target == target_obj)
             )
-            if target_count == 0:
-                # delete empty target
-                await asyncio.gather(*[hook(platform_name, T_Target(target)) for hook in self.delete_target_hook])
             await session.commit()
+        if target_count == 0:
+            # delete empty target
+            await asyncio.gather(*[hook(platform_name, T_Target(target)) for hook in self.delete_target_hook])
+        self.subscriber_index.remove(platform_name, T_Target(target), user)
 
     async def update_subscribe(
         self,
@@ -134,6 +167,8 @@ class DBConfig:
             subscribe_obj.categories = cats  # type:ignore
             subscribe_obj.target.target_name = target_name
             await sess.commit()
+        if self.subscriber_index.loaded:
+            self.subscriber_index.upsert(platform_name, T_Target(target), UserSubInfo(user, cats, tags))
 
     async def get_platform_target(self, platform_name: str) -> Sequence[Target]:
         async with create_session() as sess:
@@ -187,6 +222,7 @@ class DBConfig:
                 sess.add(new_conf)
 
             await sess.commit()
+        await asyncio.gather(*[hook(platform_name, target) for hook in self.update_weight_hook])
 
     async def get_current_weight_val(self, platform_list: list[str]) -> dict[str, int]:
         res = {}
@@ -209,23 +245,48 @@ class DBConfig:
                 res[key] = weight
         return res
 
+    async def refresh_subscriber_index(self):
+        """使用一次查询重新构建订阅者索引"""
+        async with create_session() as sess:
+            query = select(Target.platform_name, Target.target, User.user_target, Subscribe.categories, Subscribe.tags)
+            query = query.select_from(Subscribe).join(Target).join(User)
+            rows = (await sess.execute(query)).all()
+        self.subscriber_index.load(
+            (
+                platform_name,
+                T_Target(target),
+                UserSubInfo(PlatformTarget.deserialize(user_target), categories, tags),
+            )
+            for platform_name, target, user_target, categories, tags in rows
+        )
+
     async def get_platform_target_subscribers(self, platform_name: str, target: T_Target) -> list[UserSubInfo]:
+        return (await self.get_platform_targets_subscribers(platform_name, [target]))[target]
+
+    async def get_platform_targets_subscribers(
+        self, platform_name: str, targets: list[T_Target]
+    ) -> dict[T_Target, list[UserSubInfo]]:
+        """批量获取同一平台多个 target 的订阅者
+
+        启用订阅者缓存时从内存读取，否则使用一次 IN 查询
+        """
+        if plugin_config.bison_subscriber_cache:
+            if not self.subscriber_index.loaded:
+                await self.refresh_subscriber_index()
+            return {target: self.subscriber_index.get(platform_name, target) for target in targets}
+
+        res: dict[T_Target, list[UserSubInfo]] = {target: [] for target in targets}
         async with create_session() as sess:
             query = (
-                select(Subscribe)
+                select(Target.target, User.user_target, Subscribe.categories, Subscribe.tags)
+                .select_from(Subscribe)
                 .join(Target)
-                .where(Target.platform_name == platform_name, Target.target == target)
-                .options(selectinload(Subscribe.user))
+                .join(User)
+                .where(Target.platform_name == platform_name, Target.target.in_(targets))
             )
-            subsribes = (await sess.scalars(query)).all()
-            return [
-                UserSubInfo(
-                    PlatformTarget.deserialize(subscribe.user.user_target),
-                    subscribe.categories,
-                    subscribe.tags,
-                )
-                for subscribe in subsribes
-            ]
+            for target, user_target, categories, tags in await sess.execute(query):
+                res[T_Target(target)].append(UserSubInfo(PlatformTarget.deserialize(user_target), categories, tags))
+        return res
 
     async def get_all_weight_config(
         self,
@@ -297,7 +358,8 @@ class DBConfig:
             sess.add(cookie)
             await sess.commit()
             await sess.refresh(cookie)
-            return cookie.id
+        await self._run_cookie_change_hook()
+        return cookie.id
 
     async def update_cookie(self, cookie: Cookie):
         async with create_session() as sess:
@@ -310,6 +372,20 @@ class DBConfig:
             cookie_in_db.status = cookie.status
             cookie_in_db.tags = cookie.tags
             await sess.commit()
+        await self._run_cookie_change_hook()
+
+    async def update_cookies_usage(self, usages: Sequence[tuple[int, datetime, str]]):
+        """批量写回 cookie 的使用记录 (cookie_id, last_usage, status)，不触发 cookie 变更的 hook"""
+        if not usages:
+            return
+        async with create_session() as sess:
+            cookies = await sess.scalars(select(Cookie).where(Cookie.id.in_([cookie_id for cookie_id, _, _ in usages])))
+            cookie_map = {cookie.id: cookie for cookie in cookies}
+            for cookie_id, last_usage, status in usages:
+                if cookie := cookie_map.get(cookie_id):
+                    cookie.last_usage = last_usage
+                    cookie.status = status
+            await sess.commit()
 
     async def delete_cookie_by_id(self, cookie_id: int):
         async with create_session() as sess:
@@ -325,6 +401,7 @@ class DBConfig:
                 raise Exception(f"cookie {cookie.id} in use")
             await sess.execute(delete(Cookie).where(Cookie.id == cookie_id))
             await sess.commit()
+        await self._run_cookie_change_hook()
 
     async def add_cookie_target(self, target: T_Target, platform_name: str, cookie_id: int):
         """通过 cookie_id 可以唯一确定一个 Cookie，通过 target 和 platform_name 可以唯一确定一个 Target"""
@@ -342,6 +419,7 @@ class DBConfig:
             cookie_target = CookieTarget(target=target_obj, cookie=cookie_obj)
             sess.add(cookie_target)
             await sess.commit()
+        await self._run_cookie_change_hook()
 
     async def delete_cookie_target(self, target: T_Target, platform_name: str, cookie_id: int):
         async with create_session() as sess:
@@ -353,11 +431,27 @@ class DBConfig:
                 delete(CookieTarget).where(CookieTarget.target == target_obj, CookieTarget.cookie == cookie_obj)
             )
             await sess.commit()
+        await self._run_cookie_change_hook()
 
     async def delete_cookie_target_by_id(self, cookie_target_id: int):
         async with create_session() as sess:
             await sess.execute(delete(CookieTarget).where(CookieTarget.id == cookie_target_id))
             await sess.commit()
+        await self._run_cookie_change_hook()
+
+    async def get_site_cookie_targets(self, site_name: str) -> dict[T_Target, set[int]]:
+        """获取某个 Site 下每个 target 关联的 cookie id"""
+        async with create_session() as sess:
+            query = (
+                select(Target.target, CookieTarget.cookie_id)
+                .join(CookieTarget.target)
+                .join(CookieTarget.cookie)
+                .where(Cookie.site_name == site_name)
+            )
+            res: dict[T_Target, set[int]] = {}
+            for target, cookie_id in await sess.execute(query):
+                res.setdefault(T_Target(target), set()).add(cookie_id)
+            return res
 
     async def get_cookie_target(self) -> list[CookieTarget]:
         async with create_session() as sess:
@@ -372,6 +466,78 @@ class DBConfig:
             res.sort(key=lambda x: (x.target.platform_name, x.cookie_id, x.target_id))
             return res
 
+    async def get_all_platform_state(self) -> dict[tuple[str, T_Target], Any]:
+        """一次性读取所有平台抓取状态，key 为 (state_key, target)"""
+        async with create_session() as sess:
+            states = await sess.scalars(select(PlatformState))
+            return {(state.state_key, T_Target(state.target)): state.data for state in states}
+
+    async def save_platform_state(self, states: dict[tuple[str, T_Target], Any]):
+        """批量写入平台抓取状态，已存在的记录会被覆盖"""
+        if not states:
+            return
+        async with create_session() as sess:
+            keys = list(states)
+            existing_map: dict[tuple[str, str], PlatformState] = {}
+            # 只查询本次写入的 (state_key, target)，分批避免超出数据库的参数数量限制
+            for i in range(0, len(keys), _STATE_QUERY_BATCH):
+                batch = keys[i : i + _STATE_QUERY_BATCH]
+                existing = await sess.scalars(
+                    select(PlatformState).where(tuple_(PlatformState.state_key, PlatformState.target).in_(batch))
+                )
+                existing_map.update({(state.state_key, state.target): state for state in existing})
+            for (state_key, target), data in states.items():
+                if state := existing_map.get((state_key, target)):
+                    state.data = data
+                else:
+                    sess.add(PlatformState(state_key=state_key, target=target, data=data))
+            await sess.commit()
+
+    async def save_pending_messages(
+        self, new: list[tuple[Any, list[PlatformTarget], int]], updated: dict[int, list[PlatformTarget]]
+    ) -> list[int]:
+        """批量写入发送队列
+
+        `new` 为新消息 (序列化后的消息, 发送对象, 重试次数)，按顺序返回其 id；
+        `updated` 为已保存消息 id 到剩余发送对象的映射，剩余为空时删除
+        """
+        async with create_session() as sess:
+            pendings = [
+                PendingMessage(message=message, user_targets=[model_dump(user) for user in users], retry_times=retry)
+                for message, users, retry in new
+            ]
+            sess.add_all(pendings)
+            if finished := [pending_id for pending_id, users in updated.items() if not users]:
+                await sess.execute(delete(PendingMessage).where(PendingMessage.id.in_(finished)))
+            for pending_id, users in updated.items():
+                if users:
+                    await sess.execute(
+                        update(PendingMessage)
+                        .where(PendingMessage.id == pending_id)
+                        .values(user_targets=[model_dump(user) for user in users])
+                    )
+            await sess.flush()
+            pending_ids = [pending.id for pending in pendings]
+            await sess.commit()
+            return pending_ids
+
+    async def get_pending_messages(
+        self, after_id: int = 0, limit: int | None = None
+    ) -> list[tuple[int, list[PlatformTarget], Any, int]]:
+        """按保存顺序分页获取 id 大于 `after_id` 的待发送消息 (id, 剩余的发送对象, 序列化后的消息, 重试次数)"""
+        async with create_session() as sess:
+            query = select(PendingMessage).where(PendingMessage.id > after_id).order_by(PendingMessage.id).limit(limit)
+            messages = (await sess.scalars(query)).all()
+            return [
+                (
+                    message.id,
+                    [PlatformTarget.deserialize(user) for user in message.user_targets],
+                    message.message,
+                    message.retry_times,
+                )
+                for message in messages
+            ]
+
     async def clear_db(self):
         """清空数据库，用于单元测试清理环境"""
         async with create_session() as sess:
@@ -381,7 +547,11 @@ class DBConfig:
             await sess.execute(delete(Subscribe))
             await sess.execute(delete(Cookie))
             await sess.execute(delete(CookieTarget))
+            await sess.execute(delete(PlatformState))
+            await sess.execute(delete(PendingMessage))
             await sess.commit()
+        self.subscriber_index.invalidate()
+        await self._run_cookie_change_hook()
 
 
 config = DBConfig()
@@ -107,3 +107,25 @@ class CookieTarget(Model):
 
     target: Mapped[Target] = relationship(back_populates="cookies")
     cookie: Mapped[Cookie] = relationship(back_populates="targets")
+
+
+class PlatformState(Model):
+    """平台抓取状态，如 NewMessage 已推送的 post id、StatusChange 上一次的状态"""
+
+    __table_args__ = (UniqueConstraint("state_key", "target", name="unique-platform-state-constraint"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    # 形如 `platform_name:ClassName`，同一 platform_name 下可能有多个平台类
+    state_key: Mapped[str] = mapped_column(String(100))
+    target: Mapped[str] = mapped_column(String(1024))
+    data: Mapped[Any] = mapped_column(JSON().with_variant(JSONB, "postgresql"), nullable=True)
+
+
+class PendingMessage(Model):
+    """发送队列中尚未发出的消息，同一条消息的所有发送对象共用一条记录，全部发出后删除，启动时恢复到队列"""
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    # 尚未发出的发送对象列表
+    user_targets: Mapped[list] = mapped_column(JSON().with_variant(JSONB, "postgresql"))
+    message: Mapped[Any] = mapped_column(JSON().with_variant(JSONB, "postgresql"))
+    retry_times: Mapped[int] = mapped_column(default=0)
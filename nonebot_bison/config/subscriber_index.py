@@ -0,0 +1,50 @@
+from collections import defaultdict
+from collections.abc import Iterable
+
+from nonebot_plugin_saa import PlatformTarget
+
+from nonebot_bison.types import Target as T_Target
+from nonebot_bison.types import UserSubInfo
+
+IndexKey = tuple[str, T_Target]
+
+
+class SubscriberIndex:
+    """(platform_name, target) 到订阅者的内存索引
+
+    由 `DBConfig` 在订阅增删改成功提交后同步更新，调度时直接从内存读取订阅者
+    """
+
+    def __init__(self):
+        self._index: defaultdict[IndexKey, list[UserSubInfo]] = defaultdict(list)
+        self.loaded = False
+
+    def load(self, items: Iterable[tuple[str, T_Target, UserSubInfo]]):
+        self._index.clear()
+        for platform_name, target, sub_info in items:
+            self._index[platform_name, target].append(sub_info)
+        self.loaded = True
+
+    def invalidate(self):
+        self._index.clear()
+        self.loaded = False
+
+    def get(self, platform_name: str, target: T_Target) -> list[UserSubInfo]:
+        if (sub_infos := self._index.get((platform_name, target))) is None:
+            return []
+        return list(sub_infos)
+
+    def upsert(self, platform_name: str, target: T_Target, sub_info: UserSubInfo):
+        sub_infos = self._index[platform_name, target]
+        for idx, exists in enumerate(sub_infos):
+            if exists.user == sub_info.user:
+                sub_infos[idx] = sub_info
+                return
+        sub_infos.append(sub_info)
+
+    def remove(self, platform_name: str, target: T_Target, user: PlatformTarget):
+        if (sub_infos := self._index.get((platform_name, target))) is None:
+            return
+        sub_infos[:] = [sub_info for sub_info in sub_infos if sub_info.user != user]
+        if not sub_infos:
+            del self._index[platform_name, target]
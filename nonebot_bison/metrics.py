@@ -24,6 +24,18 @@ request_time_histogram = Histogram(
     buckets=[0.1, 0.5, 1, 2, 5, 10, 30, 60],
 )
 
+not_modified_counter = Counter(
+    "bison_not_modified_counter",
+    "The number of conditional requests answered with 304, whose parsing was skipped",
+    ["host"],
+)
+
+not_modified_saved_bytes_counter = Counter(
+    "bison_not_modified_saved_bytes",
+    "The estimated bytes not downloaded thanks to 304 responses",
+    ["host"],
+)
+
 render_time_histogram = Histogram(
     "bison_render_histogram",
     "The time of theme used to render",
@@ -31,5 +43,30 @@ render_time_histogram = Histogram(
     buckets=[0.1, 0.5, 1, 2, 5, 10, 30, 60],
 )
 
+render_queue_wait_histogram = Histogram(
+    "bison_render_queue_wait_histogram",
+    "The time of theme waited for a browser page before rendering",
+    ["site_name", "platform_name"],
+    buckets=[0.1, 0.5, 1, 2, 5, 10, 30, 60],
+)
+
+render_cache_counter = Counter(
+    "bison_render_cache_counter",
+    "The number of render cache lookups",
+    ["site_name", "platform_name", "hit"],
+)
+
+dedup_set_size_gauge = Gauge(
+    "bison_dedup_set_size",
+    "The number of post ids kept for deduplication",
+    ["platform_name", "target"],
+)
+
+dedup_set_memory_gauge = Gauge(
+    "bison_dedup_set_memory_bytes",
+    "The estimated memory used by the deduplication set",
+    ["platform_name", "target"],
+)
+
 start_time = Gauge("bison_start_time", "The start time of the program")
 start_time.set(time.time())
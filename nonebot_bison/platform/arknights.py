@@ -12,7 +12,7 @@ from yarl import URL
 from nonebot_bison.post import Post
 from nonebot_bison.post.protocol import HTMLContentSupport
 from nonebot_bison.types import Category, RawPost, Target
-from nonebot_bison.utils import Site
+from nonebot_bison.utils import NotModified, Site, decode_json
 
 from .platform import NewMessage, StatusChange
 
@@ -112,8 +112,10 @@ class Arknights(NewMessage):
 
     async def get_sub_list(self, _) -> list[BulletinListItem]:
         client = await self.ctx.get_client()
-        raw_data = await client.get("https://ak-webview.hypergryph.com/api/game/bulletinList?target=IOS")
-        return type_validate_python(ArkBulletinListResponse, raw_data.json()).data.list
+        raw_data = await self.conditional_get(
+            client, "https://ak-webview.hypergryph.com/api/game/bulletinList?target=IOS"
+        )
+        return type_validate_python(ArkBulletinListResponse, decode_json(raw_data.content)).data.list
 
     def get_id(self, post: BulletinListItem) -> Any:
         return post.cid
@@ -131,7 +133,7 @@ class Arknights(NewMessage):
     async def parse(self, raw_post: BulletinListItem) -> Post:
         client = await self.ctx.get_client()
         raw_data = await client.get(f"https://ak-webview.hypergryph.com/api/game/bulletin/{self.get_id(post=raw_post)}")
-        data = type_validate_python(ArkBulletinResponse, raw_data.json()).data
+        data = type_validate_python(ArkBulletinResponse, decode_json(raw_data.content)).data
 
         def title_escape(text: str) -> str:
             return text.replace("\\n", " - ")
@@ -172,14 +174,24 @@ class AkVersion(StatusChange):
     async def get_target_name(cls, client: AsyncClient, target: Target) -> str | None:
         return "明日方舟游戏信息"
 
-    async def get_status(self, _):
+    async def get_status(self, target):
         client = await self.ctx.get_client()
-        res_ver = await client.get("https://ak-conf.hypergryph.com/config/prod/official/IOS/version")
-        res_preanounce = await client.get(
-            "https://ak-conf.hypergryph.com/config/prod/announce_meta/IOS/preannouncement.meta.json"
-        )
-        res = res_ver.json()
-        res.update(res_preanounce.json())
+        old_status = self.get_stored_data(target)
+        # 只有一个接口更新时，另一个接口的内容沿用上次的状态
+        res = dict(old_status or {})
+        modified = False
+        for url in (
+            "https://ak-conf.hypergryph.com/config/prod/official/IOS/version",
+            "https://ak-conf.hypergryph.com/config/prod/announce_meta/IOS/preannouncement.meta.json",
+        ):
+            try:
+                raw_data = await self.conditional_get(client, url, revalidate=old_status is not None)
+            except NotModified:
+                continue
+            res.update(decode_json(raw_data.content))
+            modified = True
+        if not modified:
+            raise NotModified("arknights version")
         return res
 
     def compare_status(self, _, old_status, new_status):
@@ -218,8 +230,8 @@ class MonsterSiren(NewMessage):
 
     async def get_sub_list(self, _) -> list[RawPost]:
         client = await self.ctx.get_client()
-        raw_data = await client.get("https://monster-siren.hypergryph.com/api/news")
-        return raw_data.json()["data"]["list"]
+        raw_data = await self.conditional_get(client, "https://monster-siren.hypergryph.com/api/news")
+        return decode_json(raw_data.content)["data"]["list"]
 
     def get_id(self, post: RawPost) -> Any:
         return post["cid"]
@@ -234,7 +246,7 @@ class MonsterSiren(NewMessage):
         client = await self.ctx.get_client()
         url = f"https://monster-siren.hypergryph.com/info/{raw_post['cid']}"
         res = await client.get(f"https://monster-siren.hypergryph.com/api/news/{raw_post['cid']}")
-        raw_data = res.json()
+        raw_data = decode_json(res.content)
         content = raw_data["data"]["content"]
         content = content.replace("</p>", "</p>\n")
         soup = bs(content, "html.parser")
@@ -267,8 +279,8 @@ class TerraHistoricusComic(NewMessage):
 
     async def get_sub_list(self, _) -> list[RawPost]:
         client = await self.ctx.get_client()
-        raw_data = await client.get("https://terra-historicus.hypergryph.com/api/recentUpdate")
-        return raw_data.json()["data"]
+        raw_data = await self.conditional_get(client, "https://terra-historicus.hypergryph.com/api/recentUpdate")
+        return decode_json(raw_data.content)["data"]
 
     def get_id(self, post: RawPost) -> Any:
         return f"{post['comicCid']}/{post['episodeCid']}"
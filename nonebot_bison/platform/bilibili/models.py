@@ -1,7 +1,7 @@
 from typing import Any, Literal, TypeAlias, TypeVar
 
 from nonebot.compat import PYDANTIC_V2, ConfigDict
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 
 from nonebot_bison.compat import model_rebuild
 
@@ -390,6 +390,40 @@ Major = (
 
 DynRawPost: TypeAlias = PostAPI.Item
 
+
+class DynLiteItem(Base):
+    """只包含去重与按时间过滤所需字段的动态
+
+    完整的 `DynRawPost` 校验开销较大，确认是新动态后再由原始数据 `raw` 解析
+    """
+
+    class Modules(Base):
+        class Author(Base):
+            pub_ts: int
+
+        module_author: "DynLiteItem.Modules.Author"
+
+    basic: "PostAPI.Basic"
+    id_str: str | None
+    modules: "DynLiteItem.Modules"
+    type: DynamicType
+
+    _raw: dict[str, Any] = PrivateAttr(default_factory=dict)
+
+    @property
+    def raw(self) -> dict[str, Any]:
+        return self._raw
+
+
+class PostListAPI(APIBase):
+    """动态列表，列表项保持为原始数据，由 `DynLiteItem` 按需校验"""
+
+    class Data(Base):
+        items: list[dict[str, Any]] | None = None
+
+    data: "PostListAPI.Data | None" = None
+
+
 model_rebuild_recurse(VideoMajor)
 model_rebuild_recurse(LiveRecommendMajor)
 model_rebuild_recurse(LiveMajor)
@@ -401,3 +435,5 @@ model_rebuild_recurse(CommonMajor)
 model_rebuild_recurse(CoursesMajor)
 model_rebuild_recurse(UserAPI)
 model_rebuild_recurse(PostAPI)
+model_rebuild_recurse(DynLiteItem)
+model_rebuild_recurse(PostListAPI)
@@ -1,20 +1,22 @@
 from copy import deepcopy
 from enum import Enum, unique
 import re
-from typing import ClassVar, NamedTuple
+from typing import Any, ClassVar, NamedTuple, cast
 from typing_extensions import Self
 
+from httpx import URL as HttpxURL
 from httpx import AsyncClient
 from nonebot import logger
-from nonebot.compat import type_validate_json, type_validate_python
+from nonebot.compat import model_dump, type_validate_json, type_validate_python
 from pydantic import BaseModel, Field, ValidationError
 from yarl import URL
 
 from nonebot_bison.compat import model_rebuild
 from nonebot_bison.platform.platform import CategoryNotRecognize, CategoryNotSupport, NewMessage, StatusChange
+from nonebot_bison.plugin_config import plugin_config
 from nonebot_bison.post.post import Post
 from nonebot_bison.types import ApiError, Category, RawPost, Tag, Target
-from nonebot_bison.utils import decode_unicode_escapes, text_similarity
+from nonebot_bison.utils import decode_json, decode_unicode_escapes, text_similarity
 
 from .models import (
     ArticleMajor,
@@ -23,12 +25,14 @@ from .models import (
     DeletedMajor,
     DrawMajor,
     DynamicType,
+    DynLiteItem,
     DynRawPost,
     LiveMajor,
     LiveRecommendMajor,
     OPUSMajor,
     PGCMajor,
     PostAPI,
+    PostListAPI,
     UnknownMajor,
     UserAPI,
     VideoMajor,
@@ -36,6 +40,8 @@ from .models import (
 from .retry import ApiCode352Error, retry_for_352
 from .scheduler import BiliBangumiSite, BilibiliSite, BililiveSite
 
+SPACE_DYNAMIC_API = "https://api.bilibili.com/x/polymer/web-dynamic/v1/feed/space"
+
 
 class _ProcessedText(NamedTuple):
     title: str
@@ -91,26 +97,29 @@ class Bilibili(NewMessage):
             )
 
     @retry_for_352
-    async def get_sub_list(self, target: Target) -> list[DynRawPost]:
+    async def get_sub_list(self, target: Target) -> list[DynLiteItem]:
         client = await self.ctx.get_client(target)
         params = {"host_mid": target, "timezone_offset": -480, "offset": "", "features": "itemOpusStyle"}
         res = await client.get(
-            "https://api.bilibili.com/x/polymer/web-dynamic/v1/feed/space",
+            SPACE_DYNAMIC_API,
             params=params,
             timeout=4.0,
         )
         res.raise_for_status()
+        self.check_body_changed(target, res.content)
         try:
-            res_obj = type_validate_json(PostAPI, res.content)
+            res_obj = type_validate_json(PostListAPI, res.content)
+            # 先只校验去重与过滤需要的字段，新动态在 filter_common_with_diff 中再完整校验
+            items = [self._lite_item(raw) for raw in (res_obj.data.items or [])] if res_obj.data else []
         except ValidationError as e:
             logger.exception("解析B站动态列表失败")
-            logger.error(res.json())
+            logger.error(decode_json(res.content))
             raise ApiError(res.request.url) from e
 
         # 0: 成功
         # -352: 需要cookie
         if res_obj.code == 0:
-            if (data := res_obj.data) and (items := data.items):
+            if items:
                 logger.trace(f"获取用户{target}的动态列表成功，共{len(items)}条动态")
                 logger.trace(f"用户{target}的动态列表: {':'.join(x.id_str or x.basic.rid_str for x in items)}")
                 return [item for item in items if item.type != "DYNAMIC_TYPE_NONE"]
@@ -122,10 +131,36 @@ class Bilibili(NewMessage):
         else:
             raise ApiError(res.request.url)
 
-    def get_id(self, post: DynRawPost) -> str:
-        return post.id_str
-
-    def get_date(self, post: DynRawPost) -> int:
+    @staticmethod
+    def _lite_item(raw: dict[str, Any]) -> DynLiteItem:
+        item = type_validate_python(DynLiteItem, raw)
+        item._raw = raw
+        return item
+
+    async def filter_common_with_diff(
+        self, target: Target, raw_post_list: list[DynLiteItem | DynRawPost]
+    ) -> list[DynRawPost]:
+        # 新动态在记录 id 之前完成完整校验，校验失败时与整个列表解析失败一样抛出 ApiError，
+        # 下次抓取时重试，不会因为 id 已被记录而丢失
+        filtered = await self.filter_common(raw_post_list)
+        store: NewMessage.MessageStorage | None = self.get_stored_data(target)
+        # 初始化时所有动态都只记录 id，不会作为新动态返回
+        initializing = (store is None or not store.inited) and plugin_config.bison_init_filter
+        validated: list[DynLiteItem | DynRawPost] = []
+        for post in filtered:
+            if isinstance(post, DynLiteItem) and not initializing and not (store and post.id_str in store.exists_posts):
+                try:
+                    post = type_validate_python(DynRawPost, post.raw)
+                except ValidationError as e:
+                    logger.exception(f"解析B站动态 {post.id_str} 失败")
+                    raise ApiError(HttpxURL(SPACE_DYNAMIC_API, params={"host_mid": target})) from e
+            validated.append(post)
+        return cast(list[DynRawPost], await super().filter_common_with_diff(target, validated))
+
+    def get_id(self, post: DynLiteItem | DynRawPost) -> str:
+        return post.id_str or ""
+
+    def get_date(self, post: DynLiteItem | DynRawPost) -> int:
         return post.modules.module_author.pub_ts
 
     def _do_get_category(self, post_type: DynamicType) -> Category:
@@ -146,7 +181,7 @@ class Bilibili(NewMessage):
             case unknown_type:
                 raise CategoryNotRecognize(unknown_type)
 
-    def get_category(self, post: DynRawPost) -> Category:
+    def get_category(self, post: DynLiteItem | DynRawPost) -> Category:
         post_type = post.type
         return self._do_get_category(post_type)
 
@@ -162,11 +197,11 @@ class Bilibili(NewMessage):
 
     def _text_process(self, dynamic: str, desc: str, title: str) -> _ProcessedText:
         # 计算视频标题和视频描述相似度
-        title_similarity = 0.0 if len(title) == 0 or len(desc) == 0 else text_similarity(title, desc[: len(title)])
+        title_similarity = 0.0 if len(title) == 0 or len(desc) == 0 else text_similarity(title, desc[: len(title)], 0.9)
         if title_similarity > 0.9:
             desc = desc[len(title) :].lstrip()
         # 计算视频描述和动态描述相似度
-        content_similarity = 0.0 if len(dynamic) == 0 or len(desc) == 0 else text_similarity(dynamic, desc)
+        content_similarity = 0.0 if len(dynamic) == 0 or len(desc) == 0 else text_similarity(dynamic, desc, 0.8)
         if content_similarity > 0.8:
             # 选择较长的描述
             return _ProcessedText(title, desc if len(dynamic) < len(desc) else dynamic)
@@ -404,6 +439,20 @@ class Bilibililive(StatusChange):
             keyframe="",
         )
 
+    @classmethod
+    def dump_stored_data(cls, data: Info | None) -> Any:
+        if data is None:
+            return None
+        res = model_dump(data, by_alias=True)
+        res["live_status"] = data.live_status.value
+        return res
+
+    @classmethod
+    def load_stored_data(cls, data: Any) -> Info | None:
+        if data is None:
+            return None
+        return type_validate_python(cls.Info, data)
+
     async def batch_get_status(self, targets: list[Target]) -> list[Info]:
         client = await self.ctx.get_client()
         # https://github.com/SocialSisterYi/bilibili-API-collect/blob/master/docs/live/info.md#批量查询直播间状态
@@ -412,7 +461,7 @@ class Bilibililive(StatusChange):
             params={"uids[]": targets},
             timeout=4.0,
         )
-        res_dict = res.json()
+        res_dict = decode_json(res.content)
 
         if res_dict["code"] != 0:
             raise self.FetchError()
@@ -481,7 +530,7 @@ class BilibiliBangumi(StatusChange):
     @classmethod
     async def get_target_name(cls, client: AsyncClient, target: Target) -> str | None:
         res = await client.get(cls._url, params={"media_id": target})
-        res_data = res.json()
+        res_data = decode_json(res.content)
         if res_data["code"]:
             return None
         return res_data["result"]["media"]["title"]
@@ -505,7 +554,7 @@ class BilibiliBangumi(StatusChange):
             params={"media_id": target},
             timeout=4.0,
         )
-        res_dict = res.json()
+        res_dict = decode_json(res.content)
         if res_dict["code"] == 0:
             return {
                 "index": res_dict["result"]["media"]["new_ep"]["index"],
@@ -524,7 +573,7 @@ class BilibiliBangumi(StatusChange):
     async def parse(self, raw_post: RawPost) -> Post:
         client = await self.ctx.get_client()
         detail_res = await client.get(f"https://api.bilibili.com/pgc/view/web/season?season_id={raw_post['season_id']}")
-        detail_dict = detail_res.json()
+        detail_dict = decode_json(detail_res.content)
         lastest_episode = None
         for episode in detail_dict["result"]["episodes"][::-1]:
             if episode["badge"] in ("", "会员"):
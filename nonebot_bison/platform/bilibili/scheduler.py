@@ -9,7 +9,6 @@ from httpx import AsyncClient, Response
 from nonebot import logger, require
 from playwright.async_api import Cookie
 
-from nonebot_bison.config import config
 from nonebot_bison.config.db_model import Cookie as CookieModel
 from nonebot_bison.config.db_model import Target
 from nonebot_bison.plugin_config import plugin_config
@@ -71,24 +70,18 @@ class BilibiliClientManager(CookieClientManager):
             await resp.aread()
             if resp.status_code == 200 and "-352" not in resp.text:
                 logger.trace(f"请求成功: {cookie.id} {resp.request.url}")
-                cookie.status = "success"
+                status = "success"
             else:
                 logger.warning(f"请求失败: {cookie.id} {resp.request.url}, 状态码: {resp.status_code}")
-                cookie.status = "failed"
+                status = "failed"
                 self.current_identified_cookie = None
-            cookie.last_usage = datetime.now()
-            await config.update_cookie(cookie)
+            self.cookie_pool.mark_used(cookie, status)
 
         return _response_hook
 
     async def _get_next_identified_cookie(self) -> CookieModel | None:
         """选择下一个实名 cookie"""
-        cookies = await config.get_cookie(self._site_name, is_anonymous=False)
-        available_cookies = [cookie for cookie in cookies if cookie.last_usage + cookie.cd < datetime.now()]
-        if not available_cookies:
-            return None
-        cookie = min(available_cookies, key=lambda x: x.last_usage)
-        return cookie
+        return await self.cookie_pool.choose(None, is_anonymous=False)
 
     async def _choose_cookie(self, target: Target | None) -> CookieModel:
         """选择 cookie 的具体算法"""
@@ -99,7 +92,7 @@ class BilibiliClientManager(CookieClientManager):
             # 如果当前有选定的实名 cookie 则直接返回
             return self.current_identified_cookie
         # 否则返回匿名 cookie
-        return (await config.get_cookie(self._site_name, is_anonymous=True))[0]
+        return (await self.cookie_pool.get_cookies(is_anonymous=True))[0]
 
     @override
     async def refresh_client(self):
@@ -108,11 +101,11 @@ class BilibiliClientManager(CookieClientManager):
 
     @override
     async def get_client_for_static(self) -> AsyncClient:
-        return http_client()
+        return http_client(pool=self.pool_name)
 
     @override
     async def get_query_name_client(self) -> AsyncClient:
-        return http_client()
+        return http_client(pool=self.pool_name)
 
 
 class BilibiliSite(Site):
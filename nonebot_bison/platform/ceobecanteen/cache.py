@@ -6,14 +6,16 @@ from typing import TypeAlias
 
 from expiringdictx import ExpiringDict, SimpleCache
 from hishel import AsyncCacheTransport, AsyncInMemoryStorage, Controller
-from httpx import AsyncClient, AsyncHTTPTransport
+from httpx import AsyncClient
+
+from nonebot_bison.utils.http import PooledTransport
 
 from .const import DATASOURCE_URL
 from .models import CeobeSource, CeobeTarget, DataSourceResponse
 from .utils import process_response
 
 cache_transport = AsyncCacheTransport(
-    AsyncHTTPTransport(),
+    PooledTransport("ceobe_canteen"),
     storage=AsyncInMemoryStorage(),
     controller=Controller(
         always_revalidate=True,
@@ -1,3 +1,4 @@
+from pathlib import Path
 from typing import Literal, NamedTuple, TypeVar
 
 from pydantic import BaseModel
@@ -5,7 +6,7 @@ from pydantic import BaseModel
 
 class CeobeTextPic(NamedTuple):
     text: str
-    pics: list[bytes | str]
+    pics: list[bytes | str | Path]
 
 
 class CeobeTarget(BaseModel):
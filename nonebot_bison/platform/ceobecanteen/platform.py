@@ -1,10 +1,12 @@
+import asyncio
 from collections import defaultdict
 from datetime import timedelta
 from functools import partial
+from pathlib import Path
 from typing import ClassVar, ParamSpec
 
 from httpx import AsyncClient
-from nonebot import logger, require
+from nonebot import logger
 from rapidfuzz import fuzz, process
 
 from nonebot_bison.platform.platform import NewMessage
@@ -12,6 +14,8 @@ from nonebot_bison.plugin_config import plugin_config
 from nonebot_bison.post import Post
 from nonebot_bison.types import Category, RawPost, Target
 from nonebot_bison.utils import ClientManager, Site, capture_html
+from nonebot_bison.utils.image_cache import image_cache
+from nonebot_bison.utils.page_pool import get_page
 
 from .cache import CeobeCache, CeobeClient, CeobeDataSourceCache
 from .const import COMB_ID_URL, COOKIE_ID_URL, COOKIES_URL
@@ -206,9 +210,6 @@ class CeobeCanteen(NewMessage):
 
     async def snapshot_official_website(self, url: str) -> bytes:
         """截取小刻官网的截图"""
-        require("nonebot_plugin_htmlrender")
-        from nonebot_plugin_htmlrender import get_new_page
-
         logger.debug(f"snapshot official website url: {url}")
 
         snapshot_selector = "//html/body/div[1]/div[1]/div/div[1]/div[1]/div"
@@ -216,7 +217,7 @@ class CeobeCanteen(NewMessage):
         viewport = {"width": 1024, "height": 19990}
 
         try:
-            async with get_new_page(viewport=viewport) as page:
+            async with get_page(viewport=viewport) as page:
                 await page.goto(url, wait_until="networkidle")
                 locator = page.locator(calculate_selector)
 
@@ -301,19 +302,14 @@ class CeobeCanteen(NewMessage):
 
         return res
 
-    async def parse_retweet_images(self, images: list[CeobeImage], source_type: str) -> list[bytes] | list[str]:
+    async def parse_retweet_images(self, images: list[CeobeImage], source_type: str) -> list[bytes | Path] | list[str]:
         if source_type.startswith("weibo"):
             retweet_pics = await self.download_weibo_image([image.origin_url for image in images])
         else:
             retweet_pics = [image.origin_url for image in images]
         return retweet_pics
 
-    async def download_weibo_image(self, image_urls: list[str]) -> list[bytes]:
+    async def download_weibo_image(self, image_urls: list[str]) -> list[bytes | Path]:
         headers = {"referer": "https://weibo.cn/"}
-        pics = []
         async with CeobeClient(headers=headers) as client:
-            for url in image_urls:
-                resp = await client.get(url)
-                resp.raise_for_status()
-                pics.append(resp.content)
-        return pics
+            return list(await asyncio.gather(*(image_cache.get_file(url, client) for url in image_urls)))
@@ -2,16 +2,19 @@ from httpx import Response
 from nonebot import logger
 from nonebot.compat import type_validate_python
 
+from nonebot_bison.utils import decode_json
+
 from .exception import CeobeResponseError
 from .models import CookieIdResponse, ResponseModel
 
 
 def process_response(response: Response, parse_model: type[ResponseModel]) -> ResponseModel:
     response.raise_for_status()
-    logger.trace(f"小刻食堂请求结果: {response.json().get('message')} {parse_model=}")
+    content = decode_json(response.content)
+    logger.trace(f"小刻食堂请求结果: {content.get('message')} {parse_model=}")
 
     try:
-        data = type_validate_python(parse_model, response.json())
+        data = type_validate_python(parse_model, content)
     except Exception as e:
         raise CeobeResponseError(f"解析小刻食堂响应失败: {e}")
 
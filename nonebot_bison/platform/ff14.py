@@ -4,7 +4,7 @@ from httpx import AsyncClient
 
 from nonebot_bison.post import Post
 from nonebot_bison.types import RawPost, Target
-from nonebot_bison.utils import anonymous_site
+from nonebot_bison.utils import anonymous_site, decode_json
 
 from .platform import NewMessage
 
@@ -26,10 +26,11 @@ class FF14(NewMessage):
 
     async def get_sub_list(self, _) -> list[RawPost]:
         client = await self.ctx.get_client()
-        raw_data = await client.get(
-            "https://cqnews.web.sdo.com/api/news/newsList?gameCode=ff&CategoryCode=5309,5310,5311,5312,5313&pageIndex=0&pageSize=5"
+        raw_data = await self.conditional_get(
+            client,
+            "https://cqnews.web.sdo.com/api/news/newsList?gameCode=ff&CategoryCode=5309,5310,5311,5312,5313&pageIndex=0&pageSize=5",
         )
-        return raw_data.json()["Data"]
+        return decode_json(raw_data.content)["Data"]
 
     def get_id(self, post: RawPost) -> Any:
         """用发布时间当作 ID
@@ -5,7 +5,7 @@ from httpx import AsyncClient
 
 from nonebot_bison.post import Post
 from nonebot_bison.types import ApiError, Category, RawPost, Target
-from nonebot_bison.utils import Site
+from nonebot_bison.utils import Site, decode_json
 
 from .platform import NewMessage
 
@@ -33,7 +33,7 @@ class NcmArtist(NewMessage):
             f"https://music.163.com/api/artist/albums/{target}",
             headers={"Referer": "https://music.163.com/"},
         )
-        res_data = res.json()
+        res_data = decode_json(res.content)
         if res_data["code"] != 200:
             raise ApiError(res.request.url)
         return res_data["artist"]["name"]
@@ -53,7 +53,7 @@ class NcmArtist(NewMessage):
             f"https://music.163.com/api/artist/albums/{target}",
             headers={"Referer": "https://music.163.com/"},
         )
-        res_data = res.json()
+        res_data = decode_json(res.content)
         if res_data["code"] != 200:
             return []
         else:
@@ -91,7 +91,7 @@ class NcmRadio(NewMessage):
             headers={"Referer": "https://music.163.com/"},
             data={"radioId": target, "limit": 1000, "offset": 0},
         )
-        res_data = res.json()
+        res_data = decode_json(res.content)
         if res_data["code"] != 200 or res_data["programs"] == 0:
             return
         return res_data["programs"][0]["radio"]["name"]
@@ -114,7 +114,7 @@ class NcmRadio(NewMessage):
             headers={"Referer": "https://music.163.com/"},
             data={"radioId": target, "limit": 1000, "offset": 0},
         )
-        res_data = res.json()
+        res_data = decode_json(res.content)
         if res_data["code"] != 200:
             return []
         else:
@@ -1,7 +1,10 @@
 from abc import ABC, abstractmethod
+import asyncio
 from collections import defaultdict
 from collections.abc import Awaitable, Callable, Collection
 from dataclasses import dataclass
+from functools import lru_cache
+import hashlib
 import json
 import ssl
 import time
@@ -13,10 +16,15 @@ from httpx import AsyncClient
 from nonebot.log import logger
 from nonebot_plugin_saa import PlatformTarget
 
+from nonebot_bison.metrics import dedup_set_memory_gauge, dedup_set_size_gauge
 from nonebot_bison.plugin_config import plugin_config
 from nonebot_bison.post import Post
 from nonebot_bison.types import Category, RawPost, SubUnit, Tag, Target
-from nonebot_bison.utils import ProcessContext, Site
+from nonebot_bison.utils import NotModified, ProcessContext, RecentIdSet, Site, commit_validators, conditional_get
+from nonebot_bison.utils.http import Validator, ValidatorKey
+
+# 开启 bison_init_filter 时，超过这个时间（秒）的 post 不会被推送
+INIT_FILTER_WINDOW = 2 * 60 * 60
 
 
 class CategoryNotSupport(Exception):
@@ -29,6 +37,63 @@ class CategoryNotRecognize(Exception):
     """raise in get_category, when you don't know the category of post"""
 
 
+@dataclass(frozen=True)
+class SubFilter:
+    """预处理后的单个订阅的分类与标签过滤条件"""
+
+    categories: frozenset[Category]
+    subscribed_tags: frozenset[Tag]
+    banned_tags: frozenset[Tag]
+
+    def is_banned(self, post_tags: Collection[Tag]) -> bool:
+        """与 `Platform.is_banned_post` 的语义一致"""
+        if self.banned_tags and not self.banned_tags.isdisjoint(post_tags):
+            return True
+        if self.subscribed_tags:
+            return self.subscribed_tags.isdisjoint(post_tags)
+        return False
+
+
+@lru_cache(maxsize=1024)
+def compile_sub_filter(cats: tuple[Category, ...], tags: tuple[Tag, ...]) -> SubFilter:
+    """把订阅的分类与标签转换为 `SubFilter`，相同的订阅条件共用同一个对象"""
+    subscribed_tags = frozenset(tag for tag in tags if not tag.startswith("~"))
+    banned_tags = frozenset(tag.lstrip("~") for tag in tags if tag.startswith("~"))
+    return SubFilter(frozenset(cats), subscribed_tags, banned_tags)
+
+
+def get_sub_filter(cats: Collection[Category], tags: Collection[Tag]) -> SubFilter:
+    """顺序与重复无关的订阅条件对应同一个 `SubFilter`"""
+    return compile_sub_filter(tuple(sorted(set(cats))), tuple(sorted(set(tags))))
+
+
+def group_destinations(
+    to_send: list[tuple[PlatformTarget, list[Post]]],
+) -> list[tuple[list[PlatformTarget], list[Post]]]:
+    """把共用同一个 post 列表（见 `dispatch_user_post`）的订阅者合并为一组，空列表会被忽略"""
+    groups: dict[int, tuple[list[PlatformTarget], list[Post]]] = {}
+    for user, posts in to_send:
+        if not posts:
+            continue
+        if (group := groups.get(id(posts))) is None:
+            group = groups[id(posts)] = ([], posts)
+        group[0].append(user)
+    return list(groups.values())
+
+
+_NOT_COMPUTED: Any = object()
+
+
+class RawPostMeta:
+    """单次抓取中 raw post 的分类与标签，在多个订阅者之间共用，只在第一次用到时计算"""
+
+    __slots__ = ("category", "tags")
+
+    def __init__(self):
+        self.category: Category | None = _NOT_COMPUTED
+        self.tags: Collection[Tag] | None = _NOT_COMPUTED
+
+
 class RegistryMeta(type):
     def __new__(cls, name, bases, namespace, **kwargs):
         return super().__new__(cls, name, bases, namespace)
@@ -67,10 +132,14 @@ async def catch_network_error(func: Callable[P, Awaitable[R]], *args: P.args, **
 class PlatformMeta(RegistryMeta):
     categories: dict[Category, str]
     store: dict[Target, Any]
+    dirty_targets: set[Target]
+    body_hashes: dict[Target, bytes]
 
     def __init__(cls, name, bases, namespace, **kwargs):
         cls.reverse_category = {}
         cls.store = {}
+        cls.dirty_targets = set()
+        cls.body_hashes = {}
         if hasattr(cls, "categories") and cls.categories:
             for key, val in cls.categories.items():
                 cls.reverse_category[val] = key
@@ -123,6 +192,19 @@ class Platform(metaclass=PlatformABCMeta, base=True):
     def __init__(self, context: ProcessContext):
         super().__init__()
         self.ctx = context
+        # 本次抓取中条件请求得到的校验信息，处理成功后才保存
+        self._pending_validators: dict[ValidatorKey, Validator | None] = {}
+
+    async def conditional_get(self, client: AsyncClient, url: str, **kwargs) -> httpx.Response:
+        """带有 ETag / Last-Modified 校验的 GET 请求，参数见 `nonebot_bison.utils.conditional_get`
+
+        新的校验信息在本次抓取的内容处理成功后才保存
+        """
+        return await conditional_get(client, url, pending=self._pending_validators, **kwargs)
+
+    def _commit_pending(self, target: Target | None = None):
+        """处理成功后保存本次抓取的校验信息，指定 `target` 时只保存以其为 key 的部分"""
+        commit_validators(self._pending_validators, ... if target is None else target)
 
     class ParseTargetException(Exception):
         def __init__(self, *args: object, prompt: str | None = None) -> None:
@@ -146,6 +228,22 @@ class Platform(metaclass=PlatformABCMeta, base=True):
     @classmethod
     def set_stored_data(cls, target: Target, data: Any):
         cls.store[target] = data
+        cls.dirty_targets.add(target)
+
+    @classmethod
+    def get_state_key(cls) -> str:
+        """持久化抓取状态时使用的 key"""
+        return f"{cls.platform_name}:{cls.__name__}"
+
+    @classmethod
+    def dump_stored_data(cls, data: Any) -> Any:
+        """将抓取状态转换为可以 JSON 序列化的对象"""
+        return data
+
+    @classmethod
+    def load_stored_data(cls, data: Any) -> Any:
+        """从 `dump_stored_data` 的结果中恢复抓取状态"""
+        return data
 
     def tag_separator(self, stored_tags: list[Tag]) -> tuple[list[Tag], list[Tag]]:
         """返回分离好的正反tag元组"""
@@ -187,17 +285,25 @@ class Platform(metaclass=PlatformABCMeta, base=True):
     async def filter_user_custom(
         self, raw_post_list: list[RawPost], cats: list[Category], tags: list[Tag]
     ) -> list[RawPost]:
+        return self.filter_by_sub_filter(raw_post_list, get_sub_filter(cats, tags), {})
+
+    def filter_by_sub_filter(
+        self, raw_post_list: list[RawPost], sub_filter: SubFilter, meta_cache: dict[int, RawPostMeta]
+    ) -> list[RawPost]:
+        """按订阅条件过滤 raw post，`meta_cache` 以 raw post 的对象 id 缓存分类与标签"""
         res: list[RawPost] = []
         for raw_post in raw_post_list:
-            if self.categories:
-                cat = self.get_category(raw_post)
-                if cats and cat not in cats:
+            if (meta := meta_cache.get(id(raw_post))) is None:
+                meta = meta_cache[id(raw_post)] = RawPostMeta()
+            if self.categories and sub_filter.categories:
+                if meta.category is _NOT_COMPUTED:
+                    meta.category = self.get_category(raw_post)
+                if meta.category not in sub_filter.categories:
                     continue
-            if self.enable_tag and tags:
-                raw_post_tags = self.get_tags(raw_post)
-                if isinstance(raw_post_tags, Collection) and self.is_banned_post(
-                    raw_post_tags, *self.tag_separator(tags)
-                ):
+            if self.enable_tag and (sub_filter.subscribed_tags or sub_filter.banned_tags):
+                if meta.tags is _NOT_COMPUTED:
+                    meta.tags = self.get_tags(raw_post)
+                if isinstance(meta.tags, Collection) and sub_filter.is_banned(meta.tags):
                     continue
             res.append(raw_post)
         return res
@@ -205,14 +311,34 @@ class Platform(metaclass=PlatformABCMeta, base=True):
     async def dispatch_user_post(
         self, new_posts: list[RawPost], sub_unit: SubUnit
     ) -> list[tuple[PlatformTarget, list[Post]]]:
-        res: list[tuple[PlatformTarget, list[Post]]] = []
-        for user, cats, required_tags in sub_unit.user_sub_infos:
-            user_raw_post = await self.filter_user_custom(new_posts, cats, required_tags)
-            user_post: list[Post] = []
-            for raw_post in user_raw_post:
-                user_post.append(await self.do_parse(raw_post))
-            res.append((user, user_post))
-        return res
+        # 过滤条件相同的订阅者只过滤一次，并共用同一个 post 列表，调度器据此合并渲染与发送
+        user_filters = [
+            (user, get_sub_filter(cats, required_tags)) for user, cats, required_tags in sub_unit.user_sub_infos
+        ]
+        filter_raw_posts: dict[SubFilter, list[RawPost]] = {}
+        # 任一用户需要的 post 只解析一次，raw post 本身可能不可哈希，按对象 id 去重
+        to_parse: dict[int, RawPost] = {}
+        meta_cache: dict[int, RawPostMeta] = {}
+        for _, sub_filter in user_filters:
+            if sub_filter in filter_raw_posts:
+                continue
+            filter_raw_posts[sub_filter] = self.filter_by_sub_filter(new_posts, sub_filter, meta_cache)
+            for raw_post in filter_raw_posts[sub_filter]:
+                to_parse.setdefault(id(raw_post), raw_post)
+
+        semaphore = asyncio.Semaphore(plugin_config.bison_parse_concurrency)
+
+        async def _parse(raw_post: RawPost) -> Post:
+            async with semaphore:
+                return await self.do_parse(raw_post)
+
+        posts = await asyncio.gather(*(_parse(raw_post) for raw_post in to_parse.values()))
+        parsed = dict(zip(to_parse.keys(), posts))
+        filter_posts = {
+            sub_filter: [parsed[id(raw_post)] for raw_post in raw_posts]
+            for sub_filter, raw_posts in filter_raw_posts.items()
+        }
+        return [(user, filter_posts[sub_filter]) for user, sub_filter in user_filters]
 
     @abstractmethod
     def get_category(self, post: RawPost) -> Category | None:
@@ -267,7 +393,7 @@ class MessageProcess(Platform, abstract=True):
             #     continue
             if (
                 (post_time := self.get_date(raw_post))
-                and time.time() - post_time > 2 * 60 * 60
+                and time.time() - post_time > INIT_FILTER_WINDOW
                 and plugin_config.bison_init_filter
             ):
                 continue
@@ -294,26 +420,70 @@ class NewMessage(MessageProcess, abstract=True):
     @dataclass
     class MessageStorage:
         inited: bool
-        exists_posts: set[Any]
+        exists_posts: RecentIdSet
+
+    def __init__(self, context: ProcessContext):
+        super().__init__(context)
+        # 本次抓取到的响应内容哈希，处理成功后才写入 body_hashes
+        self._pending_body_hashes: dict[Target, bytes] = {}
+
+    def check_body_changed(self, target: Target, body: bytes):
+        """响应内容与上次成功处理时完全相同时抛出 `NotModified`，跳过之后的解析与过滤
+
+        在 `get_sub_list` 中解析响应之前调用，用于不支持条件请求的接口
+        """
+        if not plugin_config.bison_skip_unchanged_response:
+            return
+        digest = hashlib.blake2b(body, digest_size=16).digest()
+        store: NewMessage.MessageStorage | None = self.get_stored_data(target)
+        if store and store.inited and self.body_hashes.get(target) == digest:
+            raise NotModified(target)
+        self._pending_body_hashes[target] = digest
+
+    def _commit_pending(self, target: Target | None = None):
+        super()._commit_pending(target)
+        targets = list(self._pending_body_hashes) if target is None else [target]
+        for t in targets:
+            if (digest := self._pending_body_hashes.pop(t, None)) is not None:
+                self.body_hashes[t] = digest
+
+    @classmethod
+    def dump_stored_data(cls, data: MessageStorage | None) -> Any:
+        if data is None:
+            return None
+        return {"inited": data.inited, "exists_posts": data.exists_posts.items()}
+
+    @classmethod
+    def load_stored_data(cls, data: Any) -> MessageStorage | None:
+        if data is None:
+            return None
+        exists_posts = RecentIdSet(plugin_config.bison_dedup_max_size, map(tuple, data["exists_posts"]))
+        return cls.MessageStorage(data["inited"], exists_posts)
 
     async def filter_common_with_diff(self, target: Target, raw_post_list: list[RawPost]) -> list[RawPost]:
         filtered_post = await self.filter_common(raw_post_list)
-        store = self.get_stored_data(target) or self.MessageStorage(False, set())
+        store = self.get_stored_data(target) or self.MessageStorage(
+            False, RecentIdSet(plugin_config.bison_dedup_max_size)
+        )
         res = []
         if not store.inited and plugin_config.bison_init_filter:
             # target not init
             for raw_post in filtered_post:
-                post_id = self.get_id(raw_post)
-                store.exists_posts.add(post_id)
+                store.exists_posts.add(self.get_id(raw_post), self.get_date(raw_post))
             logger.info(f"init {self.platform_name}-{target} with {store.exists_posts}")
             store.inited = True
         else:
             for raw_post in filtered_post:
                 post_id = self.get_id(raw_post)
-                if post_id in store.exists_posts:
-                    continue
-                res.append(raw_post)
-                store.exists_posts.add(post_id)
+                if post_id not in store.exists_posts:
+                    res.append(raw_post)
+                # 已存在的 id 也需要刷新，保证仍在列表中的 post 不会被淘汰
+                store.exists_posts.add(post_id, self.get_date(raw_post))
+        store.exists_posts.evict(INIT_FILTER_WINDOW if plugin_config.bison_init_filter else None)
+        dedup_set_size_gauge.labels(platform_name=self.platform_name, target=target).set(len(store.exists_posts))
+        dedup_set_memory_gauge.labels(platform_name=self.platform_name, target=target).set(
+            store.exists_posts.memory_size()
+        )
         self.set_stored_data(target, store)
         logger.trace(f"本次抓取 {len(raw_post_list)} 条，过滤后 {len(filtered_post)} 条，新消息 {len(res)} 条")
         return res
@@ -340,8 +510,14 @@ class NewMessage(MessageProcess, abstract=True):
         return res
 
     async def fetch_new_post(self, sub_unit: SubUnit) -> list[tuple[PlatformTarget, list[Post]]]:
-        post_list = await self.get_sub_list(sub_unit.sub_target)
-        return await self._handle_new_post(post_list, sub_unit)
+        try:
+            post_list = await self.get_sub_list(sub_unit.sub_target)
+        except NotModified:
+            logger.trace(f"{self.platform_name}-{sub_unit.sub_target} 内容未更新，跳过")
+            return []
+        res = await self._handle_new_post(post_list, sub_unit)
+        self._commit_pending()
+        return res
 
     async def batch_fetch_new_post(self, sub_units: list[SubUnit]) -> list[tuple[PlatformTarget, list[Post]]]:
         if not self.has_target:
@@ -350,6 +526,7 @@ class NewMessage(MessageProcess, abstract=True):
         res = []
         for sub_unit, posts in zip(sub_units, posts_set):
             res.extend(await self._handle_new_post(posts, sub_unit))
+            self._commit_pending(sub_unit.sub_target)
         return res
 
 
@@ -393,10 +570,15 @@ class StatusChange(Platform, abstract=True):
     async def fetch_new_post(self, sub_unit: SubUnit) -> list[tuple[PlatformTarget, list[Post]]]:
         try:
             new_status = await self.get_status(sub_unit.sub_target)
+        except NotModified:
+            logger.trace(f"{self.platform_name}-{sub_unit.sub_target} 状态未更新，跳过")
+            return []
         except self.FetchError as err:
             logger.warning(f"fetching {self.name}-{sub_unit.sub_target} error: {err}")
             raise
-        return await self._handle_status_change(new_status, sub_unit)
+        res = await self._handle_status_change(new_status, sub_unit)
+        self._commit_pending()
+        return res
 
     async def batch_fetch_new_post(self, sub_units: list[SubUnit]) -> list[tuple[PlatformTarget, list[Post]]]:
         if not self.has_target:
@@ -405,6 +587,7 @@ class StatusChange(Platform, abstract=True):
         res = []
         for sub_unit, new_status in zip(sub_units, new_statuses):
             res.extend(await self._handle_status_change(new_status, sub_unit))
+            self._commit_pending(sub_unit.sub_target)
         return res
 
 
@@ -476,12 +659,31 @@ def make_no_target_group(platform_list: list[type[Platform]]) -> type[Platform]:
         return await platform_list[0].get_target_name(client, target)
 
     async def fetch_new_post(self: "NoTargetGroup", sub_unit: SubUnit):
-        res = defaultdict(list)
-        for platform in self.platform_obj_list:
-            platform_res = await platform.fetch_new_post(sub_unit)
+        # 各个平台同时抓取，单个平台出错或者过慢不影响其他平台
+        results = await asyncio.gather(
+            *(platform.do_fetch_new_post(sub_unit) for platform in self.platform_obj_list),
+            return_exceptions=True,
+        )
+        errors = [platform_res for platform_res in results if isinstance(platform_res, BaseException)]
+        if errors and len(errors) == len(results):
+            raise errors[0]
+        # 按平台顺序合并，保证结果稳定
+        user_posts: defaultdict[PlatformTarget, list[list[Post]]] = defaultdict(list)
+        for platform, platform_res in zip(self.platform_obj_list, results):
+            if isinstance(platform_res, BaseException):
+                logger.opt(exception=platform_res).error(f"{platform} fetch new post failed")
+                continue
             for user, posts in platform_res:
-                res[user].extend(posts)
-        return [[key, val] for key, val in res.items()]
+                user_posts[user].append(posts)
+        # 每个平台中共用 post 列表的订阅者，合并后仍然共用同一个列表（见 `group_destinations`）
+        merged: dict[tuple[int, ...], list[Post]] = {}
+        res = []
+        for user, posts_list in user_posts.items():
+            key = tuple(id(posts) for posts in posts_list)
+            if (posts := merged.get(key)) is None:
+                posts = merged[key] = [post for posts in posts_list for post in posts]
+            res.append((user, posts))
+        return res
 
     return type(
         "NoTargetGroup",
@@ -66,7 +66,7 @@ class Rss(NewMessage):
 
     async def get_sub_list(self, target: Target) -> list[RawPost]:
         client = await self.ctx.get_client(target)
-        res = await client.get(target, timeout=10.0)
+        res = await self.conditional_get(client, target, key=target, timeout=10.0)
         feed = feedparser.parse(res)
         entries = feed.entries
         for entry in entries:
@@ -75,7 +75,7 @@ class Rss(NewMessage):
 
     def _text_process(self, title: str, desc: str) -> tuple[str | None, str]:
         """检查标题和描述是否相似，如果相似则标题为None, 否则返回标题和描述"""
-        similarity = 1.0 if len(title) == 0 or len(desc) == 0 else text_similarity(title, desc)
+        similarity = 1.0 if len(title) == 0 or len(desc) == 0 else text_similarity(title, desc, 0.8)
         if similarity > 0.8:
             return None, title if len(title) > len(desc) else desc
 
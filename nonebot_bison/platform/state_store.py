@@ -0,0 +1,121 @@
+from abc import ABC, abstractmethod
+import asyncio
+import json
+from pathlib import Path
+from typing import Any
+
+from nonebot.log import logger
+from nonebot_plugin_datastore import get_plugin_data
+
+from nonebot_bison.config import config
+from nonebot_bison.plugin_config import plugin_config
+from nonebot_bison.types import Target
+
+from .platform import Platform
+
+StateKey = tuple[str, Target]
+
+
+class StateStore(ABC):
+    """平台抓取状态的持久化后端"""
+
+    @abstractmethod
+    async def load_all(self) -> dict[StateKey, Any]: ...
+
+    @abstractmethod
+    async def save(self, states: dict[StateKey, Any]): ...
+
+
+class DBStateStore(StateStore):
+    """使用插件数据库保存抓取状态"""
+
+    async def load_all(self) -> dict[StateKey, Any]:
+        return await config.get_all_platform_state()
+
+    async def save(self, states: dict[StateKey, Any]):
+        await config.save_platform_state(states)
+
+
+class FileStateStore(StateStore):
+    """使用 JSON 文件保存抓取状态"""
+
+    def __init__(self, path: Path | None = None):
+        self.path = path or get_plugin_data().data_dir / "platform_state.json"
+        self._data: dict[str, dict[str, Any]] = {}
+
+    async def load_all(self) -> dict[StateKey, Any]:
+        if self.path.exists():
+            self._data = json.loads(await asyncio.to_thread(self.path.read_text, "utf-8"))
+        return {
+            (state_key, Target(target)): data
+            for state_key, target_states in self._data.items()
+            for target, data in target_states.items()
+        }
+
+    async def save(self, states: dict[StateKey, Any]):
+        if not states:
+            return
+        for (state_key, target), data in states.items():
+            self._data.setdefault(state_key, {})[target] = data
+        content = json.dumps(self._data, ensure_ascii=False)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        await asyncio.to_thread(self.path.write_text, content, "utf-8")
+
+
+def _get_state_store() -> StateStore | None:
+    match plugin_config.bison_state_store:
+        case "db":
+            return DBStateStore()
+        case "file":
+            return FileStateStore()
+        case _:
+            return None
+
+
+state_store: StateStore | None = _get_state_store()
+
+
+async def load_platform_states():
+    """启动时一次性读取所有抓取状态，恢复到各平台的 store 中"""
+    if not state_store:
+        return
+    states = await state_store.load_all()
+    platforms = {platform.get_state_key(): platform for platform in Platform.registry}
+    count = 0
+    for (state_key, target), data in states.items():
+        if not (platform := platforms.get(state_key)):
+            continue
+        try:
+            platform.store[target] = platform.load_stored_data(data)
+        except Exception as err:
+            logger.warning(f"恢复 {state_key}-{target} 的抓取状态失败: {err!r}")
+            continue
+        count += 1
+    logger.info(f"恢复了 {count} 条平台抓取状态")
+
+
+async def flush_platform_states():
+    """将有变动的抓取状态批量写入存储"""
+    if not state_store:
+        return
+    states: dict[StateKey, Any] = {}
+    for platform in Platform.registry:
+        if not platform.dirty_targets:
+            continue
+        dirty_targets = platform.dirty_targets.copy()
+        platform.dirty_targets.clear()
+        state_key = platform.get_state_key()
+        for target in dirty_targets:
+            states[state_key, target] = platform.dump_stored_data(platform.store.get(target))
+    if not states:
+        return
+    try:
+        await state_store.save(states)
+    except Exception as err:
+        logger.error(f"保存平台抓取状态失败: {err!r}")
+        # 写入失败时保留脏标记，等待下一次写入
+        for platform in Platform.registry:
+            state_key = platform.get_state_key()
+            platform.dirty_targets.update(target for key, target in states if key == state_key)
+        return
+    logger.trace(f"保存了 {len(states)} 条平台抓取状态")
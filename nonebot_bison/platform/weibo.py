@@ -1,3 +1,4 @@
+import asyncio
 from datetime import datetime
 import json
 import re
@@ -13,7 +14,8 @@ from yarl import URL
 
 from nonebot_bison.post import Post
 from nonebot_bison.types import ApiError, Category, RawPost, Tag, Target
-from nonebot_bison.utils import http_client, text_fletten
+from nonebot_bison.utils import decode_json, http_client, text_fletten
+from nonebot_bison.utils.image_cache import image_cache
 from nonebot_bison.utils.site import CookieClientManager, Site
 
 from .platform import NewMessage
@@ -43,9 +45,9 @@ class WeiboClientManager(CookieClientManager):
 
     async def _get_current_user_name(self, cookies: dict) -> str:
         url = "https://m.weibo.cn/setup/nick/detail"
-        async with http_client() as client:
+        async with http_client(pool=self.pool_name) as client:
             r = await client.get(url, headers=_HEADER, cookies=cookies)
-            data = json.loads(r.text)
+            data = decode_json(r.content)
             name = data["data"]["user"]["screen_name"]
             return name
 
@@ -65,9 +67,9 @@ class WeiboClientManager(CookieClientManager):
 
         return client
 
-    @classmethod
-    async def get_query_name_client(cls) -> AsyncClient:
-        client = http_client()
+    @override
+    async def get_query_name_client(self) -> AsyncClient:
+        client = http_client(pool=self.pool_name)
 
         if len(client.cookies) == 0:
             client.cookies.update({"dummycookie": "1"})
@@ -107,7 +109,7 @@ class Weibo(NewMessage):
             "sec-fetch-mode": "cors",
         }
         res = await client.get(f"https://m.weibo.cn/api/container/getIndex?type=uid&value={target}", headers=header)
-        res_dict = json.loads(res.text)
+        res_dict = decode_json(res.content)
         if res_dict.get("ok") == 1:
             return res_dict["data"]["userInfo"]["screen_name"]
         else:
@@ -129,7 +131,8 @@ class Weibo(NewMessage):
         # 获取 cookie 见 https://docs.rsshub.app/zh/deploy/config#%E5%BE%AE%E5%8D%9A
         params = {"containerid": "107603" + target}
         res = await client.get("https://m.weibo.cn/api/container/getIndex?", headers=header, params=params, timeout=4.0)
-        res_data = json.loads(res.text)
+        self.check_body_changed(target, res.content)
+        res_data = decode_json(res.content)
         if not res_data["ok"] and res_data["msg"] != "这里还没有内容":
             raise ApiError(res.request.url)
 
@@ -204,7 +207,7 @@ class Weibo(NewMessage):
                 params={"id": weibo_id},
                 headers=_HEADER,
             )
-            weibo_info = weibo_info.json()
+            weibo_info = decode_json(weibo_info.content)
             if not weibo_info or weibo_info["ok"] != 1:
                 return {}
             return weibo_info["data"]
@@ -224,12 +227,8 @@ class Weibo(NewMessage):
             pic_urls.append(
                 f"{URL(crop_url).scheme}://{URL(crop_url).host}/large/{info['page_info']['page_pic']['pid']}"
             )
-        pics = []
-        for pic_url in pic_urls:
-            async with http_client(headers={"referer": "https://weibo.com"}) as client:
-                res = await client.get(pic_url)
-                res.raise_for_status()
-                pics.append(res.content)
+        async with http_client(pool=self.site.name, headers={"referer": "https://weibo.com"}) as client:
+            pics = list(await asyncio.gather(*(image_cache.get_file(pic_url, client) for pic_url in pic_urls)))
         detail_url = f"https://weibo.com/{info['user']['id']}/{info['bid']}"
         return Post(
             self,
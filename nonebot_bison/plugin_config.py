@@ -1,3 +1,5 @@
+from typing import Literal
+
 import nonebot
 from nonebot import get_plugin_config
 from nonebot.compat import PYDANTIC_V2, ConfigDict
@@ -7,6 +9,7 @@ from yarl import URL
 global_config = nonebot.get_driver().config
 PlatformName = str
 ThemeName = str
+SiteName = str
 
 
 class PlugConfig(BaseModel):
@@ -34,14 +37,54 @@ class PlugConfig(BaseModel):
     bison_use_pic_merge: int = 0  # 多图片时启用图片合并转发（仅限群）
     # 0：不启用；1：首条消息单独发送，剩余照片合并转发；2以及以上：所有消息全部合并转发
     bison_resend_times: int = 0
+    bison_send_rate: float = Field(default=10, description="每个 Bot 每秒最多发送的消息数，0 表示不限制")
+    bison_send_burst: int = Field(default=20, description="每个 Bot 允许突发发送的消息数")
+    bison_persist_send_queue: bool = Field(default=True, description="是否将发送队列中尚未发出的消息保存到数据库")
+    bison_send_queue_flush_interval: int = Field(default=5, description="发送队列写入数据库的间隔（秒）")
     bison_proxy: str | None = None
     bison_ua: str = Field(
         "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko)"
         " Chrome/130.0.0.0 Safari/537.36 Edg/130.0.0.0",
         description="默认UA",
     )
+    bison_http_max_connections: int = Field(default=100, description="每个 Site 连接池的最大连接数")
+    bison_http_max_keepalive_connections: int = Field(default=20, description="每个 Site 连接池保持的最大空闲连接数")
+    bison_http_keepalive_expiry: float = Field(default=30, description="空闲连接的保持时间（秒）")
+    bison_http2: bool = Field(default=True, description="在安装了 h2 时启用 HTTP/2")
+    bison_fast_json: bool = Field(default=True, description="在安装了 orjson 时使用 orjson 解析 JSON 响应")
+    bison_dedup_max_size: int = Field(default=1000, description="每个订阅目标保留的用于去重的 post id 数量上限")
+    bison_subscriber_cache: bool = Field(default=True, description="在内存中缓存订阅者信息，多进程共用数据库时需要关闭")
+    bison_state_store: Literal["db", "file", "none"] = Field(
+        default="db", description="平台抓取状态的持久化方式，none 表示不持久化"
+    )
+    bison_state_flush_interval: int = Field(default=30, description="抓取状态写入存储的间隔（秒）")
+    bison_image_cache_memory_size: int = Field(default=64, description="内存中图片缓存的大小上限（MB）")
+    bison_image_cache_disk_size: int = Field(
+        default=512, description="磁盘中图片缓存的大小上限（MB），0 表示不使用磁盘缓存"
+    )
+    bison_image_spool_threshold: int = Field(
+        default=1024, description="超过此大小（KB）的图片下载时直接写入磁盘缓存，0 表示不启用"
+    )
+    bison_image_max_edge: int = Field(
+        default=0, description="发送前将长边超过此像素数的图片缩小并重新编码，0 表示不处理"
+    )
+    bison_image_format: Literal["jpeg", "webp"] = Field(default="jpeg", description="缩小后图片的编码格式")
+    bison_image_quality: int = Field(default=85, description="缩小后图片的编码质量（1-100）")
+    bison_image_download_per_host: int = Field(default=4, description="合并图片时同一个域名同时下载的图片数量上限")
+    bison_skip_unchanged_response: bool = Field(
+        default=True, description="订阅目标的动态列表与上次完全相同时跳过解析与过滤"
+    )
+    bison_page_pool_size: int = Field(
+        default=4, description="复用的浏览器页面数量上限，同时也是同时渲染的页面数量上限，0 表示不复用页面"
+    )
+    bison_page_pool_max_uses: int = Field(default=50, description="浏览器页面复用多少次后重新创建")
+    bison_parse_concurrency: int = Field(default=5, description="同一个订阅目标同时解析的 post 数量上限")
+    bison_cookie_flush_interval: int = Field(default=10, description="cookie 使用记录写回数据库的间隔（秒）")
     bison_show_network_warning: bool = True
     bison_platform_theme: dict[PlatformName, ThemeName] = {}
+    bison_site_fetch_width: dict[SiteName, int] = Field(
+        default={}, description="为 Site 指定每次调度同时抓取的 target 数量"
+    )
 
     @property
     def outer_url(self) -> URL:
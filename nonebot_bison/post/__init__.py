@@ -1 +1,2 @@
 from .post import Post as Post
+from .render_cache import RenderCache as RenderCache
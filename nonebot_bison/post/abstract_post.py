@@ -1,10 +1,12 @@
 from abc import ABC, abstractmethod
+import asyncio
+from collections.abc import Hashable
 from dataclasses import dataclass
 
-from nonebot_plugin_saa import MessageFactory, MessageSegmentFactory, Text
+from nonebot_plugin_saa import Image, MessageFactory, MessageSegmentFactory, Text
 
 from nonebot_bison.plugin_config import plugin_config
-from nonebot_bison.utils import text_to_image
+from nonebot_bison.utils import http_client, normalize_image, text_to_image
 
 
 @dataclass(kw_only=True)
@@ -17,6 +19,15 @@ class AbstractPost(ABC):
         "Generate MessageSegmentFactory list from this instance"
         ...
 
+    def get_render_key(self) -> Hashable:
+        "渲染结果缓存的 key，包含 Post 实例本身以及会影响渲染结果的配置项"
+        return (
+            id(self),
+            plugin_config.bison_use_pic,
+            plugin_config.bison_use_browser,
+            plugin_config.bison_image_max_edge,
+        )
+
     async def generate_messages(self) -> list[MessageFactory]:
         "really call to generate messages"
         msg_segments = await self.generate()
@@ -34,10 +45,27 @@ class AbstractPost(ABC):
                 return msg
 
         if plugin_config.bison_use_pic:
-            return [await convert(msg) for msg in msg_segments]
+            msg_segments = [await convert(msg) for msg in msg_segments]
+
+        if plugin_config.bison_image_max_edge > 0:
+            msg_segments = await self.normalize_images(msg_segments)
 
         return msg_segments
 
+    async def normalize_images(self, msg_segments: list[MessageSegmentFactory]) -> list[MessageSegmentFactory]:
+        "缩小过大的图片，见 `normalize_image`"
+
+        async def normalize(msg: MessageSegmentFactory, client) -> MessageSegmentFactory:
+            if not isinstance(msg, Image):
+                return msg
+            image = await normalize_image(msg.data["image"], client)
+            if image is msg.data["image"]:
+                return msg
+            return Image(image, msg.data["name"])
+
+        async with http_client() as client:
+            return list(await asyncio.gather(*(normalize(msg, client) for msg in msg_segments)))
+
     async def message_process(self, msg_segments: list[MessageSegmentFactory]) -> list[MessageFactory]:
         "generate messages and process them"
         if self.compress:
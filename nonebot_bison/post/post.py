@@ -1,4 +1,4 @@
-from collections.abc import Sequence
+from collections.abc import Hashable, Sequence
 from dataclasses import dataclass, fields
 from io import BytesIO
 from pathlib import Path
@@ -65,6 +65,9 @@ class Post(AbstractPost, PlainContentSupport):
             themes_by_priority.append("basic")
         return themes_by_priority
 
+    def get_render_key(self) -> Hashable:
+        return (*super().get_render_key(), tuple(self.get_priority_themes()))
+
     async def get_content(self):
         return self.content
 
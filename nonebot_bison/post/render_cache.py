@@ -0,0 +1,31 @@
+from collections.abc import Hashable
+
+from nonebot_plugin_saa import MessageFactory
+
+from .abstract_post import AbstractPost
+
+
+class RenderCache:
+    """单次抓取内的渲染结果缓存
+
+    同一个 Post 会被分发给多个订阅者，使用 `AbstractPost.get_render_key` 作为 key，
+    保证每个 Post 在同一套配置下只渲染一次，渲染结果由所有订阅者共享
+    """
+
+    def __init__(self) -> None:
+        self._cache: dict[Hashable, list[MessageFactory]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def generate_messages(self, post: AbstractPost) -> list[MessageFactory]:
+        key = post.get_render_key()
+        if (msgs := self._cache.get(key)) is not None:
+            self.hits += 1
+            return msgs
+        self.misses += 1
+        msgs = await post.generate_messages()
+        self._cache[key] = msgs
+        return msgs
+
+    def clear(self):
+        self._cache.clear()
@@ -11,6 +11,7 @@ from nonebot_bison.utils import Site
 from nonebot_bison.utils.site import CookieClientManager, is_cookie_client_manager
 
 from .scheduler import Scheduler
+from .weight import weight_index
 
 scheduler_dict: dict[type[Site], Scheduler] = {}
 
@@ -48,19 +49,29 @@ async def init_scheduler():
         if is_cookie_client_manager(site.client_mgr):
             client_mgr = cast(CookieClientManager, scheduler_dict[site].client_mgr)
             await client_mgr.refresh_client()
+    await weight_index.refresh()
+    if plugin_config.bison_subscriber_cache:
+        await config.refresh_subscriber_index()
     config.register_add_target_hook(handle_insert_new_target)
     config.register_delete_target_hook(handle_delete_target)
+    config.register_update_weight_hook(handle_update_weight)
 
 
 async def handle_insert_new_target(platform_name: str, target: T_Target):
+    weight_index.invalidate()
     platform = platform_manager[platform_name]
     scheduler_obj = scheduler_dict[platform.site]
     scheduler_obj.insert_new_schedulable(platform_name, target)
 
 
 async def handle_delete_target(platform_name: str, target: T_Target):
+    weight_index.invalidate()
     if platform_name not in platform_manager:
         return
     platform = platform_manager[platform_name]
     scheduler_obj = scheduler_dict[platform.site]
     scheduler_obj.delete_schedulable(platform_name, target)
+
+
+async def handle_update_weight(platform_name: str, target: T_Target):
+    weight_index.invalidate()
@@ -1,18 +1,32 @@
+import asyncio
 from collections import defaultdict
 from dataclasses import dataclass
+import time
 
 from nonebot.log import logger
 from nonebot_plugin_apscheduler import scheduler
-from nonebot_plugin_saa.utils.exceptions import NoBotFound
 
 from nonebot_bison.config import config
-from nonebot_bison.metrics import render_time_histogram, request_counter, request_time_histogram, sent_counter
+from nonebot_bison.metrics import (
+    render_cache_counter,
+    render_queue_wait_histogram,
+    render_time_histogram,
+    request_counter,
+    request_time_histogram,
+    sent_counter,
+)
 from nonebot_bison.platform import platform_manager
-from nonebot_bison.send import send_msgs
+from nonebot_bison.platform.platform import group_destinations
+from nonebot_bison.plugin_config import plugin_config
+from nonebot_bison.post import RenderCache
+from nonebot_bison.send import broadcast_msgs
 from nonebot_bison.types import SubUnit, Target
 from nonebot_bison.utils import ClientManager, ProcessContext, Site
+from nonebot_bison.utils.page_pool import record_page_wait
 from nonebot_bison.utils.site import SkipRequestException
 
+from .weight import DEFAULT_WEIGHT, weight_index
+
 
 @dataclass
 class Schedulable:
@@ -40,6 +54,8 @@ class Scheduler:
             raise RuntimeError(f"{self.name} not found")
         self.scheduler_config = scheduler_config
         self.client_mgr = scheduler_config.client_mgr()
+        # 同一个 Site 的所有请求共用一个连接池
+        self.client_mgr.pool_name = scheduler_config.name
         self.scheduler_config_obj = self.scheduler_config()
 
         self.schedulable_list = []
@@ -54,6 +70,8 @@ class Scheduler:
 
         self.platform_name_list = platform_name_list
         self.pre_weight_val = 0  # 轮调度中“本轮”增加权重和的初值
+        self.fetch_width = max(1, plugin_config.bison_site_fetch_width.get(self.name, scheduler_config.fetch_width))
+        self.fetch_semaphore = asyncio.Semaphore(self.fetch_width)
         logger.info(
             f"register scheduler for {self.name} with "
             f"{self.scheduler_config.schedule_type} {self.scheduler_config.schedule_setting}"
@@ -73,13 +91,38 @@ class Scheduler:
     async def get_next_schedulable(self) -> Schedulable | None:
         if not self.schedulable_list:
             return None
-        cur_weight = await config.get_current_weight_val(self.platform_name_list)
+        cur_weight = await weight_index.get_current_weight_val(self.platform_name_list)
+        return self._select_schedulable(cur_weight)
+
+    async def get_next_schedulables(self, count: int) -> list[Schedulable]:
+        """按平滑加权轮询连续选出 count 次，去掉重复的 Schedulable
+
+        同一个使用批量接口的平台一次只会选出一个，因为一次批量抓取已经包含了该平台的所有 target
+        """
+        if not self.schedulable_list:
+            return []
+        cur_weight = await weight_index.get_current_weight_val(self.platform_name_list)
+        res: list[Schedulable] = []
+        for _ in range(count):
+            schedulable = self._select_schedulable(cur_weight)
+            if any(selected is schedulable for selected in res):
+                continue
+            if schedulable.use_batch and any(
+                selected.use_batch and selected.platform_name == schedulable.platform_name for selected in res
+            ):
+                continue
+            res.append(schedulable)
+        return res
+
+    def _select_schedulable(self, cur_weight: dict[str, int]) -> Schedulable:
         weight_sum = self.pre_weight_val
         self.pre_weight_val = 0
         cur_max_schedulable = None
         for schedulable in self.schedulable_list:
-            schedulable.current_weight += cur_weight[f"{schedulable.platform_name}-{schedulable.target}"]
-            weight_sum += cur_weight[f"{schedulable.platform_name}-{schedulable.target}"]
+            # 刚添加的 target 可能还没有进入权重索引
+            weight = cur_weight.get(f"{schedulable.platform_name}-{schedulable.target}", DEFAULT_WEIGHT)
+            schedulable.current_weight += weight
+            weight_sum += weight
             if not cur_max_schedulable or cur_max_schedulable.current_weight < schedulable.current_weight:
                 cur_max_schedulable = schedulable
         assert cur_max_schedulable
@@ -87,15 +130,31 @@ class Scheduler:
         return cur_max_schedulable
 
     async def exec_fetch(self):
-        if not (schedulable := await self.get_next_schedulable()):
+        if not (schedulables := await self.get_next_schedulables(self.fetch_width)):
+            return
+        if len(schedulables) == 1:
+            await self._exec_schedulable_fetch(schedulables[0])
             return
-        logger.trace(f"scheduler {self.name} fetching next target: [{schedulable.platform_name}]{schedulable.target}")
+        results = await asyncio.gather(
+            *(self._exec_schedulable_fetch(schedulable) for schedulable in schedulables), return_exceptions=True
+        )
+        for schedulable, result in zip(schedulables, results):
+            if isinstance(result, Exception):
+                logger.opt(exception=result).error(
+                    f"scheduler {self.name} fetch [{schedulable.platform_name}]{schedulable.target} failed"
+                )
+
+    async def _exec_schedulable_fetch(self, schedulable: Schedulable):
+        async with self.fetch_semaphore:
+            logger.trace(
+                f"scheduler {self.name} fetching next target: [{schedulable.platform_name}]{schedulable.target}"
+            )
 
-        context = ProcessContext(self.client_mgr)
-        try:
-            await self._run_schedulable_fetch(context, schedulable)
-        finally:
-            await context.cleanup()
+            context = ProcessContext(self.client_mgr)
+            try:
+                await self._run_schedulable_fetch(context, schedulable)
+            finally:
+                await context.cleanup()
 
     async def _run_schedulable_fetch(self, context: ProcessContext, schedulable: Schedulable) -> None:
         success_flag = False
@@ -107,10 +166,10 @@ class Scheduler:
             ).time():
                 if schedulable.use_batch:
                     batch_targets = self.batch_api_target_cache[schedulable.platform_name][schedulable.target]
-                    sub_units = []
-                    for batch_target in batch_targets:
-                        userinfo = await config.get_platform_target_subscribers(schedulable.platform_name, batch_target)
-                        sub_units.append(SubUnit(batch_target, userinfo))
+                    subscribers = await config.get_platform_targets_subscribers(
+                        schedulable.platform_name, batch_targets
+                    )
+                    sub_units = [SubUnit(batch_target, subscribers[batch_target]) for batch_target in batch_targets]
                     to_send = await platform_obj.do_batch_fetch_new_post(sub_units)
                 else:
                     send_userinfo_list = await config.get_platform_target_subscribers(
@@ -140,19 +199,29 @@ class Scheduler:
             site_name=platform_obj.site.name,
             target=schedulable.target,
         ).inc()
-        with render_time_histogram.labels(
-            platform_name=schedulable.platform_name, site_name=platform_obj.site.name
-        ).time():
-            for user, send_list in to_send:
-                for send_post in send_list:
-                    logger.info(f"send to {user}: {send_post}")
-                    try:
-                        await send_msgs(
-                            user,
-                            await send_post.generate_messages(),
-                        )
-                    except NoBotFound:
-                        logger.warning("no bot connected")
+        # 同一个 Post 会分发给多个订阅者，渲染结果在本次抓取内共享
+        render_cache = RenderCache()
+        # 渲染耗时不包括等待浏览器页面的时间，后者单独统计
+        render_time = wait_time = 0.0
+        for users, send_list in group_destinations(to_send):
+            for send_post in send_list:
+                logger.info(f"send to {', '.join(map(str, users))}: {send_post}")
+                start = time.perf_counter()
+                with record_page_wait() as page_waits:
+                    msgs = await render_cache.generate_messages(send_post)
+                page_wait = sum(page_waits)
+                wait_time += page_wait
+                render_time += time.perf_counter() - start - page_wait
+                # 同一组订阅者作为一个整体交给发送层
+                await broadcast_msgs(users, msgs)
+        metric_labels = {"platform_name": schedulable.platform_name, "site_name": platform_obj.site.name}
+        render_time_histogram.labels(**metric_labels).observe(render_time)
+        render_queue_wait_histogram.labels(**metric_labels).observe(wait_time)
+        for hit, count in ((True, render_cache.hits), (False, render_cache.misses)):
+            if count:
+                render_cache_counter.labels(
+                    platform_name=schedulable.platform_name, site_name=platform_obj.site.name, hit=hit
+                ).inc(count)
 
     def insert_new_schedulable(self, platform_name: str, target: Target):
         self.pre_weight_val += 1000
@@ -0,0 +1,88 @@
+from bisect import bisect_right
+from collections.abc import Sequence
+from datetime import time
+
+from nonebot.log import logger
+from nonebot_plugin_datastore import create_session
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from nonebot_bison.config import db_config
+from nonebot_bison.config.db_model import ScheduleTimeWeight, Target
+from nonebot_bison.types import Target as T_Target
+
+DEFAULT_WEIGHT = 10
+
+
+def _to_seconds(t: time) -> int:
+    return t.hour * 3600 + t.minute * 60 + t.second
+
+
+class TargetWeight:
+    """单个 target 一天内的权重
+
+    把时间段配置预先展开成按边界排序的区间，查询时只需要二分查找一次
+    """
+
+    def __init__(self, default: int, time_weights: Sequence[ScheduleTimeWeight]):
+        boundaries = {0}
+        for time_conf in time_weights:
+            boundaries.add(_to_seconds(time_conf.start_time))
+            boundaries.add(_to_seconds(time_conf.end_time))
+        self.boundaries = sorted(boundaries)
+        self.weights = []
+        for boundary in self.boundaries:
+            weight = default
+            # 与逐条匹配的语义保持一致：取第一条命中的时间段
+            for time_conf in time_weights:
+                if _to_seconds(time_conf.start_time) <= boundary < _to_seconds(time_conf.end_time):
+                    weight = time_conf.weight
+                    break
+            self.weights.append(weight)
+
+    def get(self, cur_time: time) -> int:
+        return self.weights[bisect_right(self.boundaries, _to_seconds(cur_time)) - 1]
+
+
+class WeightIndex:
+    """调度权重的内存索引
+
+    在 init_scheduler 时构建，权重配置修改或 target 增删时失效，下一次查询时重新从数据库读取。
+    读取期间如果再次失效，读到的结果可能已经过时，不会被保存
+    """
+
+    def __init__(self):
+        self._index: dict[str, dict[T_Target, TargetWeight]] | None = None
+        self._generation = 0
+
+    async def refresh(self) -> dict[str, dict[T_Target, TargetWeight]]:
+        generation = self._generation
+        async with create_session() as sess:
+            targets = (await sess.scalars(select(Target).options(selectinload(Target.time_weight)))).all()
+            index: dict[str, dict[T_Target, TargetWeight]] = {}
+            for target in targets:
+                index.setdefault(target.platform_name, {})[T_Target(target.target)] = TargetWeight(
+                    target.default_schedule_weight, target.time_weight
+                )
+        if generation == self._generation:
+            self._index = index
+            logger.trace(f"weight index refreshed with {len(targets)} targets")
+        else:
+            logger.trace("weight index invalidated while refreshing, not cached")
+        return index
+
+    def invalidate(self):
+        self._generation += 1
+        self._index = None
+
+    async def get_current_weight_val(self, platform_list: list[str]) -> dict[str, int]:
+        index = self._index if self._index is not None else await self.refresh()
+        cur_time = db_config._get_time()
+        res = {}
+        for platform_name in platform_list:
+            for target, target_weight in index.get(platform_name, {}).items():
+                res[f"{platform_name}-{target}"] = target_weight.get(cur_time)
+        return res
+
+
+weight_index = WeightIndex()
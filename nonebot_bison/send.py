@@ -1,32 +1,143 @@
 import asyncio
+import base64
 from collections import deque
+from collections.abc import Iterable, Sequence
+from io import BytesIO
+from pathlib import Path
+import time
+from typing import Any
 
+from nonebot.adapters import Bot
 from nonebot.adapters.onebot.v11.exception import ActionFailed
 from nonebot.log import logger
-from nonebot_plugin_saa import AggregatedMessageFactory, MessageFactory, PlatformTarget
-from nonebot_plugin_saa.auto_select_bot import refresh_bots
+from nonebot_plugin_saa import AggregatedMessageFactory, Image, MessageFactory, PlatformTarget, Text
+from nonebot_plugin_saa.auto_select_bot import get_bot, refresh_bots
+from nonebot_plugin_saa.utils.exceptions import NoBotFound
 
+from .config import config
 from .plugin_config import plugin_config
+from .utils.image_cache import image_cache
 
 Sendable = MessageFactory | AggregatedMessageFactory
 
-QUEUE: deque[tuple[PlatformTarget, Sendable, int]] = deque()
-
+# 同一个发送对象两条消息之间的间隔
 MESSGE_SEND_INTERVAL = 1.5
 
+# 启动时每次从数据库读取的待发送消息数量
+PENDING_LOAD_PAGE_SIZE = 100
+
 _MESSAGE_DISPATCH_TASKS: set[asyncio.Task] = set()
 
 
-async def _do_send(send_target: PlatformTarget, msg: Sendable):
+def _image_paths(msg: Sendable) -> list[Path]:
+    factories = msg.message_factories if isinstance(msg, AggregatedMessageFactory) else [msg]
+    return [
+        seg.data["image"]
+        for factory in factories
+        for seg in factory
+        if isinstance(seg, Image) and isinstance(seg.data["image"], Path)
+    ]
+
+
+class PendingPayload:
+    """一条待发送的消息，以及尚未发给的发送对象
+
+    同一条消息发给多个发送对象时共用一个 PendingPayload，在数据库中也只保存一条记录。
+    消息中引用的图片缓存文件在全部发出（或放弃）之前不会被清理
+    """
+
+    def __init__(
+        self, msg: Sendable, retry_time: int, targets: Iterable[PlatformTarget], pending_id: int | None = None
+    ):
+        self.msg = msg
+        self.retry_time = retry_time
+        self.targets = set(targets)
+        # 数据库中对应记录的 id，尚未写入时为 None
+        self.pending_id = pending_id
+        # 发送对象有变化，需要在下一次写入时更新
+        self.dirty = pending_id is None
+        self._pinned = _image_paths(msg)
+        for path in self._pinned:
+            image_cache.pin(path)
+
+    def pin(self, path: Path):
+        """记录由 `image_cache.store` 写入并占用的文件"""
+        self._pinned.append(path)
+
+    def finish(self, send_target: PlatformTarget):
+        """发给 send_target 的消息已发出或放弃发送"""
+        self.targets.discard(send_target)
+        self.dirty = True
+        if not self.targets:
+            self.release()
+
+    def release(self):
+        """释放占用的图片缓存文件"""
+        pinned, self._pinned = self._pinned, []
+        for path in pinned:
+            image_cache.unpin(path)
+
+
+# 每个发送对象一个队列，由各自的 worker 依次发送，不同发送对象之间互不阻塞
+# 队列中为 (消息, 剩余重试次数)
+QUEUES: dict[PlatformTarget, deque[tuple[PendingPayload, int]]] = {}
+
+# 需要保存到数据库的消息，由 `flush_pending_msgs` 定期批量写入，按入队顺序排列
+_PAYLOADS: dict[PendingPayload, None] = {}
+
+
+class TokenBucket:
+    """令牌桶，限制同一个 Bot 整体的发送速率
+
+    rate 为每秒补充的令牌数，不大于 0 时不限速；capacity 为允许的突发数量
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self._tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+
+_buckets: dict[str, TokenBucket] = {}
+
+
+def _get_bucket(bot: Bot) -> TokenBucket:
+    """每个 Bot 一个令牌桶，多个 Bot 时发送速率随之增加"""
+    key = f"{bot.adapter.get_name()}:{bot.self_id}"
+    if (bucket := _buckets.get(key)) is None:
+        bucket = TokenBucket(plugin_config.bison_send_rate, plugin_config.bison_send_burst)
+        _buckets[key] = bucket
+    return bucket
+
+
+async def _do_send(send_target: PlatformTarget, msg: Sendable, bot: Bot | None = None):
     try:
-        await msg.send_to(send_target)
+        await msg.send_to(send_target, bot)
     except ActionFailed:  # TODO: catch exception of other adapters
         await refresh_bots()
         logger.warning("send msg failed, refresh bots")
 
 
-async def do_send_msgs():
-    if not QUEUE:
+async def do_send_msgs(send_target: PlatformTarget):
+    queue = QUEUES.get(send_target)
+    if not queue:
         return
     while True:
         # why read from queue then pop item from queue?
@@ -34,51 +145,232 @@ async def do_send_msgs():
         # the length of queue will be 0.
         # At that time, adding items to queue will trigger a new execution of this func, which is not expected.
         # So, read from queue first then pop from it
-        send_target, msg_factory, retry_time = QUEUE[0]
+        payload, retry_time = queue[0]
         try:
-            await _do_send(send_target, msg_factory)
+            bot = get_bot(send_target)
+            await _get_bucket(bot).acquire()
+            await _do_send(send_target, payload.msg, bot)
         except Exception as e:
             await asyncio.sleep(MESSGE_SEND_INTERVAL)
-            QUEUE.popleft()
+            queue.popleft()
             if retry_time > 0:
-                QUEUE.appendleft((send_target, msg_factory, retry_time - 1))
+                queue.appendleft((payload, retry_time - 1))
             else:
-                msg_str = str(msg_factory)
+                payload.finish(send_target)
+                msg_str = str(payload.msg)
                 if len(msg_str) > 50:
                     msg_str = msg_str[:50] + "..."
                 logger.warning(f"send msg err {e} {msg_str}")
         else:
+            payload.finish(send_target)
             # sleeping after popping may also cause re-execution error like above mentioned
             await asyncio.sleep(MESSGE_SEND_INTERVAL)
-            QUEUE.popleft()
+            queue.popleft()
         finally:
-            if not QUEUE:
+            if not queue:
+                QUEUES.pop(send_target, None)
                 return
 
 
-async def _send_msgs_dispatch(send_target: PlatformTarget, msg: Sendable):
+def _enqueue(send_target: PlatformTarget, payload: PendingPayload):
+    queue = QUEUES.setdefault(send_target, deque())
+    queue.append((payload, payload.retry_time))
+    # len(queue) before append was 0
+    if len(queue) == 1:
+        task = asyncio.create_task(do_send_msgs(send_target))
+        _MESSAGE_DISPATCH_TASKS.add(task)
+        task.add_done_callback(_MESSAGE_DISPATCH_TASKS.discard)
+
+
+async def _send_msgs_dispatch(send_targets: Sequence[PlatformTarget], msg: Sendable):
     if plugin_config.bison_use_queue:
-        QUEUE.append((send_target, msg, plugin_config.bison_resend_times))
-        # len(QUEUE) before append was 0
-        if len(QUEUE) == 1:
-            task = asyncio.create_task(do_send_msgs())
-            _MESSAGE_DISPATCH_TASKS.add(task)
-            task.add_done_callback(_MESSAGE_DISPATCH_TASKS.discard)
-    else:
-        await _do_send(send_target, msg)
+        payload = PendingPayload(msg, plugin_config.bison_resend_times, send_targets)
+        if plugin_config.bison_persist_send_queue:
+            # 入队时不写数据库，由 flush_pending_msgs 定期批量写入
+            _PAYLOADS[payload] = None
+        for send_target in send_targets:
+            _enqueue(send_target, payload)
+        return
+    for send_target in send_targets:
+        try:
+            await _do_send(send_target, msg)
+        except NoBotFound:
+            logger.warning(f"no bot connected for {send_target}")
 
 
-async def send_msgs(send_target: PlatformTarget, msgs: list[MessageFactory]):
+async def broadcast_msgs(send_targets: Sequence[PlatformTarget], msgs: list[MessageFactory]):
+    """把同一组消息发给多个发送对象，消息只合并一次，各发送对象共用同一个消息对象"""
+    if not send_targets:
+        return
     if not plugin_config.bison_use_pic_merge:
         for msg in msgs:
-            await _send_msgs_dispatch(send_target, msg)
+            await _send_msgs_dispatch(send_targets, msg)
         return
     msgs = msgs.copy()
     if plugin_config.bison_use_pic_merge == 1:
-        await _send_msgs_dispatch(send_target, msgs.pop(0))
+        await _send_msgs_dispatch(send_targets, msgs.pop(0))
     if msgs:
         if len(msgs) == 1:  # 只有一条消息序列就不合并转发
-            await _send_msgs_dispatch(send_target, msgs.pop(0))
+            await _send_msgs_dispatch(send_targets, msgs.pop(0))
         else:
             forward_message = AggregatedMessageFactory(list(msgs))
-            await _send_msgs_dispatch(send_target, forward_message)
+            await _send_msgs_dispatch(send_targets, forward_message)
+
+
+async def send_msgs(send_target: PlatformTarget, msgs: list[MessageFactory]):
+    await broadcast_msgs([send_target], msgs)
+
+
+def _dump_image(image: str | bytes | BytesIO | Path, payload: PendingPayload | None) -> dict[str, str]:
+    """图片保存为 URL 或磁盘缓存中的内容哈希，不使用磁盘缓存时才保存图片内容本身"""
+    if isinstance(image, str):
+        return {"url": image}
+    if isinstance(image, Path):
+        if content_hash := image_cache.object_hash(image):
+            return {"object": content_hash}
+        content = image.read_bytes()
+    else:
+        content = image.getvalue() if isinstance(image, BytesIO) else image
+    if (object_path := image_cache.store(content)) is None:
+        return {"base64": base64.b64encode(content).decode()}
+    if payload is None:
+        image_cache.unpin(object_path)
+    else:
+        payload.pin(object_path)
+    return {"object": object_path.name}
+
+
+def _dump_message_factory(msg: MessageFactory, payload: PendingPayload | None) -> list[dict[str, Any]] | None:
+    segments = []
+    for seg in msg:
+        if isinstance(seg, Text):
+            segments.append({"type": "text", "text": seg.data["text"]})
+        elif isinstance(seg, Image):
+            segments.append({"type": "image", "name": seg.data["name"], **_dump_image(seg.data["image"], payload)})
+        else:
+            # 其他消息段与适配器相关，无法通用地序列化
+            return None
+    return segments
+
+
+def dump_sendable(msg: Sendable, payload: PendingPayload | None = None) -> dict[str, Any] | None:
+    """序列化待发送的消息，包含无法序列化的消息段时返回 None
+
+    写入磁盘缓存的图片由 payload 占用，直到消息全部发出
+    """
+    if isinstance(msg, AggregatedMessageFactory):
+        factories = [_dump_message_factory(factory, payload) for factory in msg.message_factories]
+        if any(factory is None for factory in factories):
+            return None
+        return {"type": "aggregated", "messages": factories}
+    if (segments := _dump_message_factory(msg, payload)) is None:
+        return None
+    return {"type": "message", "segments": segments}
+
+
+def _load_message_factory(segments: list[dict[str, Any]]) -> MessageFactory:
+    msg = MessageFactory()
+    for seg in segments:
+        if seg["type"] == "text":
+            msg.append(Text(seg["text"]))
+        elif "url" in seg:
+            msg.append(Image(seg["url"], seg["name"]))
+        elif "object" in seg:
+            if (path := image_cache.object_file(seg["object"])) is None:
+                logger.warning(f"待发送消息中的图片 {seg['object']} 已被清理，忽略")
+                continue
+            msg.append(Image(path, seg["name"]))
+        else:
+            msg.append(Image(base64.b64decode(seg["base64"]), seg["name"]))
+    return msg
+
+
+def load_sendable(data: dict[str, Any]) -> Sendable:
+    if data["type"] == "aggregated":
+        return AggregatedMessageFactory([_load_message_factory(segments) for segments in data["messages"]])
+    return _load_message_factory(data["segments"])
+
+
+async def flush_pending_msgs():
+    """将发送队列的变化批量写入数据库
+
+    新消息写入一条记录，部分发出的消息更新剩余的发送对象，全部发出的消息删除记录；
+    在两次写入之间就已全部发出的消息不会写入数据库
+    """
+    if not plugin_config.bison_persist_send_queue:
+        return
+    dirty = [payload for payload in _PAYLOADS if payload.dirty]
+    new: list[tuple[Any, list[PlatformTarget], int]] = []
+    new_payloads: list[PendingPayload] = []
+    updated: dict[int, list[PlatformTarget]] = {}
+    for payload in dirty:
+        payload.dirty = False
+        if payload.pending_id is not None:
+            updated[payload.pending_id] = list(payload.targets)
+            continue
+        if not payload.targets:
+            _PAYLOADS.pop(payload, None)
+            continue
+        data = await asyncio.to_thread(dump_sendable, payload.msg, payload)
+        if not payload.targets:
+            # 序列化期间已经全部发出
+            payload.release()
+            _PAYLOADS.pop(payload, None)
+            continue
+        if data is None:
+            logger.warning(f"无法保存待发送的消息: {str(payload.msg)[:50]}")
+            _PAYLOADS.pop(payload, None)
+            continue
+        new.append((data, list(payload.targets), payload.retry_time))
+        new_payloads.append(payload)
+    if not new and not updated:
+        return
+    try:
+        pending_ids = await config.save_pending_messages(new, updated)
+    except Exception:
+        logger.exception("保存待发送的消息失败")
+        # 写入失败时保留标记，等待下一次写入
+        for payload in dirty:
+            if payload in _PAYLOADS:
+                payload.dirty = True
+        return
+    for payload, pending_id in zip(new_payloads, pending_ids):
+        payload.pending_id = pending_id
+    for payload in dirty:
+        if not payload.targets and not payload.dirty:
+            _PAYLOADS.pop(payload, None)
+    logger.trace(f"保存了 {len(new)} 条、更新了 {len(updated)} 条待发送的消息")
+
+
+_restored_msgs: list[PendingPayload] = []
+
+
+async def load_pending_msgs():
+    """启动时分批读取尚未发出的消息，等到 bot 连接后再放回队列"""
+    if not plugin_config.bison_persist_send_queue:
+        return
+    after_id = 0
+    while pending := await config.get_pending_messages(after_id, PENDING_LOAD_PAGE_SIZE):
+        for pending_id, send_targets, data, retry_time in pending:
+            try:
+                payload = PendingPayload(load_sendable(data), retry_time, send_targets, pending_id)
+            except Exception as err:
+                logger.warning(f"恢复待发送的消息 {pending_id} 失败: {err!r}")
+                # 无法恢复的记录在下一次写入时删除
+                payload = PendingPayload(MessageFactory(), retry_time, [], pending_id)
+                payload.dirty = True
+                _PAYLOADS[payload] = None
+                continue
+            _restored_msgs.append(payload)
+        after_id = pending[-1][0]
+    if _restored_msgs:
+        logger.info(f"恢复了 {len(_restored_msgs)} 条待发送的消息")
+
+
+def restore_pending_msgs():
+    """把读取到的待发送消息放回队列"""
+    while _restored_msgs:
+        payload = _restored_msgs.pop(0)
+        _PAYLOADS[payload] = None
+        for send_target in payload.targets:
+            _enqueue(send_target, payload)
@@ -16,6 +16,7 @@ class ThemeManager:
             raise ThemeRegistrationError(f"Theme {theme.name} duplicated registration")
         if theme.need_browser and not plugin_config.bison_use_browser:
             logger.opt(colors=True).warning(f"Theme <b><u>{theme.name}</u></b> requires browser, but not allowed")
+        theme.load_assets()
         self.__themes[theme.name] = theme
         logger.opt(colors=True).success(f"Theme <b><u>{theme.name}</u></b> registered")
 
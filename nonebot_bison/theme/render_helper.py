@@ -1,6 +1,33 @@
+from os import PathLike
+from pathlib import Path
 from typing import Any, Literal
 
 import jinja2
+from nonebot_plugin_datastore import get_plugin_data
+
+from nonebot_bison.utils.page_pool import get_page
+
+_template_envs: dict[str, jinja2.Environment] = {}
+
+
+def get_template_env(template_path: str | PathLike[str]) -> jinja2.Environment:
+    """获取模板目录对应的 jinja2 环境，每个目录只创建一次
+
+    编译好的模板保存在环境中重复使用，字节码同时缓存在插件缓存目录，重启后不需要重新编译
+    """
+    template_dir = str(Path(template_path).resolve())
+    if (env := _template_envs.get(template_dir)) is None:
+        bytecode_dir = get_plugin_data().cache_dir / "jinja2"
+        bytecode_dir.mkdir(parents=True, exist_ok=True)
+        env = jinja2.Environment(
+            loader=jinja2.FileSystemLoader(template_dir),
+            enable_async=True,
+            bytecode_cache=jinja2.FileSystemBytecodeCache(str(bytecode_dir)),
+            # 主题模板随插件发布，运行时不会修改，不需要每次检查文件是否更新
+            auto_reload=False,
+        )
+        _template_envs[template_dir] = env
+    return env
 
 
 async def html_to_pic(
@@ -12,10 +39,8 @@ async def html_to_pic(
     screenshot_timeout: float | None = 30_000,
     **kwargs,
 ) -> bytes:
-    from nonebot_plugin_htmlrender.browser import get_new_page
-
     """html转图片，使用about:blank而不是file://路径"""
-    async with get_new_page(device_scale_factor, **kwargs) as page:
+    async with get_page(device_scale_factor, **kwargs) as page:
         await page.goto("about:blank")
         await page.set_content(html, wait_until="networkidle")
         await page.wait_for_timeout(wait)
@@ -61,14 +86,12 @@ async def template_to_pic(
             "viewport": {"width": 500, "height": 10},
         }
 
-    template_env = jinja2.Environment(
-        loader=jinja2.FileSystemLoader(template_path),
-        enable_async=True,
-    )
+    template_env = get_template_env(template_path)
 
     if filters:
-        for filter_name, filter_func in filters.items():
-            template_env.filters[filter_name] = filter_func
+        # 自定义过滤器只在本次渲染中生效，不修改共用的环境
+        template_env = template_env.overlay()
+        template_env.filters = {**template_env.filters, **filters}
 
     template = template_env.get_template(template_name)
 
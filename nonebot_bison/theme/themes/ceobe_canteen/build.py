@@ -1,4 +1,3 @@
-import base64
 from collections.abc import Sequence
 from datetime import datetime
 from io import BytesIO
@@ -6,25 +5,24 @@ from os import PathLike
 from pathlib import Path
 from typing import TYPE_CHECKING, Literal
 
-import anyio
-from anyio import Path as AIOPath
 from httpx import AsyncClient
-import jinja2
 from nonebot_plugin_saa import Image, MessageSegmentFactory, Text
 from PIL import Image as PILImage
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 from yarl import URL
 
 from nonebot_bison.compat import model_validator
 from nonebot_bison.theme import Theme, ThemeRenderError, ThemeRenderUnsupportError
+from nonebot_bison.theme.render_helper import get_template_env
 from nonebot_bison.theme.utils import convert_to_qr, web_embed_image
 from nonebot_bison.utils import is_pics_mergable, pic_merge
+from nonebot_bison.utils.page_pool import get_page
 
 if TYPE_CHECKING:
     from nonebot_bison.post import Post
 
 
-async def embed_image_as_data_url(image_path: str | PathLike[str]) -> str:
+def embed_image_as_data_url(image_path: str | PathLike[str]) -> str:
     """读取图片文件并返回base64数据URL字符串
 
     Args:
@@ -33,13 +31,11 @@ async def embed_image_as_data_url(image_path: str | PathLike[str]) -> str:
     Returns:
         base64格式的data URL字符串
     """
-    _path = AIOPath(image_path)
-    if not await _path.exists():
+    _path = Path(image_path)
+    if not _path.exists():
         return ""
 
-    async with await anyio.open_file(_path, "rb") as f:
-        image_data = base64.b64encode(await f.read()).decode()
-        return f"data:image/png;base64,{image_data}"
+    return web_embed_image(_path)
 
 
 class CeobeInfo(BaseModel):
@@ -103,6 +99,14 @@ class CeobeCanteenTheme(Theme):
     template_path: Path = Path(__file__).parent / "templates"
     template_name: str = "ceobe_canteen.html.jinja"
 
+    _logo_data: dict[str, str] = PrivateAttr(default_factory=dict)
+
+    def load_assets(self):
+        self._logo_data = {
+            "bison_logo": embed_image_as_data_url(self.template_path / "bison_logo.png"),
+            "ceobe_logo": embed_image_as_data_url(self.template_path / "ceobecanteen_logo.png"),
+        }
+
     async def parse(self, post: "Post") -> tuple[CeobeCard, list[str | bytes | Path | BytesIO]]:
         """解析 Post 为 CeobeCard与处理好的图片列表"""
         if not post.nickname:
@@ -205,26 +209,20 @@ class CeobeCanteenTheme(Theme):
                 case _:
                     raise ThemeRenderError(f"Unknown image type: {type(merged_images[0])}")
 
-        from nonebot_plugin_htmlrender import get_new_page
-
-        template_env = jinja2.Environment(
-            loader=jinja2.FileSystemLoader(self.template_path),
-            enable_async=True,
-        )
-        template = template_env.get_template(self.template_name)
+        template = get_template_env(self.template_path).get_template(self.template_name)
 
-        # 获取嵌入的图片数据
-        bison_logo_data = await embed_image_as_data_url(self.template_path / "bison_logo.png")
-        ceobe_logo_data = await embed_image_as_data_url(self.template_path / "ceobecanteen_logo.png")
+        # 嵌入的图片数据在注册时已经读取
+        if not self._logo_data:
+            self.load_assets()
 
-        html = await template.render_async(card=ceobe_card, bison_logo=bison_logo_data, ceobe_logo=ceobe_logo_data)
+        html = await template.render_async(card=ceobe_card, **self._logo_data)
         pages = {
             "device_scale_factor": 2,
             "viewport": {"width": 512, "height": 455},
             "base_url": self.template_path.as_uri(),
         }
         try:
-            async with get_new_page(**pages) as page:
+            async with get_page(**pages) as page:
                 await page.goto("about:blank")
                 await page.set_content(html)
                 await page.wait_for_timeout(1)
@@ -28,6 +28,10 @@ class Theme(ABC, BaseModel):
             return False
         return True
 
+    def load_assets(self):
+        """注册时调用，用于预先加载主题使用的静态资源，避免每次渲染时重复读取"""
+        pass
+
     async def prepare(self):
         if self.need_browser:
             self.check_htmlrender_plugin_enable()
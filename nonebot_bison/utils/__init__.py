@@ -8,13 +8,20 @@ import nonebot
 from nonebot.log import default_format, logger
 from nonebot.plugin import require
 from nonebot_plugin_saa import Image, MessageSegmentFactory, Text
+from rapidfuzz.distance import LCSseq
 
 from nonebot_bison.plugin_config import plugin_config
 
 from .context import ProcessContext as ProcessContext
+from .dedup import RecentIdSet as RecentIdSet
+from .http import NotModified as NotModified
+from .http import commit_validators as commit_validators
+from .http import conditional_get as conditional_get
+from .http import decode_json as decode_json
 from .http import http_client as http_client
 from .image import capture_html as capture_html
 from .image import is_pics_mergable as is_pics_mergable
+from .image import normalize_image as normalize_image
 from .image import pic_merge as pic_merge
 from .image import pic_url_to_image as pic_url_to_image
 from .image import text_to_image as text_to_image
@@ -94,13 +101,21 @@ if plugin_config.bison_filter_log:
     default_filter.level = ("DEBUG" if config.debug else "INFO") if config.log_level is None else config.log_level
 
 
-def text_similarity(str1: str, str2: str) -> float:
-    """利用最长公共子序列的算法判断两个字符串是否相似，并返回0到1.0的相似度"""
+def text_similarity(str1: str, str2: str, threshold: float | None = None) -> float:
+    """利用最长公共子序列的算法判断两个字符串是否相似，并返回0到1.0的相似度
+
+    相似度由 difflib 的匹配块计算；匹配块总长不超过最长公共子序列，
+    因此先用 rapidfuzz 的位并行算法求出上界，上界不超过 threshold 时直接返回上界，
+    省去对长文本代价较高的 difflib 匹配，结果与 threshold 的比较不受影响
+    """
     if len(str1) == 0 or len(str2) == 0:
         raise ValueError("The length of string can not be 0")
+    shortest = min(len(str1), len(str2))
+    if threshold is not None and (upper := LCSseq.similarity(str1, str2) / shortest) <= threshold:
+        return upper
     matcher = difflib.SequenceMatcher(None, str1, str2)
     t = sum(temp.size for temp in matcher.get_matching_blocks())
-    return t / min(len(str1), len(str2))
+    return t / shortest
 
 
 def decode_unicode_escapes(s: str):
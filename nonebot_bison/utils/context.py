@@ -84,7 +84,10 @@ class ProcessContext:
         self._static_client = None
 
     async def cleanup(self):
-        """关闭所有创建的 HTTP 客户端,释放资源"""
+        """关闭所有创建的 HTTP 客户端,释放资源
+
+        client 使用 Site 的共享连接池，关闭 client 不会断开池中的连接
+        """
         for client in self._clients:
             await client.aclose()
         self._clients.clear()
@@ -0,0 +1,153 @@
+from datetime import datetime
+import heapq
+
+from nonebot.log import logger
+
+from nonebot_bison.config import config
+from nonebot_bison.config.db_model import Cookie
+from nonebot_bison.types import Target
+
+# (可用时刻 或 最后使用时刻, cookie id, 版本号)
+_HeapEntry = tuple[datetime, int, int]
+
+
+class CookiePool:
+    """单个 Site 的内存 cookie 池
+
+    冷却中的 cookie 按 `last_usage + cd`（即下一次可用的时刻）放在等待堆中，冷却结束后移入按 `last_usage`
+    排序的可用堆，选择 cookie 时只需要查看堆顶，语义与逐个比较时一致：可用 cookie 中最久未使用的优先。
+    cookie 的使用记录（`last_usage`、`status`）先写在内存中，由 `flush` 定期批量写回数据库；
+    数据库中的 cookie 或 cookie 与 target 的关联发生变化时，池会被标记为过期，下一次使用时重新读取
+    """
+
+    def __init__(self, site_name: str):
+        self.site_name = site_name
+        self.stale = True
+        self._cookies: dict[int, Cookie] = {}
+        self._target_cookie_ids: dict[Target, set[int]] = {}
+        self._waiting: list[_HeapEntry] = []
+        self._ready: list[_HeapEntry] = []
+        self._versions: dict[int, int] = {}
+        self._dirty: set[int] = set()
+
+    async def _reload(self):
+        cookies = await config.get_cookie(self.site_name)
+        target_cookie_ids = await config.get_site_cookie_targets(self.site_name)
+
+        old_cookies = self._cookies
+        self._cookies = {}
+        self._waiting = []
+        self._ready = []
+        for cookie in cookies:
+            if cookie.id in self._dirty and (old_cookie := old_cookies.get(cookie.id)):
+                # 保留尚未写回数据库的使用记录
+                cookie.last_usage = old_cookie.last_usage
+                cookie.status = old_cookie.status
+            self._cookies[cookie.id] = cookie
+            self._push(cookie)
+        self._dirty &= self._cookies.keys()
+        self._target_cookie_ids = target_cookie_ids
+        self.stale = False
+        logger.trace(f"cookie pool {self.site_name} loaded {len(self._cookies)} cookies")
+
+    def _push(self, cookie: Cookie):
+        version = self._versions.get(cookie.id, 0) + 1
+        self._versions[cookie.id] = version
+        heapq.heappush(self._waiting, (cookie.last_usage + cookie.cd, cookie.id, version))
+
+    def _is_valid(self, entry: _HeapEntry) -> bool:
+        _, cookie_id, version = entry
+        return cookie_id in self._cookies and self._versions.get(cookie_id) == version
+
+    def _promote(self, now: datetime):
+        """把冷却结束的 cookie 从等待堆移入可用堆"""
+        while self._waiting and self._waiting[0][0] < now:
+            entry = heapq.heappop(self._waiting)
+            if self._is_valid(entry):
+                _, cookie_id, version = entry
+                heapq.heappush(self._ready, (self._cookies[cookie_id].last_usage, cookie_id, version))
+
+    def _match(self, cookie: Cookie, target: Target | None, is_anonymous: bool | None) -> bool:
+        if is_anonymous is not None and cookie.is_anonymous != is_anonymous:
+            return False
+        if target and not cookie.is_universal:
+            return cookie.id in self._target_cookie_ids.get(target, ())
+        return True
+
+    async def choose(self, target: Target | None, is_anonymous: bool | None = None) -> Cookie | None:
+        """选出满足条件、已冷却且最久未使用的 cookie，没有可用的 cookie 时返回 None"""
+        if self.stale:
+            await self._reload()
+        self._promote(datetime.now())
+        skipped: list[_HeapEntry] = []
+        chosen = None
+        while self._ready:
+            entry = heapq.heappop(self._ready)
+            if not self._is_valid(entry):
+                # 已被重新使用或删除的 cookie，直接丢弃
+                continue
+            skipped.append(entry)
+            cookie = self._cookies[entry[1]]
+            if self._match(cookie, target, is_anonymous):
+                chosen = cookie
+                break
+        for entry in skipped:
+            heapq.heappush(self._ready, entry)
+        return chosen
+
+    async def get_cookies(self, is_anonymous: bool | None = None) -> list[Cookie]:
+        """获取池中的 cookie，不考虑冷却时间"""
+        if self.stale:
+            await self._reload()
+        return [
+            cookie for cookie in self._cookies.values() if is_anonymous is None or cookie.is_anonymous == is_anonymous
+        ]
+
+    def mark_used(self, cookie: Cookie, status: str):
+        """记录一次 cookie 的使用，等待下一次 flush 时写回数据库"""
+        if not (pool_cookie := self._cookies.get(cookie.id)):
+            return
+        pool_cookie.last_usage = cookie.last_usage = datetime.now()
+        pool_cookie.status = cookie.status = status
+        self._push(pool_cookie)
+        self._dirty.add(pool_cookie.id)
+
+    async def flush(self):
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, set()
+        usages = [
+            (cookie_id, self._cookies[cookie_id].last_usage, self._cookies[cookie_id].status)
+            for cookie_id in dirty
+            if cookie_id in self._cookies
+        ]
+        try:
+            await config.update_cookies_usage(usages)
+        except Exception as err:
+            logger.warning(f"写回 {self.site_name} 的 cookie 使用记录失败: {err!r}")
+            self._dirty |= dirty
+            return
+        logger.trace(f"cookie pool {self.site_name} flushed {len(usages)} cookies")
+
+
+_cookie_pools: dict[str, CookiePool] = {}
+
+
+def get_cookie_pool(site_name: str) -> CookiePool:
+    if (pool := _cookie_pools.get(site_name)) is None:
+        pool = CookiePool(site_name)
+        _cookie_pools[site_name] = pool
+    return pool
+
+
+async def invalidate_cookie_pools():
+    for pool in _cookie_pools.values():
+        pool.stale = True
+
+
+async def flush_cookie_pools():
+    for pool in _cookie_pools.values():
+        await pool.flush()
+
+
+config.register_cookie_change_hook(invalidate_cookie_pools)
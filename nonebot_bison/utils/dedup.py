@@ -0,0 +1,59 @@
+from collections.abc import Iterable, Iterator
+import sys
+import time
+from typing import Any
+
+
+class RecentIdSet:
+    """有界的 post id 去重集合
+
+    记录每个 id 对应的发布时间（无法获取发布时间时为 None），并按最后一次出现的顺序排列：
+    - 有发布时间的 id 超出时间窗口后淘汰，这些 post 本身也会被 `filter_common` 过滤
+    - 总数超过 `max_size` 时，淘汰最久未出现的 id
+    """
+
+    def __init__(self, max_size: int, items: Iterable[tuple[Any, float | None]] = ()):
+        self.max_size = max_size
+        self._ids: dict[Any, float | None] = dict(items)
+
+    def __contains__(self, post_id: Any) -> bool:
+        return post_id in self._ids
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._ids)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, RecentIdSet):
+            return self._ids.keys() == other._ids.keys()
+        if isinstance(other, set | frozenset):
+            return self._ids.keys() == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"RecentIdSet({list(self._ids)!r})"
+
+    def add(self, post_id: Any, post_time: float | None = None):
+        """添加或刷新一个 id，刷新后视为最近出现"""
+        self._ids.pop(post_id, None)
+        self._ids[post_id] = post_time
+
+    def items(self) -> list[tuple[Any, float | None]]:
+        return list(self._ids.items())
+
+    def evict(self, window: float | None, now: float | None = None):
+        """淘汰超出时间窗口与容量的 id，window 为 None 时只按容量淘汰"""
+        if window is not None:
+            deadline = (now or time.time()) - window
+            expired = [post_id for post_id, post_time in self._ids.items() if post_time and post_time < deadline]
+            for post_id in expired:
+                del self._ids[post_id]
+        if (overflow := len(self._ids) - self.max_size) > 0:
+            for post_id in list(self._ids)[:overflow]:
+                del self._ids[post_id]
+
+    def memory_size(self) -> int:
+        """估算占用的内存（字节），不包含 id 本身"""
+        return sys.getsizeof(self._ids)
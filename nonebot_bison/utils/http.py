@@ -1,5 +1,12 @@
+from collections.abc import Hashable
+from importlib.util import find_spec
+import json
+from typing import Any
+
 import httpx
+from nonebot.log import logger
 
+from nonebot_bison.metrics import not_modified_counter, not_modified_saved_bytes_counter
 from nonebot_bison.plugin_config import plugin_config
 
 http_args = {
@@ -7,12 +14,195 @@ http_args = {
 }
 http_headers = {"user-agent": plugin_config.bison_ua}
 
+DEFAULT_POOL = "default"
+
+# 作用于传输层的参数，共享连接池无法按 client 区分，传入时不使用共享连接池
+_TRANSPORT_ARGS = frozenset({"verify", "cert", "http1", "http2", "limits", "proxy", "transport", "mounts"})
+
+
+class SharedTransport(httpx.AsyncBaseTransport):
+    """长期存活的连接池传输层
+
+    同一个连接池的所有 client 共用一个 `SharedTransport`，
+    client 的 `aclose` 不会关闭底层连接池，只有 `close_shared_transports` 才会真正关闭
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport) -> None:
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._transport.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        # client 关闭时保留连接池，供后续请求复用
+        pass
+
+    async def close(self) -> None:
+        await self._transport.aclose()
+
+
+_shared_transports: dict[str, SharedTransport] = {}
+
+
+class PooledTransport(httpx.AsyncBaseTransport):
+    """在每次请求时才获取共享连接池的传输层
+
+    适合在导入时创建、长期持有的场景（如外层包装了缓存的传输层），
+    `close_shared_transports` 之后的请求会使用重新创建的连接池，而不是已经关闭的那个
+    """
+
+    def __init__(self, pool: str = DEFAULT_POOL) -> None:
+        self.pool = pool
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await get_shared_transport(self.pool).handle_async_request(request)
+
+    async def aclose(self) -> None:
+        pass
+
+
+def _http2_available() -> bool:
+    return plugin_config.bison_http2 and find_spec("h2") is not None
+
+
+_HAS_ORJSON = find_spec("orjson") is not None
+
 
-def http_client(*args, **kwargs):
+def decode_json(content: bytes | str) -> Any:
+    """解析 JSON 响应内容
+
+    直接传入 `Response.content`，不必先按编码解码出 `Response.text`；
+    安装了 orjson 时使用 orjson 解析，orjson 不支持的内容（如超出 64 位的整数）回退到标准库
+    """
+    if plugin_config.bison_fast_json and _HAS_ORJSON:
+        import orjson
+
+        try:
+            return orjson.loads(content)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(content)
+
+
+def build_transport() -> httpx.AsyncHTTPTransport:
+    """按照插件配置构建一个带连接池的传输层"""
+    return httpx.AsyncHTTPTransport(
+        limits=httpx.Limits(
+            max_connections=plugin_config.bison_http_max_connections,
+            max_keepalive_connections=plugin_config.bison_http_max_keepalive_connections,
+            keepalive_expiry=plugin_config.bison_http_keepalive_expiry,
+        ),
+        http2=_http2_available(),
+        **http_args,
+    )
+
+
+def get_shared_transport(pool: str = DEFAULT_POOL) -> SharedTransport:
+    """获取指定名称的共享连接池，不存在时创建"""
+    if (transport := _shared_transports.get(pool)) is None:
+        transport = SharedTransport(build_transport())
+        _shared_transports[pool] = transport
+        logger.trace(f"创建共享连接池: {pool}")
+    return transport
+
+
+async def close_shared_transports():
+    """关闭所有共享连接池"""
+    for transport in _shared_transports.values():
+        await transport.close()
+    _shared_transports.clear()
+
+
+def http_client(*args, pool: str = DEFAULT_POOL, **kwargs):
+    """获取一个使用共享连接池的 client
+
+    client 本身只携带 headers、cookies、event_hooks 等请求状态，可以随用随建、用完即关，
+    连接由 `pool` 对应的共享传输层维护并在 client 之间复用。
+    传入 `verify`、`cert`、`http2`、`limits`、`proxy`、`transport` 等作用于传输层的参数时，
+    这些参数无法应用到共享连接池上，此时忽略 `pool`，创建使用独立传输层的 client，连接不会在 client 之间复用
+    """
     if headers := kwargs.get("headers"):
         new_headers = http_headers.copy()
         new_headers.update(headers)
         kwargs["headers"] = new_headers
     else:
         kwargs["headers"] = http_headers
-    return httpx.AsyncClient(*args, **kwargs, **http_args)
+    if _TRANSPORT_ARGS.isdisjoint(kwargs):
+        transport = get_shared_transport(pool)
+        if http_args["proxy"]:
+            # 代理已经配置在共享传输层上，通过 mounts 指定，避免 httpx 再创建一个代理传输层
+            kwargs["mounts"] = {"all://": transport}
+        else:
+            kwargs["transport"] = transport
+        return httpx.AsyncClient(*args, **kwargs)
+    return httpx.AsyncClient(*args, **{**http_args, **kwargs})
+
+
+class NotModified(Exception):
+    """条件请求返回 304，内容与上次请求时相同"""
+
+
+# (key, url) -> (ETag, Last-Modified, 上次响应的大小)
+ValidatorKey = tuple[Hashable, str]
+Validator = tuple[str | None, str | None, int]
+_validators: dict[ValidatorKey, Validator] = {}
+
+
+async def conditional_get(
+    client: httpx.AsyncClient,
+    url: str,
+    *,
+    key: Hashable = None,
+    revalidate: bool = True,
+    pending: dict[ValidatorKey, Validator | None] | None = None,
+    **kwargs,
+) -> httpx.Response:
+    """带有 ETag / Last-Modified 校验的 GET 请求
+
+    按 `key`（如订阅目标）与 url 保存上次响应的校验信息，再次请求时附带
+    `If-None-Match` / `If-Modified-Since`，服务器返回 304 时抛出 `NotModified`，调用方可以直接跳过解析。
+    `revalidate` 为 False 时不附带校验信息，用于调用方丢失了上次结果的情况。
+
+    传入 `pending` 时新的校验信息只写入 `pending`，调用方处理完响应后再调用 `commit_validators` 保存，
+    避免解析失败的内容在之后的请求中一直得到 304 而不再重试
+    """
+    cache_key = (key, url)
+    validator = _validators.get(cache_key) if revalidate else None
+    if validator is not None:
+        headers = dict(kwargs.pop("headers", None) or {})
+        etag, last_modified, _ = validator
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        kwargs["headers"] = headers
+    res = await client.get(url, **kwargs)
+    if res.status_code == 304:
+        if validator is None:
+            # 没有发送校验信息却得到 304，响应中没有内容可供解析
+            raise httpx.HTTPStatusError(
+                f"Unexpected 304 Not Modified without validators for url '{url}'", request=res.request, response=res
+            )
+        host = res.url.host
+        not_modified_counter.labels(host=host).inc()
+        not_modified_saved_bytes_counter.labels(host=host).inc(validator[2])
+        raise NotModified(url)
+    if res.is_success:
+        etag, last_modified = res.headers.get("etag"), res.headers.get("last-modified")
+        new_validator = (etag, last_modified, len(res.content)) if etag or last_modified else None
+        if pending is None:
+            commit_validators({cache_key: new_validator})
+        else:
+            pending[cache_key] = new_validator
+    return res
+
+
+def commit_validators(pending: dict[ValidatorKey, Validator | None], key: Hashable = ...):
+    """保存 `conditional_get` 写入 `pending` 的校验信息，指定 `key` 时只保存对应的部分"""
+    for cache_key in list(pending):
+        if key is not ... and cache_key[0] != key:
+            continue
+        if (validator := pending.pop(cache_key)) is None:
+            _validators.pop(cache_key, None)
+        else:
+            _validators[cache_key] = validator
@@ -1,6 +1,9 @@
+import asyncio
+from collections import OrderedDict
 from collections.abc import Sequence
-from functools import partial
+import hashlib
 from io import BytesIO
+from pathlib import Path
 from typing import Literal, TypeGuard
 
 from httpx import AsyncClient
@@ -13,39 +16,63 @@ from yarl import URL
 
 from nonebot_bison.plugin_config import plugin_config
 
+from .image_cache import image_cache
+from .page_pool import get_page
 
-async def pic_url_to_image(data: str | bytes, http_client: AsyncClient) -> PILImage:
-    pic_buffer = BytesIO()
+# 转码结果按 (源图片哈希, 转码参数) 缓存，None 表示无需转码，直接使用原图
+_TRANSCODE_CACHE_SIZE = 128
+_transcoded: OrderedDict[tuple, bytes | None] = OrderedDict()
+
+
+def _open_image(data: bytes | Path) -> PILImage:
+    image = Image.open(data if isinstance(data, Path) else BytesIO(data))
+    # Image.open 只读取文件头，在线程中完成解码
+    image.load()
+    return image
+
+
+async def pic_url_to_image(data: str | bytes | Path, http_client: AsyncClient) -> PILImage:
     if isinstance(data, str):
-        res = await http_client.get(data)
-        pic_buffer.write(res.content)
-    else:
-        pic_buffer.write(data)
-    return Image.open(pic_buffer)
+        data = await image_cache.get_file(data, http_client)
+    return await asyncio.to_thread(_open_image, data)
+
+
+async def _pics_to_images(pics: Sequence[str | bytes | Path], http_client: AsyncClient) -> list[PILImage]:
+    return list(await asyncio.gather(*(pic_url_to_image(pic, http_client) for pic in pics)))
 
 
 def _check_image_square(size: tuple[int, int]) -> bool:
     return abs(size[0] - size[1]) / size[0] < 0.05
 
 
-async def pic_merge(pics: list[str | bytes], http_client: AsyncClient) -> list[str | bytes]:
+def _merge_images(images: list[PILImage], matrix: tuple[int, int], x_coord: list[int], y_coord: list[int]) -> bytes:
+    target = Image.new("RGB", (x_coord[-1], y_coord[-1]))
+    for y in range(matrix[1]):
+        for x in range(matrix[0]):
+            target.paste(
+                images[y * matrix[0] + x],
+                (x_coord[x], y_coord[y], x_coord[x + 1], y_coord[y + 1]),
+            )
+    target_io = BytesIO()
+    target.save(target_io, "JPEG")
+    return target_io.getvalue()
+
+
+async def pic_merge(pics: list[str | bytes | Path], http_client: AsyncClient) -> list[str | bytes | Path]:
     if len(pics) < 3:
         return pics
 
-    _pic_url_to_image = partial(pic_url_to_image, http_client=http_client)
-
-    first_image = await _pic_url_to_image(pics[0])
+    # 先并发获取第一行，满足条件后再并发获取剩下的完整行
+    images: list[PILImage] = await _pics_to_images(pics[:3], http_client)
+    first_image = images[0]
     if not _check_image_square(first_image.size):
         return pics
-    images: list[PILImage] = [first_image]
     # first row
-    for i in range(1, 3):
-        cur_img = await _pic_url_to_image(pics[i])
+    for cur_img in images[1:]:
         if not _check_image_square(cur_img.size):
             return pics
         if cur_img.size[1] != images[0].size[1]:  # height not equal
             return pics
-        images.append(cur_img)
     _tmp = 0
     x_coord = [0]
     for i in range(3):
@@ -53,58 +80,115 @@ async def pic_merge(pics: list[str | bytes], http_client: AsyncClient) -> list[s
         x_coord.append(_tmp)
     y_coord = [0, first_image.size[1]]
 
-    async def process_row(row: int) -> bool:
-        if len(pics) < (row + 1) * 3:
+    row_count = min(len(pics) // 3, 3)
+    rest_images = await _pics_to_images(pics[3 : row_count * 3], http_client)
+
+    def process_row(row: int) -> bool:
+        if row >= row_count:
             return False
-        row_first_img = await _pic_url_to_image(pics[row * 3])
+        image_row = rest_images[(row - 1) * 3 : row * 3]
+        row_first_img = image_row[0]
         if not _check_image_square(row_first_img.size):
             return False
         if row_first_img.size[0] != images[0].size[0]:
             return False
-        image_row: list[PILImage] = [row_first_img]
-        for i in range(row * 3 + 1, row * 3 + 3):
-            cur_img = await _pic_url_to_image(pics[i])
+        for i, cur_img in enumerate(image_row[1:], start=1):
             if not _check_image_square(cur_img.size):
                 return False
             if cur_img.size[1] != row_first_img.size[1]:
                 return False
-            if cur_img.size[0] != images[i % 3].size[0]:
+            if cur_img.size[0] != images[i].size[0]:
                 return False
-            image_row.append(cur_img)
         images.extend(image_row)
         y_coord.append(y_coord[-1] + row_first_img.size[1])
         return True
 
-    if await process_row(1):
+    if process_row(1):
         matrix = (3, 2)
+        if process_row(2):
+            matrix = (3, 3)
     else:
         matrix = (3, 1)
-    if await process_row(2):
-        matrix = (3, 3)
     logger.info("trigger merge image")
-    target = Image.new("RGB", (x_coord[-1], y_coord[-1]))
-    for y in range(matrix[1]):
-        for x in range(matrix[0]):
-            target.paste(
-                images[y * matrix[0] + x],
-                (x_coord[x], y_coord[y], x_coord[x + 1], y_coord[y + 1]),
-            )
-    target_io = BytesIO()
-    target.save(target_io, "JPEG")
+    merged = await asyncio.to_thread(_merge_images, images, matrix, x_coord, y_coord)
     pics = pics[matrix[0] * matrix[1] :]
-    pics.insert(0, target_io.getvalue())
+    pics.insert(0, merged)
 
     return pics
 
 
-def is_pics_mergable(imgs: Sequence) -> TypeGuard[list[str | bytes]]:
-    if any(not isinstance(img, str | bytes) for img in imgs):
+def is_pics_mergable(imgs: Sequence) -> TypeGuard[list[str | bytes | Path]]:
+    if any(not isinstance(img, str | bytes | Path) for img in imgs):
         return False
 
     url = [URL(img) for img in imgs if isinstance(img, str)]
     return all(u.scheme in ("http", "https") for u in url)
 
 
+def _transcode(data: bytes, max_edge: int, format: str, quality: int) -> bytes | None:
+    image = Image.open(BytesIO(data))
+    # 动图与尺寸没有超出限制的图片保持原样
+    if getattr(image, "is_animated", False) or max(image.size) <= max_edge:
+        return None
+    image.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+    if format == "JPEG" and image.mode != "RGB":
+        image = image.convert("RGB")
+    output = BytesIO()
+    image.save(output, format, quality=quality)
+    return output.getvalue()
+
+
+def _read_local_image(image: bytes | Path | BytesIO) -> bytes:
+    if isinstance(image, Path):
+        return image.read_bytes()
+    if isinstance(image, BytesIO):
+        return image.getvalue()
+    return image
+
+
+async def _read_image_source(image: str | bytes | Path | BytesIO, http_client: AsyncClient) -> bytes | None:
+    if not isinstance(image, str):
+        return await asyncio.to_thread(_read_local_image, image)
+    if URL(image).scheme not in ("http", "https"):
+        # 其他形式的字符串（如 base64://、file://）交给适配器处理
+        return None
+    content = await image_cache.get_file(image, http_client)
+    if isinstance(content, Path):
+        return await asyncio.to_thread(content.read_bytes)
+    return content
+
+
+async def normalize_image(
+    image: str | bytes | Path | BytesIO, http_client: AsyncClient
+) -> str | bytes | Path | BytesIO:
+    """将长边超过 `bison_image_max_edge` 的图片缩小并重新编码
+
+    转码在线程中完成，结果按源图片的内容哈希缓存，同一张图片发给多个订阅者时只转码一次；
+    无需转码或转码失败时返回原图
+    """
+    max_edge = plugin_config.bison_image_max_edge
+    if max_edge <= 0:
+        return image
+    try:
+        if (data := await _read_image_source(image, http_client)) is None:
+            return image
+        format = plugin_config.bison_image_format.upper()
+        quality = plugin_config.bison_image_quality
+        key = (hashlib.blake2b(data, digest_size=16).digest(), max_edge, format, quality)
+        if key in _transcoded:
+            _transcoded.move_to_end(key)
+            result = _transcoded[key]
+        else:
+            result = await asyncio.to_thread(_transcode, data, max_edge, format, quality)
+            _transcoded[key] = result
+            if len(_transcoded) > _TRANSCODE_CACHE_SIZE:
+                _transcoded.popitem(last=False)
+    except Exception as e:
+        logger.warning(f"图片转码失败，使用原图: {e}")
+        return image
+    return image if result is None else result
+
+
 async def text_to_image(saa_text: SaaText) -> SaaImage:
     """使用 htmlrender 将 saa.Text 渲染为 saa.Image"""
     if not plugin_config.bison_use_pic:
@@ -132,11 +216,8 @@ async def capture_html(
 
     timeout: 超时时间，单位毫秒
     """
-    require("nonebot_plugin_htmlrender")
-    from nonebot_plugin_htmlrender import get_new_page
-
     assert url
-    async with get_new_page(device_scale_factor=device_scale_factor, viewport=viewport, **page_kwargs) as page:
+    async with get_page(device_scale_factor=device_scale_factor, viewport=viewport, **page_kwargs) as page:
         await page.goto(url, timeout=timeout, wait_until=wait_until)
         pic_data = await page.locator(selector).screenshot(
             type=type,
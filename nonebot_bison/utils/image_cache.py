@@ -0,0 +1,335 @@
+import asyncio
+from collections import OrderedDict
+import hashlib
+from pathlib import Path
+import threading
+import time
+from typing import BinaryIO
+from uuid import uuid4
+
+from httpx import AsyncClient, Cookies
+from nonebot.log import logger
+from nonebot_plugin_datastore import get_plugin_data
+from yarl import URL
+
+from nonebot_bison.plugin_config import plugin_config
+
+from .http import http_client as pooled_client
+
+_host_semaphores: dict[str, asyncio.Semaphore] = {}
+
+# 图片下载使用的共享连接池
+IMAGE_POOL = "images"
+
+# 返回给调用方的文件路径在这段时间内不会被清理，足够完成从抓取到放入发送队列的过程
+HANDOUT_PIN_SECONDS = 600
+
+
+def _get_host_semaphore(url: str) -> asyncio.Semaphore:
+    """同一个域名的图片下载共用一个并发上限"""
+    host = URL(url).host or ""
+    if (semaphore := _host_semaphores.get(host)) is None:
+        semaphore = asyncio.Semaphore(plugin_config.bison_image_download_per_host)
+        _host_semaphores[host] = semaphore
+    return semaphore
+
+
+def _hash(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class ImageCache:
+    """按 URL 缓存下载的图片
+
+    内存中是有总大小上限的 LRU；磁盘中图片按内容哈希保存在 `objects` 下，
+    不同 URL 指向同一张图片时只保存一份，URL 到内容哈希的映射保存在 `urls` 下。
+    同一个 URL 同时只会下载一次，其余请求等待同一个下载结果。
+    超过 `spool_threshold` 的图片边下载边写入磁盘，不在内存中保留完整内容，以文件路径的形式返回。
+    磁盘缓存的总大小在第一次写入时扫描一次，之后随写入和删除更新，超过上限时才清理；
+    刚返回的文件路径和通过 `pin` 占用的文件不会被清理
+    """
+
+    def __init__(
+        self, max_memory_size: int, max_disk_size: int, spool_threshold: int = 0, cache_dir: Path | None = None
+    ):
+        self.max_memory_size = max_memory_size
+        self.max_disk_size = max_disk_size
+        self.spool_threshold = spool_threshold
+        self._cache_dir = cache_dir
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        self._memory_size = 0
+        self._inflight: dict[str, asyncio.Future[bytes | Path]] = {}
+        # 磁盘中的图片及其大小，按写入或使用的先后排列，None 表示尚未扫描
+        self._disk_objects: OrderedDict[Path, int] | None = None
+        self._disk_size = 0
+        self._pins: dict[Path, int] = {}
+        self._handouts: dict[Path, float] = {}
+        # 磁盘读写在线程中进行
+        self._disk_lock = threading.Lock()
+
+    @property
+    def cache_dir(self) -> Path:
+        return self._cache_dir or get_plugin_data().cache_dir / "images"
+
+    @property
+    def use_disk(self) -> bool:
+        return self.max_disk_size > 0
+
+    @property
+    def use_spool(self) -> bool:
+        return self.use_disk and self.spool_threshold > 0
+
+    def _put_memory(self, url: str, content: bytes):
+        if len(content) > self.max_memory_size:
+            return
+        if (old := self._memory.pop(url, None)) is not None:
+            self._memory_size -= len(old)
+        self._memory[url] = content
+        self._memory_size += len(content)
+        while self._memory_size > self.max_memory_size:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+
+    def _url_index_path(self, url: str) -> Path:
+        return self.cache_dir / "urls" / _hash(url.encode())
+
+    def _object_path(self, content_hash: str) -> Path:
+        return self.cache_dir / "objects" / content_hash[:2] / content_hash
+
+    def _read_disk(self, url: str) -> bytes | Path | None:
+        index_path = self._url_index_path(url)
+        if not index_path.exists():
+            return None
+        object_path = self._object_path(index_path.read_text())
+        # 读取期间占用文件，避免被其他线程中的清理删除
+        self.pin(object_path)
+        try:
+            if not object_path.exists():
+                self._forget_object(object_path)
+                return None
+            self._touch_object(object_path)
+            if self.use_spool and object_path.stat().st_size >= self.spool_threshold:
+                return self._hand_out(object_path)
+            return object_path.read_bytes()
+        except FileNotFoundError:
+            # 文件在占用之前已被删除，重新下载
+            self._forget_object(object_path)
+            return None
+        finally:
+            self.unpin(object_path)
+
+    def _write_index(self, url: str, content_hash: str):
+        index_path = self._url_index_path(url)
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+        index_path.write_text(content_hash)
+
+    def _write_disk(self, url: str, content: bytes):
+        content_hash = _hash(content)
+        object_path = self._object_path(content_hash)
+        if not object_path.exists():
+            object_path.parent.mkdir(parents=True, exist_ok=True)
+            object_path.write_bytes(content)
+            self._add_object(object_path, len(content))
+        self._write_index(url, content_hash)
+
+    def _commit_spool(self, url: str, spool_path: Path, content_hash: str) -> Path:
+        """把下载完成的临时文件移动到内容哈希对应的位置"""
+        object_path = self._object_path(content_hash)
+        if object_path.exists():
+            spool_path.unlink(missing_ok=True)
+        else:
+            object_path.parent.mkdir(parents=True, exist_ok=True)
+            spool_path.replace(object_path)
+            self._add_object(object_path, object_path.stat().st_size)
+        self._write_index(url, content_hash)
+        return self._hand_out(object_path)
+
+    def _scan_disk(self) -> OrderedDict[Path, int]:
+        objects = [(path, path.stat()) for path in (self.cache_dir / "objects").glob("*/*")]
+        objects.sort(key=lambda item: item[1].st_mtime)
+        return OrderedDict((path, stat.st_size) for path, stat in objects)
+
+    def _get_disk_objects(self) -> OrderedDict[Path, int]:
+        if self._disk_objects is None:
+            self._disk_objects = self._scan_disk()
+            self._disk_size = sum(self._disk_objects.values())
+        return self._disk_objects
+
+    def _touch_object(self, path: Path):
+        with self._disk_lock:
+            if (objects := self._get_disk_objects()).get(path) is not None:
+                objects.move_to_end(path)
+
+    def _forget_object(self, path: Path):
+        """文件已不存在（如被手动删除）时更新记录的总大小"""
+        with self._disk_lock:
+            if (size := self._get_disk_objects().pop(path, None)) is not None:
+                self._disk_size -= size
+
+    def _add_object(self, path: Path, size: int):
+        with self._disk_lock:
+            objects = self._get_disk_objects()
+            # 首次扫描时可能已经包含了刚写入的文件
+            if (old := objects.pop(path, None)) is not None:
+                self._disk_size -= old
+            objects[path] = size
+            self._disk_size += size
+            if self._disk_size > self.max_disk_size:
+                self._prune_disk(keep=path)
+
+    def _hand_out(self, path: Path) -> Path:
+        with self._disk_lock:
+            self._handouts[path] = time.monotonic()
+        return path
+
+    def _is_pinned(self, path: Path, now: float) -> bool:
+        if self._pins.get(path):
+            return True
+        if (handout := self._handouts.get(path)) is None:
+            return False
+        if now - handout < HANDOUT_PIN_SECONDS:
+            return True
+        del self._handouts[path]
+        return False
+
+    def _prune_disk(self, keep: Path):
+        """磁盘缓存超过上限时，删除最久未使用的图片，对应的 URL 映射在读取时失效"""
+        objects = self._get_disk_objects()
+        now = time.monotonic()
+        for path, size in list(objects.items()):
+            if self._disk_size <= self.max_disk_size:
+                break
+            if path == keep or self._is_pinned(path, now):
+                continue
+            path.unlink(missing_ok=True)
+            del objects[path]
+            self._disk_size -= size
+
+    def object_hash(self, path: Path) -> str | None:
+        """磁盘缓存中的图片返回其内容哈希，其他文件返回 None"""
+        if path.parent.parent == self.cache_dir / "objects":
+            return path.name
+        return None
+
+    def object_file(self, content_hash: str) -> Path | None:
+        """按内容哈希获取磁盘缓存中的图片，已被清理时返回 None"""
+        object_path = self._object_path(content_hash)
+        return object_path if object_path.exists() else None
+
+    def store(self, content: bytes) -> Path | None:
+        """把图片内容写入磁盘缓存并返回其路径，不使用磁盘缓存时返回 None
+
+        返回的文件已被 `pin` 占用，不再使用时需要调用 `unpin`
+        """
+        if not self.use_disk:
+            return None
+        object_path = self._object_path(_hash(content))
+        self.pin(object_path)
+        if not object_path.exists():
+            object_path.parent.mkdir(parents=True, exist_ok=True)
+            object_path.write_bytes(content)
+            self._add_object(object_path, len(content))
+        return object_path
+
+    def pin(self, path: Path):
+        """占用磁盘缓存中的文件，在 `unpin` 之前不会被清理"""
+        with self._disk_lock:
+            self._pins[path] = self._pins.get(path, 0) + 1
+
+    def unpin(self, path: Path):
+        with self._disk_lock:
+            if (count := self._pins.get(path, 0)) <= 1:
+                self._pins.pop(path, None)
+            else:
+                self._pins[path] = count - 1
+
+    async def _stream(self, url: str, http_client: AsyncClient) -> bytes | Path:
+        """流式下载，内容超过 `spool_threshold` 后改为写入临时文件"""
+        buffer = bytearray()
+        hasher = hashlib.blake2b(digest_size=16)
+        spool_file: BinaryIO | None = None
+        spool_path = self.cache_dir / "tmp" / uuid4().hex
+        try:
+            async with _get_host_semaphore(url), http_client.stream("GET", url) as res:
+                res.raise_for_status()
+                async for chunk in res.aiter_bytes():
+                    if spool_file is None:
+                        buffer += chunk
+                        if not self.use_spool or len(buffer) < self.spool_threshold:
+                            continue
+                        spool_path.parent.mkdir(parents=True, exist_ok=True)
+                        spool_file = await asyncio.to_thread(spool_path.open, "wb")
+                        chunk, buffer = bytes(buffer), bytearray()
+                    hasher.update(chunk)
+                    await asyncio.to_thread(spool_file.write, chunk)
+        except BaseException:
+            if spool_file is not None:
+                spool_file.close()
+                spool_path.unlink(missing_ok=True)
+            raise
+        if spool_file is None:
+            return bytes(buffer)
+        spool_file.close()
+        return await asyncio.to_thread(self._commit_spool, url, spool_path, hasher.hexdigest())
+
+    async def _download(self, url: str, http_client: AsyncClient) -> bytes | Path:
+        async with http_client:
+            return await self._fetch(url, http_client)
+
+    async def _fetch(self, url: str, http_client: AsyncClient) -> bytes | Path:
+        if self.use_disk and (cached := await asyncio.to_thread(self._read_disk, url)) is not None:
+            if isinstance(cached, bytes):
+                self._put_memory(url, cached)
+            return cached
+        content = await self._stream(url, http_client)
+        if isinstance(content, Path):
+            return content
+        self._put_memory(url, content)
+        if self.use_disk:
+            try:
+                await asyncio.to_thread(self._write_disk, url, content)
+            except OSError as e:
+                logger.warning(f"写入图片缓存失败: {e}")
+        return content
+
+    async def get_file(self, url: str, http_client: AsyncClient) -> bytes | Path:
+        """获取图片，较大的图片返回磁盘缓存中的文件路径，其余返回图片内容
+
+        `http_client` 只提供 headers、cookies 等请求设置，实际下载使用 `IMAGE_POOL` 连接池
+        """
+        if (content := self._memory.get(url)) is not None:
+            self._memory.move_to_end(url)
+            return content
+        if (future := self._inflight.get(url)) is None:
+            # 下载由所有等待者共享，发起者的 client 可能先于其他等待者关闭，
+            # 因此在图片连接池上新建 client，沿用发起者的 headers、cookies 等设置
+            client = pooled_client(
+                pool=IMAGE_POOL,
+                headers=dict(http_client.headers),
+                cookies=Cookies(http_client.cookies),
+                timeout=http_client.timeout,
+                follow_redirects=http_client.follow_redirects,
+            )
+            future = asyncio.ensure_future(self._download(url, client))
+            self._inflight[url] = future
+            future.add_done_callback(lambda _: self._inflight.pop(url, None))
+        # 某个等待者被取消时不影响其他等待者
+        return await asyncio.shield(future)
+
+    async def get(self, url: str, http_client: AsyncClient) -> bytes:
+        """获取图片内容，未缓存时使用 http_client 下载"""
+        content = await self.get_file(url, http_client)
+        if isinstance(content, Path):
+            return await asyncio.to_thread(content.read_bytes)
+        return content
+
+    def clear(self):
+        self._memory.clear()
+        self._memory_size = 0
+
+
+image_cache = ImageCache(
+    plugin_config.bison_image_cache_memory_size * 1024 * 1024,
+    plugin_config.bison_image_cache_disk_size * 1024 * 1024,
+    plugin_config.bison_image_spool_threshold * 1024,
+)
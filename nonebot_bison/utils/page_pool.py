@@ -0,0 +1,164 @@
+import asyncio
+from collections.abc import AsyncIterator, Hashable, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+import time
+from typing import TYPE_CHECKING, Any
+
+from nonebot.log import logger
+from nonebot.plugin import require
+
+from nonebot_bison.plugin_config import plugin_config
+
+if TYPE_CHECKING:
+    from playwright.async_api import Page
+
+# 未指定 viewport 时 playwright 使用的默认大小，复用页面时需要还原
+DEFAULT_VIEWPORT = {"width": 1280, "height": 720}
+# 健康检查的超时时间（秒）
+HEALTH_CHECK_TIMEOUT = 5
+
+_page_wait: ContextVar[list[float] | None] = ContextVar("bison_page_wait", default=None)
+
+
+@contextmanager
+def record_page_wait() -> Iterator[list[float]]:
+    """记录当前上下文中等待浏览器页面的时间（秒）"""
+    waits: list[float] = []
+    token = _page_wait.set(waits)
+    try:
+        yield waits
+    finally:
+        _page_wait.reset(token)
+
+
+def _report_wait(wait: float):
+    if (waits := _page_wait.get()) is not None:
+        waits.append(wait)
+
+
+@dataclass
+class _PooledPage:
+    page: "Page"
+    uses: int = 0
+
+
+def _pool_key(device_scale_factor: float, kwargs: dict[str, Any]) -> Hashable:
+    # device_scale_factor、base_url 等参数在创建页面时确定，只有参数相同的页面可以复用；
+    # viewport 可以在借出时调整，不影响复用
+    return (device_scale_factor, repr(sorted((k, v) for k, v in kwargs.items() if k != "viewport")))
+
+
+class PagePool:
+    """复用 playwright 页面的页面池
+
+    同时借出的页面不超过 `size` 个，多余的请求排队等待；归还的页面保留在池中，
+    下次以相同参数借用时直接复用，省去创建页面的开销。
+    页面使用 `max_uses` 次后或健康检查失败时关闭并重新创建
+    """
+
+    def __init__(self, size: int, max_uses: int):
+        self.size = size
+        self.max_uses = max_uses
+        self._semaphore = asyncio.Semaphore(max(size, 1))
+        # 空闲页面，按归还时间排序
+        self._idle: list[tuple[Hashable, _PooledPage]] = []
+        self._in_use = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    async def _close(self, pooled: _PooledPage):
+        try:
+            await pooled.page.context.close()
+        except Exception as e:
+            logger.debug(f"关闭页面失败: {e}")
+
+    async def _is_healthy(self, pooled: _PooledPage) -> bool:
+        page = pooled.page
+        if page.is_closed() or not page.context.browser or not page.context.browser.is_connected():
+            return False
+        try:
+            await asyncio.wait_for(page.evaluate("1"), HEALTH_CHECK_TIMEOUT)
+        except Exception:
+            return False
+        return True
+
+    async def _new_page(self, device_scale_factor: float, kwargs: dict[str, Any]) -> _PooledPage:
+        require("nonebot_plugin_htmlrender")
+        from nonebot_plugin_htmlrender.browser import get_browser
+
+        # 空闲页面与借出页面（包括正在创建的这个）的总数不超过 size，先关闭最久未使用的空闲页面
+        while self._idle and len(self._idle) + self._in_use > self.size:
+            _, evicted = self._idle.pop(0)
+            await self._close(evicted)
+        browser = await get_browser()
+        return _PooledPage(await browser.new_page(device_scale_factor=device_scale_factor, **kwargs))
+
+    async def _acquire(self, key: Hashable, device_scale_factor: float, kwargs: dict[str, Any]) -> _PooledPage:
+        for idx in range(len(self._idle) - 1, -1, -1):
+            if self._idle[idx][0] != key:
+                continue
+            _, pooled = self._idle.pop(idx)
+            if await self._is_healthy(pooled):
+                return pooled
+            logger.debug("页面健康检查失败，重新创建")
+            await self._close(pooled)
+            break
+        return await self._new_page(device_scale_factor, kwargs)
+
+    async def _release(self, key: Hashable, pooled: _PooledPage):
+        pooled.uses += 1
+        if pooled.uses >= self.max_uses or pooled.page.is_closed():
+            await self._close(pooled)
+            return
+        self._idle.append((key, pooled))
+
+    @asynccontextmanager
+    async def page(self, device_scale_factor: float = 2, **kwargs) -> AsyncIterator["Page"]:
+        """借用一个页面，参数与 `nonebot_plugin_htmlrender.get_new_page` 相同"""
+        key = _pool_key(device_scale_factor, kwargs)
+        start = time.perf_counter()
+        async with self._semaphore:
+            self._in_use += 1
+            try:
+                pooled = await self._acquire(key, device_scale_factor, kwargs)
+                _report_wait(time.perf_counter() - start)
+                await pooled.page.set_viewport_size(kwargs.get("viewport") or DEFAULT_VIEWPORT)
+                try:
+                    yield pooled.page
+                except BaseException:
+                    # 出错的页面状态未知，不再复用
+                    await self._close(pooled)
+                    raise
+                await self._release(key, pooled)
+            finally:
+                self._in_use -= 1
+
+    async def close(self):
+        """关闭所有空闲页面"""
+        idle, self._idle = self._idle, []
+        for _, pooled in idle:
+            await self._close(pooled)
+
+
+page_pool = PagePool(plugin_config.bison_page_pool_size, plugin_config.bison_page_pool_max_uses)
+
+
+@asynccontextmanager
+async def get_page(device_scale_factor: float = 2, **kwargs) -> AsyncIterator["Page"]:
+    """获取一个浏览器页面，启用页面池时从池中借用，否则与 `get_new_page` 相同"""
+    if page_pool.enabled:
+        async with page_pool.page(device_scale_factor, **kwargs) as page:
+            yield page
+        return
+
+    require("nonebot_plugin_htmlrender")
+    from nonebot_plugin_htmlrender import get_new_page
+
+    start = time.perf_counter()
+    async with get_new_page(device_scale_factor, **kwargs) as page:
+        _report_wait(time.perf_counter() - start)
+        yield page
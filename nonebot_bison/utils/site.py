@@ -15,10 +15,14 @@ from nonebot_bison.config.db_model import Cookie
 from nonebot_bison.metrics import cookie_choose_counter
 from nonebot_bison.types import Target
 
-from .http import http_client
+from .cookie_pool import CookiePool, get_cookie_pool
+from .http import DEFAULT_POOL, http_client
 
 
 class ClientManager(ABC):
+    pool_name: str = DEFAULT_POOL
+    """共享连接池的名称，同一个连接池的 client 复用连接"""
+
     @abstractmethod
     async def get_client(self, target: Target | None) -> AsyncClient: ...
 
@@ -34,13 +38,13 @@ class ClientManager(ABC):
 
 class DefaultClientManager(ClientManager):
     async def get_client(self, target: Target | None) -> AsyncClient:
-        return http_client()
+        return http_client(pool=self.pool_name)
 
     async def get_client_for_static(self) -> AsyncClient:
-        return http_client()
+        return http_client(pool=self.pool_name)
 
     async def get_query_name_client(self) -> AsyncClient:
-        return http_client()
+        return http_client(pool=self.pool_name)
 
     async def refresh_client(self):
         pass
@@ -110,31 +114,34 @@ class CookieClientManager(ClientManager):
 
         return len(result) > 0
 
+    @property
+    def cookie_pool(self) -> CookiePool:
+        return get_cookie_pool(self._site_name)
+
     def _generate_hook(self, cookie: Cookie) -> Callable:
-        """hook 函数生成器，用于回写请求状态到数据库"""
+        """hook 函数生成器，用于回写请求状态，由 cookie 池定期写回数据库"""
 
         async def _response_hook(resp: httpx.Response):
             if resp.status_code == 200:
                 logger.trace(f"请求成功: {cookie.id} {resp.request.url}")
-                cookie.status = "success"
+                status = "success"
             else:
                 logger.warning(f"请求失败: {cookie.id} {resp.request.url}, 状态码: {resp.status_code}")
-                cookie.status = "failed"
-            cookie.last_usage = datetime.now()
-            await config.update_cookie(cookie)
+                status = "failed"
+            self.cookie_pool.mark_used(cookie, status)
 
         return _response_hook
 
     async def _choose_cookie(self, target: Target | None) -> Cookie:
         """选择 cookie 的具体算法"""
-        cookies = await config.get_cookie(self._site_name, target)
-        available_cookies = (cookie for cookie in cookies if cookie.last_usage + cookie.cd < datetime.now())
-        cookie = min(available_cookies, key=lambda x: x.last_usage)
+        cookie = await self.cookie_pool.choose(target)
+        if cookie is None:
+            raise SkipRequestException(f"平台 {self._site_name} 没有可用的 cookie")
         return cookie
 
     async def get_client(self, target: Target | None) -> AsyncClient:
         """获取 client，根据 target 选择 cookie"""
-        client = http_client()
+        client = http_client(pool=self.pool_name)
         cookie = await self._choose_cookie(target)
         cookie_choose_counter.labels(site_name=self._site_name, target=target, cookie_id=cookie.id).inc()
         if cookie.is_universal:
@@ -164,10 +171,10 @@ class CookieClientManager(ClientManager):
         )
 
     async def get_client_for_static(self) -> AsyncClient:
-        return http_client()
+        return http_client(pool=self.pool_name)
 
     async def get_query_name_client(self) -> AsyncClient:
-        return http_client()
+        return http_client(pool=self.pool_name)
 
     async def refresh_client(self):
         await self._refresh_anonymous_cookie()
@@ -201,6 +208,8 @@ class Site(metaclass=SiteMeta):
     name: str
     client_mgr: type[ClientManager] = DefaultClientManager
     require_browser: bool = False
+    fetch_width: int = 1
+    """每次调度同时抓取的 target 数量，可通过 bison_site_fetch_width 覆盖"""
     registry: list[type["Site"]]
 
     def __str__(self):
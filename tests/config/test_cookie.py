@@ -124,6 +124,54 @@ async def test_cookie(app: App, init_scheduler):
     assert len(cookie_targets) == 2
 
 
+@pytest.mark.usefixtures("_patch_weibo_get_cookie_name", "_clear_db")
+async def test_cookie_pool(app: App, init_scheduler):
+    from nonebot_plugin_saa import TargetQQGroup
+
+    from nonebot_bison.config.db_config import config
+    from nonebot_bison.scheduler import scheduler_dict
+    from nonebot_bison.types import Target as T_Target
+    from nonebot_bison.utils.cookie_pool import flush_cookie_pools
+    from nonebot_bison.utils.site import CookieClientManager, site_manager
+
+    target = T_Target("weibo_id")
+    platform_name = "weibo"
+    await config.add_subscribe(
+        TargetQQGroup(group_id=123),
+        target=target,
+        target_name="weibo_name",
+        platform_name=platform_name,
+        cats=[],
+        tags=[],
+    )
+    site = site_manager["weibo.com"]
+    client_mgr = cast(CookieClientManager, scheduler_dict[site].client_mgr)
+    await client_mgr.refresh_client()
+    cookie1 = await client_mgr.add_identified_cookie(json.dumps({"test_cookie": "1"}))
+    cookie2 = await client_mgr.add_identified_cookie(json.dumps({"test_cookie": "2"}))
+    await config.add_cookie_target(target, platform_name, cookie1.id)
+
+    # 最久未使用的关联 cookie 优先
+    cookie = await client_mgr._choose_cookie(target)
+    assert cookie.id == cookie1.id
+    # 使用后进入冷却，回退到匿名 cookie
+    client_mgr.cookie_pool.mark_used(cookie, "success")
+    cookie = await client_mgr._choose_cookie(target)
+    assert cookie.is_anonymous
+
+    # 使用记录在 flush 后才写回数据库
+    assert (await config.get_cookie_by_id(cookie1.id)).status == ""
+    await flush_cookie_pools()
+    cookie_in_db = await config.get_cookie_by_id(cookie1.id)
+    assert cookie_in_db.status == "success"
+    assert cookie_in_db.last_usage > datetime(2024, 1, 1)
+
+    # 关联变化后重新读取
+    await config.add_cookie_target(target, platform_name, cookie2.id)
+    cookie = await client_mgr._choose_cookie(target)
+    assert cookie.id == cookie2.id
+
+
 @pytest.mark.parametrize(
     argnames=("cookie", "cookie_len"),
     argvalues=[
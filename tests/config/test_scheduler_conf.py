@@ -195,3 +195,87 @@ async def test_get_platform_target_subscribers(app: App, init_scheduler):
     assert len(res) == 2
     assert UserSubInfo(TargetQQGroup(group_id=123), [2], ["tag2"]) in res
     assert UserSubInfo(TargetQQGroup(group_id=245), [3], ["tag3"]) in res
+
+
+async def test_subscriber_index_incremental_update(app: App, init_scheduler, mocker: MockerFixture):
+    from nonebot_plugin_saa import TargetQQGroup
+
+    from nonebot_bison.config.db_config import config
+    from nonebot_bison.types import Target as T_Target
+    from nonebot_bison.types import UserSubInfo
+
+    refresh_spy = mocker.spy(config, "refresh_subscriber_index")
+
+    await config.add_subscribe(
+        TargetQQGroup(group_id=123),
+        target=T_Target("weibo_id"),
+        target_name="weibo_name",
+        platform_name="weibo",
+        cats=[1],
+        tags=["tag1"],
+    )
+    await config.add_subscribe(
+        TargetQQGroup(group_id=245),
+        target=T_Target("weibo_id"),
+        target_name="weibo_name",
+        platform_name="weibo",
+        cats=[2],
+        tags=[],
+    )
+    res = await config.get_platform_target_subscribers("weibo", T_Target("weibo_id"))
+    assert res == [
+        UserSubInfo(TargetQQGroup(group_id=123), [1], ["tag1"]),
+        UserSubInfo(TargetQQGroup(group_id=245), [2], []),
+    ]
+
+    await config.update_subscribe(TargetQQGroup(group_id=123), "weibo_id", "weibo_name", "weibo", [3], ["tag3"])
+    res = await config.get_platform_target_subscribers("weibo", T_Target("weibo_id"))
+    assert UserSubInfo(TargetQQGroup(group_id=123), [3], ["tag3"]) in res
+
+    await config.del_subscribe(TargetQQGroup(group_id=245), "weibo_id", "weibo")
+    res = await config.get_platform_target_subscribers("weibo", T_Target("weibo_id"))
+    assert res == [UserSubInfo(TargetQQGroup(group_id=123), [3], ["tag3"])]
+
+    # 增量更新后不需要重新读取数据库
+    refresh_spy.assert_not_called()
+    await config.refresh_subscriber_index()
+    assert await config.get_platform_target_subscribers("weibo", T_Target("weibo_id")) == res
+
+
+async def test_get_platform_targets_subscribers_without_cache(app: App, init_scheduler, mocker: MockerFixture):
+    from nonebot_plugin_saa import TargetQQGroup
+
+    from nonebot_bison.config.db_config import config
+    from nonebot_bison.plugin_config import plugin_config
+    from nonebot_bison.types import Target as T_Target
+    from nonebot_bison.types import UserSubInfo
+
+    mocker.patch.object(plugin_config, "bison_subscriber_cache", False)
+
+    await config.add_subscribe(
+        TargetQQGroup(group_id=123),
+        target=T_Target("t1"),
+        target_name="target1",
+        platform_name="bilibili-live",
+        cats=[1],
+        tags=[],
+    )
+    await config.add_subscribe(
+        TargetQQGroup(group_id=245),
+        target=T_Target("t2"),
+        target_name="target2",
+        platform_name="bilibili-live",
+        cats=[2],
+        tags=[],
+    )
+
+    refresh_spy = mocker.spy(config, "refresh_subscriber_index")
+    res = await config.get_platform_targets_subscribers(
+        "bilibili-live", [T_Target("t1"), T_Target("t2"), T_Target("t3")]
+    )
+    assert res == {
+        T_Target("t1"): [UserSubInfo(TargetQQGroup(group_id=123), [1], [])],
+        T_Target("t2"): [UserSubInfo(TargetQQGroup(group_id=245), [2], [])],
+        T_Target("t3"): [],
+    }
+    refresh_spy.assert_not_called()
@@ -464,12 +464,18 @@ async def test_fetch_new_without_dynamic(bilibili, dummy_user_subinfo, without_d
 
 @pytest.mark.asyncio
 @respx.mock
-async def test_fetch_new(bilibili, dummy_user_subinfo):
+async def test_fetch_new(bilibili, dummy_user_subinfo, mocker: MockerFixture):
     from nonebot.compat import model_dump, type_validate_python
 
-    from nonebot_bison.platform.bilibili.models import PostAPI
+    from nonebot_bison.platform.bilibili import platforms
+    from nonebot_bison.platform.bilibili.models import DynRawPost, PostAPI
     from nonebot_bison.types import SubUnit, Target
 
+    validate_spy = mocker.spy(platforms, "type_validate_python")
+
+    def full_validate_count() -> int:
+        return sum(call.args[0] is DynRawPost for call in validate_spy.call_args_list)
+
     target = Target("161775300")
 
     post_router = respx.get(
@@ -484,12 +490,15 @@ async def test_fetch_new(bilibili, dummy_user_subinfo):
     res = await bilibili.fetch_new_post(SubUnit(target, [dummy_user_subinfo]))
     assert post_router.called
     assert len(res) == 0
+    # 已存在的动态不做完整校验
+    assert full_validate_count() == 0
 
     post_0.modules.module_author.pub_ts = int(datetime.now().timestamp())
     post_list.data.items.insert(0, post_0)
     post_router.mock(return_value=Response(200, json=model_dump(post_list)))
     res2 = await bilibili.fetch_new_post(SubUnit(target, [dummy_user_subinfo]))
     assert len(res2[0][1]) == 1
+    assert full_validate_count() == 1
     post = res2[0][1][0]
     assert post.content == (
         "SideStory「巴别塔」限时活动即将开启\n\n\n\n"
@@ -506,6 +515,38 @@ async def test_fetch_new(bilibili, dummy_user_subinfo):
     )
 
 
+@pytest.mark.asyncio
+@respx.mock
+async def test_fetch_new_invalid_item(bilibili, dummy_user_subinfo):
+    from nonebot_bison.types import ApiError, SubUnit, Target
+
+    target = Target("161775300")
+    bilibili.set_stored_data(target, None)
+
+    post_router = respx.get(
+        f"https://api.bilibili.com/x/polymer/web-dynamic/v1/feed/space?host_mid={target}&timezone_offset=-480&offset=&features=itemOpusStyle"
+    )
+    post_list = get_json("bilibili-new.json")
+    post_0 = post_list["data"]["items"].pop(0)
+    post_router.mock(return_value=Response(200, json=post_list))
+    assert await bilibili.fetch_new_post(SubUnit(target, [dummy_user_subinfo])) == []
+
+    # 新动态通过了列表的初步校验，但完整校验失败
+    post_0["modules"]["module_author"]["pub_ts"] = int(datetime.now().timestamp())
+    broken_post_0 = {**post_0, "modules": {"module_author": post_0["modules"]["module_author"]}}
+    broken_list = {**post_list, "data": {"items": [broken_post_0, *post_list["data"]["items"]]}}
+    post_router.mock(return_value=Response(200, json=broken_list))
+    with pytest.raises(ApiError):
+        await bilibili.fetch_new_post(SubUnit(target, [dummy_user_subinfo]))
+
+    # 之后内容恢复正常时仍然能推送这条动态
+    post_list["data"]["items"].insert(0, post_0)
+    post_router.mock(return_value=Response(200, json=post_list))
+    res = await bilibili.fetch_new_post(SubUnit(target, [dummy_user_subinfo]))
+    assert len(res[0][1]) == 1
+    assert res[0][1][0].url == f"https://t.bilibili.com/{post_0['id_str']}"
+
+
 @pytest.mark.asyncio
 @respx.mock
 async def test_fetch_new_live_rcmd(bilibili: "Bilibili", dummy_user_subinfo):
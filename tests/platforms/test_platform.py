@@ -3,6 +3,7 @@ from typing import Any, ClassVar
 
 from nonebug.app import App
 import pytest
+from pytest_mock import MockerFixture
 
 now = time()
 passed = now - 3 * 60 * 60
@@ -379,6 +380,89 @@ async def test_new_message_target(mock_platform, user_info_factory):
     assert "p2" in id_set_3
 
 
+@pytest.mark.asyncio
+async def test_dispatch_parse_once_concurrently(mock_platform, user_info_factory):
+    import asyncio
+
+    from nonebot_bison.types import SubUnit, Target
+    from nonebot_bison.utils import DefaultClientManager, ProcessContext
+
+    parsed_ids = []
+    running = 0
+    max_running = 0
+    origin_parse = mock_platform.parse
+
+    async def slow_parse(self, raw_post):
+        nonlocal running, max_running
+        parsed_ids.append(raw_post["id"])
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.05)
+        running -= 1
+        return await origin_parse(self, raw_post)
+
+    tags_calls = []
+    origin_get_tags = mock_platform.get_tags
+
+    def get_tags(self, raw_post):
+        tags_calls.append(raw_post["id"])
+        return origin_get_tags(self, raw_post)
+
+    mock_platform.parse = slow_parse
+    mock_platform.get_tags = get_tags
+    platform = mock_platform(ProcessContext(DefaultClientManager()))
+    res = await platform.dispatch_user_post(
+        raw_post_list_2,
+        SubUnit(
+            Target("dummy"),
+            [
+                user_info_factory([1, 2], []),
+                user_info_factory([1], []),
+                user_info_factory([1, 2], ["tag1"]),
+            ],
+        ),
+    )
+    assert [[post.content for post in posts] for _, posts in res] == [["p1", "p2", "p3"], ["p1", "p2"], ["p1", "p2"]]
+    # 每个 post 只解析一次，且并发解析
+    assert sorted(parsed_ids) == [1, 2, 3]
+    assert max_running == 3
+    # 标签在多个订阅者之间只计算一次
+    assert sorted(tags_calls) == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_dispatch_group_same_filter(mock_platform):
+    from nonebot_plugin_saa import TargetQQGroup
+
+    from nonebot_bison.platform.platform import group_destinations
+    from nonebot_bison.types import SubUnit, Target, UserSubInfo
+    from nonebot_bison.utils import DefaultClientManager, ProcessContext
+
+    group1 = TargetQQGroup(group_id=1)
+    group2 = TargetQQGroup(group_id=2)
+    group3 = TargetQQGroup(group_id=3)
+    platform = mock_platform(ProcessContext(DefaultClientManager()))
+    res = await platform.dispatch_user_post(
+        raw_post_list_2,
+        SubUnit(
+            Target("dummy"),
+            [
+                UserSubInfo(group1, [1, 2], []),
+                UserSubInfo(group2, [1], ["tag1"]),
+                UserSubInfo(group3, [2, 1, 1], []),
+            ],
+        ),
+    )
+    assert [user for user, _ in res] == [group1, group2, group3]
+    # 过滤条件相同（与顺序无关）的订阅者共用同一个 post 列表
+    assert res[0][1] is res[2][1]
+    groups = group_destinations(res)
+    assert [(users, [post.content for post in posts]) for users, posts in groups] == [
+        ([group1, group3], ["p1", "p2", "p3"]),
+        ([group2], ["p1", "p2"]),
+    ]
+
+
 @pytest.mark.asyncio
 async def test_new_message_no_target(mock_platform_no_target, user_info_factory):
     from nonebot_bison.types import SubUnit, Target
@@ -481,6 +565,43 @@ async def test_group(
     assert len(res3) == 0
 
 
+@pytest.mark.asyncio
+async def test_group_member_error(
+    app: App,
+    mock_platform_no_target,
+    mock_platform_no_target_2,
+    user_info_factory,
+    mocker: MockerFixture,
+):
+    from nonebot_plugin_saa import TargetQQGroup
+
+    from nonebot_bison.platform.platform import make_no_target_group
+    from nonebot_bison.types import SubUnit, Target, UserSubInfo
+    from nonebot_bison.utils import DefaultClientManager, ProcessContext
+
+    dummy = Target("dummy")
+    sub_unit = SubUnit(
+        dummy,
+        [user_info_factory([1, 4], []), UserSubInfo(TargetQQGroup(group_id=456), [1, 4], [])],
+    )
+    group_platform_class = make_no_target_group([mock_platform_no_target, mock_platform_no_target_2])
+    group_platform = group_platform_class(ProcessContext(DefaultClientManager()))
+    assert await group_platform.fetch_new_post(sub_unit) == []
+
+    # 一个平台出错时其他平台的结果照常返回
+    mocker.patch.object(mock_platform_no_target_2, "get_sub_list", side_effect=RuntimeError("boom"))
+    res = await group_platform.fetch_new_post(sub_unit)
+    assert len(res) == 2
+    assert [post.content for post in res[0][1]] == ["p2"]
+    # 订阅条件相同的用户仍然共用同一个 post 列表
+    assert res[0][1] is res[1][1]
+
+    # 所有平台都出错时抛出异常
+    mocker.patch.object(mock_platform_no_target, "get_sub_list", side_effect=RuntimeError("boom"))
+    with pytest.raises(RuntimeError, match="boom"):
+        await group_platform.fetch_new_post(sub_unit)
+
+
 async def test_batch_fetch_new_message(app: App):
     from nonebot_plugin_saa import TargetQQGroup
 
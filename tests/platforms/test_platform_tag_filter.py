@@ -32,3 +32,21 @@ async def test_tag_separator(app: App):
     res = bilibili.tag_separator(tags)
     assert res[0] == ["222", "333", "555"]
     assert res[1] == ["111", "444"]
+
+
+# 预处理后的过滤条件与逐个判断的结果一致
+@pytest.mark.asyncio
+async def test_sub_filter(app: App, test_cases):
+    from nonebot_bison.platform.platform import SubFilter, compile_sub_filter
+
+    for case in test_cases:
+        sub_filter = SubFilter(
+            frozenset(),
+            frozenset(case["case"]["subscribed_tags"]),
+            frozenset(case["case"]["banned_tags"]),
+        )
+        assert sub_filter.is_banned(case["case"]["post_tags"]) == case["result"]
+
+    sub_filter = compile_sub_filter((1, 2), ("~111", "222"))
+    assert sub_filter == SubFilter(frozenset({1, 2}), frozenset({"222"}), frozenset({"111"}))
+    assert compile_sub_filter((1, 2), ("~111", "222")) is sub_filter
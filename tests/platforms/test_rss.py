@@ -5,6 +5,7 @@ import xml.etree.ElementTree as ET
 from httpx import Response
 from nonebug.app import App
 import pytest
+from pytest_mock import MockerFixture
 import pytz
 import respx
 
@@ -191,6 +192,77 @@ async def test_fetch_new_4(
     assert plain_content == "[图片]"
 
 
+@pytest.mark.asyncio
+@respx.mock
+async def test_fetch_not_modified(
+    rss,
+    user_info_factory,
+    mocker: MockerFixture,
+):
+    from httpx import Request
+
+    from nonebot_bison.types import SubUnit, Target
+
+    target = Target("https://rsshub.app/wallhaven/hot?limit=10")
+    feed = get_file("rss-top5-old.xml")
+
+    def handler(request: Request) -> Response:
+        if request.headers.get("if-none-match") == '"v1"':
+            return Response(304)
+        return Response(200, text=feed, headers={"ETag": '"v1"'})
+
+    rss_router = respx.get(target).mock(side_effect=handler)
+    res1 = await rss.fetch_new_post(SubUnit(target, [user_info_factory([], [])]))
+    assert len(res1) == 0
+
+    # 返回 304 时不再解析
+    parse = mocker.patch("feedparser.parse")
+    res2 = await rss.fetch_new_post(SubUnit(target, [user_info_factory([], [])]))
+    assert res2 == []
+    assert rss_router.call_count == 2
+    assert rss_router.calls.last.request.headers["if-none-match"] == '"v1"'
+    parse.assert_not_called()
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_fetch_not_modified_after_error(
+    rss,
+    user_info_factory,
+    mocker: MockerFixture,
+):
+    from httpx import HTTPStatusError, Request
+
+    from nonebot_bison.types import SubUnit, Target
+
+    target = Target("https://rsshub.app/wallhaven/hot?limit=5")
+    feed = get_file("rss-top5-old.xml")
+
+    def handler(request: Request) -> Response:
+        if request.headers.get("if-none-match") == '"v1"':
+            return Response(304)
+        return Response(200, text=feed, headers={"ETag": '"v1"'})
+
+    rss_router = respx.get(target).mock(side_effect=handler)
+    # 解析失败时不保存校验信息，下次请求仍然获取完整内容
+    mocker.patch("feedparser.parse", side_effect=RuntimeError("parse failed"))
+    with pytest.raises(RuntimeError):
+        await rss.fetch_new_post(SubUnit(target, [user_info_factory([], [])]))
+    mocker.stopall()
+    assert await rss.fetch_new_post(SubUnit(target, [user_info_factory([], [])])) == []
+    assert rss_router.call_count == 2
+    assert "if-none-match" not in rss_router.calls.last.request.headers
+
+    assert await rss.fetch_new_post(SubUnit(target, [user_info_factory([], [])])) == []
+    assert rss_router.calls.last.request.headers["if-none-match"] == '"v1"'
+
+    # 没有发送校验信息却得到 304 时视为请求失败
+    unexpected_target = Target("https://rsshub.app/wallhaven/hot?limit=1")
+    respx.get(unexpected_target).mock(return_value=Response(304))
+    with pytest.raises(HTTPStatusError):
+        await rss.fetch_new_post(SubUnit(unexpected_target, [user_info_factory([], [])]))
+
+
 def test_similar_text_process():
     from nonebot_bison.utils import text_similarity
 
@@ -218,3 +290,21 @@ def test_similar_text_process():
     str2 = "你爱我"
     res = text_similarity(str1, str2)
     assert res <= 0.8
+
+
+@pytest.mark.parametrize(
+    ("title", "expected"),
+    [("Release notes", 0.0), ("Server maintenance tonight", 2 / 13), ("Hello world", 1 / 11)],
+)
+def test_similar_text_short_title(title: str, expected: float):
+    from nonebot_bison.utils import text_similarity
+
+    # 短标题总能在长描述中找到很长的公共子序列，但不应因此被判定为相似
+    desc = (
+        "We are rolling out a new version of the client today. This update improves startup time, fixes a crash "
+        "when opening large attachments, and adds support for dark mode on all platforms. Please restart the app "
+        "after the download finishes. Thank you for your patience and for all the feedback you sent us last month."
+    )
+    assert text_similarity(title, desc) == pytest.approx(expected)
+    assert text_similarity(title, desc, 0.8) == pytest.approx(expected)
+    assert text_similarity(title, desc, 0.95) <= 0.95
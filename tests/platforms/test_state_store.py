@@ -0,0 +1,116 @@
+from time import time
+from typing import Any, ClassVar
+
+from nonebug.app import App
+import pytest
+
+now = time()
+
+raw_post_list_1 = [{"id": 1, "text": "p1", "date": now}]
+raw_post_list_2 = [*raw_post_list_1, {"id": 2, "text": "p2", "date": now}, {"id": 3, "text": "p3", "date": now}]
+
+
+@pytest.fixture
+def mock_state_platform(app: App):
+    from nonebot_bison.platform.platform import NewMessage
+    from nonebot_bison.post import Post
+    from nonebot_bison.types import RawPost, Target
+
+    class MockStatePlatform(NewMessage):
+        platform_name = "mock_state_platform"
+        name = "Mock State Platform"
+        enabled = True
+        is_common = True
+        enable_tag = False
+        categories: ClassVar[dict] = {}
+        has_target = True
+
+        sub_list: ClassVar[list] = raw_post_list_1
+
+        @classmethod
+        async def get_target_name(cls, client, _: "Target"):
+            return "MockStatePlatform"
+
+        def get_id(self, post: "RawPost") -> Any:
+            return post["id"]
+
+        def get_date(self, raw_post: "RawPost") -> float:
+            return raw_post["date"]
+
+        async def parse(self, raw_post: "RawPost") -> "Post":
+            return Post(self, raw_post["text"], "http://t.tt/" + str(self.get_id(raw_post)), nickname="Mock")
+
+        async def get_sub_list(self, _: "Target"):
+            return self.sub_list
+
+    return MockStatePlatform
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("_clear_db")
+async def test_restore_state_after_restart(mock_state_platform, dummy_user_subinfo):
+    from nonebot_bison.platform.state_store import flush_platform_states, load_platform_states
+    from nonebot_bison.types import SubUnit, Target
+    from nonebot_bison.utils import DefaultClientManager, ProcessContext
+
+    sub_unit = SubUnit(Target("dummy"), [dummy_user_subinfo])
+
+    res = await mock_state_platform(ProcessContext(DefaultClientManager())).fetch_new_post(sub_unit)
+    assert res == []
+    assert mock_state_platform.dirty_targets == {Target("dummy")}
+    await flush_platform_states()
+    assert not mock_state_platform.dirty_targets
+
+    # 模拟重启，内存中的状态丢失
+    mock_state_platform.store.clear()
+    await load_platform_states()
+    assert mock_state_platform.get_stored_data(Target("dummy")) == mock_state_platform.MessageStorage(True, {1})
+
+    # 恢复后不需要重新初始化，直接推送停机期间的新动态
+    mock_state_platform.sub_list = raw_post_list_2
+    res = await mock_state_platform(ProcessContext(DefaultClientManager())).fetch_new_post(sub_unit)
+    assert len(res) == 1
+    assert {post.content for post in res[0][1]} == {"p2", "p3"}
+
+
+@pytest.mark.asyncio
+async def test_file_state_store(app: App, tmp_path):
+    from nonebot_bison.platform.bilibili import Bilibililive
+    from nonebot_bison.platform.state_store import FileStateStore
+    from nonebot_bison.types import Target
+
+    info = Bilibililive.Info(
+        title="title",
+        room_id=1,
+        uid=2,
+        live_time=0,
+        live_status=Bilibililive.LiveStatus.ON,
+        area_v2_name="area",
+        uname="uname",
+        face="face",
+        cover_from_user="cover",
+        keyframe="keyframe",
+    )
+    state_key = Bilibililive.get_state_key()
+
+    store = FileStateStore(tmp_path / "state.json")
+    await store.save({(state_key, Target("2")): Bilibililive.dump_stored_data(info)})
+
+    states = await FileStateStore(tmp_path / "state.json").load_all()
+    assert Bilibililive.load_stored_data(states[state_key, Target("2")]) == info
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("_clear_db")
+async def test_save_platform_state(app: App):
+    from nonebot_bison.config import config
+    from nonebot_bison.types import Target
+
+    await config.save_platform_state({("k", Target("a")): 1, ("k", Target("b")): 2})
+    # 只覆盖写入的 target，同一 state_key 下的其他 target 不受影响
+    await config.save_platform_state({("k", Target("a")): 3, ("k", Target("c")): 4})
+    assert await config.get_all_platform_state() == {
+        ("k", Target("a")): 3,
+        ("k", Target("b")): 2,
+        ("k", Target("c")): 4,
+    }
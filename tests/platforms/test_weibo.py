@@ -5,6 +5,7 @@ import feedparser
 from httpx import AsyncClient, Response
 from nonebug.app import App
 import pytest
+from pytest_mock import MockerFixture
 from pytz import timezone
 import respx
 
@@ -74,6 +75,39 @@ async def test_fetch_new(weibo, dummy_user_subinfo):
     assert len(post.images) == 1
 
 
+@pytest.mark.asyncio
+@respx.mock
+async def test_fetch_unchanged_body(weibo, dummy_user_subinfo, mocker: MockerFixture):
+    from nonebot_bison.types import SubUnit, Target
+
+    ak_list_router = respx.get("https://m.weibo.cn/api/container/getIndex?containerid=1076036279793937")
+    ak_list_router.mock(return_value=Response(200, json=get_json("weibo_ak_list_0.json")))
+    target = Target("6279793937")
+    weibo.set_stored_data(target, None)
+    filter_spy = mocker.spy(weibo, "filter_common_with_diff")
+    assert await weibo.fetch_new_post(SubUnit(target, [dummy_user_subinfo])) == []
+    assert filter_spy.call_count == 1
+
+    # 内容与上次相同时跳过解析与过滤
+    assert await weibo.fetch_new_post(SubUnit(target, [dummy_user_subinfo])) == []
+    assert ak_list_router.call_count == 2
+    assert filter_spy.call_count == 1
+
+    mock_data = get_json("weibo_ak_list_1.json")
+    ak_list_router.mock(return_value=Response(200, json=mock_data))
+    assert await weibo.fetch_new_post(SubUnit(target, [dummy_user_subinfo])) == []
+    assert filter_spy.call_count == 2
+
+    mock_data["data"]["cards"][1]["mblog"]["created_at"] = datetime.now(timezone("Asia/Shanghai")).strftime(
+        "%a %b %d %H:%M:%S %z %Y"
+    )
+    ak_list_router.mock(return_value=Response(200, json=mock_data))
+    image_cdn_router.mock(Response(200, content=b""))
+    res = await weibo.fetch_new_post(SubUnit(target, [dummy_user_subinfo]))
+    assert filter_spy.call_count == 3
+    assert len(res[0][1]) == 1
+
+
 @pytest.mark.asyncio
 @respx.mock
 async def test_fetch_repost(weibo):
@@ -228,3 +262,17 @@ async def test_get_cookie_name(weibo: "Weibo"):
     weibo_client_mgr = WeiboClientManager()
     name = await weibo_client_mgr.get_cookie_name("{}")
     assert name == "weibo: [suyiiyii]"
+
+
+async def test_query_name_client_pool(app: App):
+    from httpx import URL
+
+    from nonebot_bison.platform.weibo import WeiboClientManager
+    from nonebot_bison.utils.http import get_shared_transport
+
+    # 调度器在实例上设置连接池名称
+    weibo_client_mgr = WeiboClientManager()
+    weibo_client_mgr.pool_name = "weibo-test"
+    client = await weibo_client_mgr.get_query_name_client()
+    assert client._transport_for_url(URL("https://m.weibo.cn")) is get_shared_transport("weibo-test")
+    assert client.cookies.get("dummycookie") == "1"
@@ -220,3 +220,67 @@ async def test_msg_segments_convert(mock_platform, mocker: MockerFixture):
     res = await post.generate_messages()
     assert len(res) == 1
     assert isinstance(res[0][0], Image)
+
+
+@pytest.mark.asyncio
+async def test_render_cache(mock_platform, mocker: MockerFixture):
+    from nonebot_bison.plugin_config import plugin_config
+    from nonebot_bison.post import Post, RenderCache
+    from nonebot_bison.utils import DefaultClientManager, ProcessContext
+
+    mocker.patch.object(plugin_config, "bison_use_pic", False)
+
+    platform_obj = mock_platform(ProcessContext(DefaultClientManager()))
+    post1: Post = await platform_obj.parse(raw_post_list_2[0])
+    post2: Post = await platform_obj.parse(raw_post_list_2[1])
+
+    generate_spy = mocker.spy(Post, "generate_messages")
+    render_cache = RenderCache()
+
+    res1 = await render_cache.generate_messages(post1)
+    res1_again = await render_cache.generate_messages(post1)
+    assert res1_again is res1
+    await render_cache.generate_messages(post2)
+    assert generate_spy.call_count == 2
+    assert (render_cache.hits, render_cache.misses) == (1, 2)
+
+    # 渲染配置改变后不应命中缓存
+    mocker.patch.object(plugin_config, "bison_use_browser", False)
+    await render_cache.generate_messages(post1)
+    assert generate_spy.call_count == 3
+
+
+async def test_normalize_images(app: App, mock_platform, mocker: MockerFixture):
+    from io import BytesIO
+
+    from nonebot_plugin_saa import Image, Text
+    from PIL import Image as PILImage
+
+    from nonebot_bison.plugin_config import plugin_config
+    from nonebot_bison.post import Post
+    from nonebot_bison.utils import image as image_module
+
+    mocker.patch.object(plugin_config, "bison_image_max_edge", 100)
+    transcode = mocker.spy(image_module, "_transcode")
+
+    def make_image(size: tuple[int, int], format: str) -> bytes:
+        output = BytesIO()
+        PILImage.new("RGBA" if format == "PNG" else "RGB", size).save(output, format)
+        return output.getvalue()
+
+    large = make_image((400, 200), "PNG")
+    small = make_image((50, 50), "JPEG")
+    post = Post(mock_platform, "text")
+    segments = [Text("text"), Image(large), Image(small)]
+
+    res = await post.message_segments_process(segments)
+    assert res[0] is segments[0]
+    assert res[2] is segments[2]
+    resized = PILImage.open(BytesIO(res[1].data["image"]))
+    assert resized.size == (100, 50)
+    assert resized.format == "JPEG"
+
+    # 同一张图片再次处理时使用缓存的转码结果
+    res2 = await post.message_segments_process([Image(large)])
+    assert res2[0].data["image"] == res[1].data["image"]
+    assert transcode.call_count == 2
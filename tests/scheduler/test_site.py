@@ -94,6 +94,64 @@ async def test_scheduler_batch_api(init_scheduler, mocker: MockerFixture):
     )
 
 
+async def test_scheduler_fetch_width(init_scheduler, mocker: MockerFixture):
+    from nonebot_plugin_saa import TargetQQGroup
+
+    from nonebot_bison.config import config
+    from nonebot_bison.config.db_config import WeightConfig
+    from nonebot_bison.platform.ncm import NcmSite
+    from nonebot_bison.plugin_config import plugin_config
+    from nonebot_bison.scheduler import scheduler_dict
+    from nonebot_bison.scheduler.manager import init_scheduler
+    from nonebot_bison.types import Target as T_Target
+
+    mocker.patch.object(plugin_config, "bison_site_fetch_width", {NcmSite.name: 3})
+
+    await config.add_subscribe(TargetQQGroup(group_id=123), T_Target("t1"), "target1", "ncm-artist", [], [])
+    await config.add_subscribe(TargetQQGroup(group_id=123), T_Target("t2"), "target1", "ncm-artist", [], [])
+    await config.add_subscribe(TargetQQGroup(group_id=123), T_Target("t2"), "target1", "ncm-radio", [], [])
+
+    await config.update_time_weight_config(T_Target("t2"), "ncm-artist", WeightConfig(default=20, time_config=[]))
+    await config.update_time_weight_config(T_Target("t2"), "ncm-radio", WeightConfig(default=30, time_config=[]))
+
+    await init_scheduler()
+
+    scheduler = scheduler_dict[NcmSite]
+    assert scheduler.fetch_width == 3
+    schedulables = await scheduler.get_next_schedulables(scheduler.fetch_width)
+    assert sorted(f"{x.platform_name}-{x.target}" for x in schedulables) == [
+        "ncm-artist-t1",
+        "ncm-artist-t2",
+        "ncm-radio-t2",
+    ]
+    # 同一次调度中重复选出的 target 只会抓取一次
+    schedulables = await scheduler.get_next_schedulables(scheduler.fetch_width)
+    assert sorted(f"{x.platform_name}-{x.target}" for x in schedulables) == ["ncm-artist-t2", "ncm-radio-t2"]
+
+
+async def test_scheduler_fetch_width_batch_api(init_scheduler, mocker: MockerFixture):
+    from nonebot_plugin_saa import TargetQQGroup
+
+    from nonebot_bison.config import config
+    from nonebot_bison.platform.bilibili import BililiveSite
+    from nonebot_bison.scheduler import scheduler_dict
+    from nonebot_bison.scheduler.manager import init_scheduler
+    from nonebot_bison.types import Target as T_Target
+    from nonebot_bison.utils import DefaultClientManager
+
+    await config.add_subscribe(TargetQQGroup(group_id=123), T_Target("t1"), "target1", "bilibili-live", [], [])
+    await config.add_subscribe(TargetQQGroup(group_id=123), T_Target("t2"), "target2", "bilibili-live", [], [])
+
+    mocker.patch.object(BililiveSite, "client_mgr", DefaultClientManager)
+    mocker.patch.object(BililiveSite, "fetch_width", 2)
+
+    await init_scheduler()
+
+    # 一次批量抓取已经包含了所有 target，不会重复选出
+    schedulables = await scheduler_dict[BililiveSite].get_next_schedulables(2)
+    assert len(schedulables) == 1
+
+
 async def test_scheduler_with_time(app: App, init_scheduler, mocker: MockerFixture):
     from nonebot_plugin_saa import TargetQQGroup
 
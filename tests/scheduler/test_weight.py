@@ -0,0 +1,90 @@
+from datetime import time
+
+from nonebug import App
+from pytest_mock import MockerFixture
+
+
+async def test_target_weight(app: App):
+    from nonebot_bison.config.db_model import ScheduleTimeWeight
+    from nonebot_bison.scheduler.weight import TargetWeight
+
+    target_weight = TargetWeight(
+        10,
+        [
+            ScheduleTimeWeight(start_time=time(1), end_time=time(3), weight=20),
+            # 与前一个时间段重叠时，以前一个为准
+            ScheduleTimeWeight(start_time=time(2), end_time=time(4), weight=30),
+        ],
+    )
+    assert target_weight.get(time(0, 59, 59)) == 10
+    assert target_weight.get(time(1)) == 20
+    assert target_weight.get(time(2, 30)) == 20
+    assert target_weight.get(time(3)) == 30
+    assert target_weight.get(time(4)) == 10
+    assert target_weight.get(time(23, 59, 59)) == 10
+
+
+async def test_weight_index_invalidate(init_scheduler, mocker: MockerFixture):
+    from nonebot_plugin_saa import TargetQQGroup
+
+    from nonebot_bison.config import config
+    from nonebot_bison.config.db_config import WeightConfig
+    from nonebot_bison.scheduler.manager import init_scheduler
+    from nonebot_bison.scheduler.weight import weight_index
+    from nonebot_bison.types import Target as T_Target
+
+    await config.add_subscribe(TargetQQGroup(group_id=123), T_Target("t1"), "target1", "ncm-artist", [], [])
+    await init_scheduler()
+
+    refresh_spy = mocker.spy(weight_index, "refresh")
+    assert await weight_index.get_current_weight_val(["ncm-artist"]) == {"ncm-artist-t1": 10}
+    assert await weight_index.get_current_weight_val(["ncm-artist"]) == {"ncm-artist-t1": 10}
+    refresh_spy.assert_not_called()
+
+    await config.update_time_weight_config(T_Target("t1"), "ncm-artist", WeightConfig(default=20, time_config=[]))
+    assert await weight_index.get_current_weight_val(["ncm-artist"]) == {"ncm-artist-t1": 20}
+    refresh_spy.assert_called_once()
+
+
+async def test_weight_index_new_target(init_scheduler, mocker: MockerFixture):
+    from nonebot_plugin_saa import TargetQQGroup
+
+    from nonebot_bison.config import config
+    from nonebot_bison.scheduler.manager import init_scheduler
+    from nonebot_bison.scheduler.weight import weight_index
+    from nonebot_bison.types import Target as T_Target
+
+    await config.add_subscribe(TargetQQGroup(group_id=123), T_Target("t1"), "target1", "ncm-artist", [], [])
+    await init_scheduler()
+
+    async def refresh_in_hook(platform_name: str, target: T_Target):
+        # 模拟 hook 触发后调度器立刻刷新索引
+        await weight_index.refresh()
+
+    mocker.patch.object(config, "add_target_hook", [*config.add_target_hook, refresh_in_hook])
+    await config.add_subscribe(TargetQQGroup(group_id=123), T_Target("t2"), "target2", "ncm-artist", [], [])
+    assert await weight_index.get_current_weight_val(["ncm-artist"]) == {"ncm-artist-t1": 10, "ncm-artist-t2": 10}
+
+
+async def test_weight_index_invalidate_while_refreshing(init_scheduler, mocker: MockerFixture):
+    from nonebot_plugin_saa import TargetQQGroup
+
+    from nonebot_bison.config import config
+    from nonebot_bison.scheduler import weight
+    from nonebot_bison.scheduler.manager import init_scheduler
+    from nonebot_bison.types import Target as T_Target
+
+    await config.add_subscribe(TargetQQGroup(group_id=123), T_Target("t1"), "target1", "ncm-artist", [], [])
+    await init_scheduler()
+
+    target_weight = weight.TargetWeight
+
+    def invalidate_during_refresh(*args):
+        weight.weight_index.invalidate()
+        return target_weight(*args)
+
+    mocker.patch.object(weight, "TargetWeight", invalidate_during_refresh)
+    weight.weight_index.invalidate()
+    assert await weight.weight_index.get_current_weight_val(["ncm-artist"]) == {"ncm-artist-t1": 10}
+    # 读取期间失效，读到的结果不会被缓存
+    assert weight.weight_index._index is None
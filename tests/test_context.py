@@ -1,5 +1,6 @@
 import httpx
 from nonebug.app import App
+from pytest_mock import MockerFixture
 import respx
 
 
@@ -64,3 +65,25 @@ async def test_no_content_type_binary(app: App):
     # Should use base64 encoding for binary content
     assert "b64encoded" in records[0]
     assert "iVBORw0K" in records[0]  # Base64 of PNG header
+
+
+@respx.mock
+async def test_decode_json(app: App, mocker: MockerFixture):
+    from nonebot_bison.plugin_config import plugin_config
+    from nonebot_bison.utils import DefaultClientManager, ProcessContext, decode_json
+
+    example_route = respx.get("https://example.com/json")
+    example_route.mock(httpx.Response(200, json={"msg": "你好", "id": 2**70}))
+
+    ctx = ProcessContext(DefaultClientManager())
+    client = await ctx.get_client()
+    res = await client.get("https://example.com/json")
+
+    # 超出 64 位的整数 orjson 无法解析，回退到标准库
+    assert decode_json(res.content) == {"msg": "你好", "id": 2**70}
+    mocker.patch.object(plugin_config, "bison_fast_json", False)
+    assert decode_json(res.content) == {"msg": "你好", "id": 2**70}
+
+    records = ctx.gen_req_records()
+    assert len(records) == 1
+    assert '"msg":"你好"' in records[0]
@@ -0,0 +1,33 @@
+from nonebug.app import App
+
+
+def test_recent_id_set_evict_by_window(app: App):
+    from nonebot_bison.utils import RecentIdSet
+
+    ids = RecentIdSet(max_size=10)
+    ids.add(1, 1000)
+    ids.add(2, 5000)
+    ids.add(3, None)
+
+    ids.evict(window=2000, now=6000)
+    assert 1 not in ids
+    assert 2 in ids
+    # 没有发布时间的 id 不会按时间淘汰
+    assert 3 in ids
+
+    ids.evict(window=None, now=100000)
+    assert ids == {2, 3}
+
+
+def test_recent_id_set_evict_by_size(app: App):
+    from nonebot_bison.utils import RecentIdSet
+
+    ids = RecentIdSet(max_size=3)
+    for i in range(4):
+        ids.add(i)
+    # 重新出现的 id 会被刷新为最近出现
+    ids.add(0)
+    ids.evict(window=None)
+
+    assert ids == {2, 3, 0}
+    assert list(ids) == [2, 3, 0]
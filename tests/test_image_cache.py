@@ -0,0 +1,159 @@
+import asyncio
+from pathlib import Path
+
+from httpx import Response
+from nonebug.app import App
+import respx
+
+
+@respx.mock
+async def test_image_cache(app: App, tmp_path: Path):
+    from nonebot_bison.utils import http_client
+    from nonebot_bison.utils.image_cache import ImageCache
+
+    cache = ImageCache(max_memory_size=10, max_disk_size=1024, cache_dir=tmp_path / "images")
+    route_a = respx.get("https://example.com/a.jpg").mock(return_value=Response(200, content=b"image"))
+    route_b = respx.get("https://example.com/b.jpg").mock(return_value=Response(200, content=b"image"))
+
+    async with http_client() as client:
+        # 同时请求同一个 URL 只下载一次
+        res = await asyncio.gather(*(cache.get("https://example.com/a.jpg", client) for _ in range(3)))
+        assert res == [b"image"] * 3
+        assert route_a.call_count == 1
+
+        # 内容相同的图片在磁盘中只保存一份
+        assert await cache.get("https://example.com/b.jpg", client) == b"image"
+        assert route_b.call_count == 1
+        assert len(list((tmp_path / "images" / "objects").glob("*/*"))) == 1
+
+        # 内存缓存清空后从磁盘读取
+        cache.clear()
+        assert await cache.get("https://example.com/a.jpg", client) == b"image"
+        assert route_a.call_count == 1
+
+
+async def test_image_cache_memory_limit(app: App, tmp_path: Path):
+    from nonebot_bison.utils.image_cache import ImageCache
+
+    cache = ImageCache(max_memory_size=10, max_disk_size=0, cache_dir=tmp_path)
+    cache._put_memory("a", b"12345")
+    cache._put_memory("b", b"12345")
+    cache._put_memory("c", b"12345")
+    assert list(cache._memory) == ["b", "c"]
+    assert cache._memory_size == 10
+
+
+@respx.mock
+async def test_image_cache_spool(app: App, tmp_path: Path):
+    from nonebot_bison.utils import http_client
+    from nonebot_bison.utils.image_cache import ImageCache
+
+    cache = ImageCache(max_memory_size=1024, max_disk_size=1024, spool_threshold=8, cache_dir=tmp_path)
+    respx.get("https://example.com/large.jpg").mock(return_value=Response(200, content=b"large image"))
+    respx.get("https://example.com/small.jpg").mock(return_value=Response(200, content=b"small"))
+
+    async with http_client() as client:
+        # 超过阈值的图片写入磁盘，返回文件路径
+        res = await cache.get_file("https://example.com/large.jpg", client)
+        assert isinstance(res, Path)
+        assert res.parent.parent == tmp_path / "objects"
+        assert res.read_bytes() == b"large image"
+        assert not list((tmp_path / "tmp").iterdir())
+        assert await cache.get("https://example.com/large.jpg", client) == b"large image"
+
+        assert await cache.get_file("https://example.com/small.jpg", client) == b"small"
+
+
+async def test_image_cache_disk_limit(app: App, tmp_path: Path, mocker):
+    from nonebot_bison.utils.image_cache import ImageCache, _hash
+
+    cache = ImageCache(max_memory_size=0, max_disk_size=10, cache_dir=tmp_path)
+    scan_disk = mocker.spy(cache, "_scan_disk")
+    path_a = cache._object_path(_hash(b"aaaaaa"))
+    path_b = cache._object_path(_hash(b"bbbbbb"))
+    path_c = cache._object_path(_hash(b"cccccc"))
+
+    cache._write_disk("a", b"aaaaaa")
+    # 被占用的文件即使超过上限也不会被清理
+    cache.pin(path_a)
+    cache._write_disk("b", b"bbbbbb")
+    assert path_a.exists()
+    assert path_b.exists()
+    assert cache._disk_size == 12
+
+    cache.unpin(path_a)
+    cache._write_disk("c", b"cccccc")
+    assert not path_a.exists()
+    assert not path_b.exists()
+    assert path_c.exists()
+    assert cache._disk_size == 6
+    # 总大小只在第一次写入时扫描
+    assert scan_disk.call_count == 1
+
+    # 重新启动时从磁盘读取已有的总大小
+    cache = ImageCache(max_memory_size=0, max_disk_size=10, cache_dir=tmp_path)
+    cache._write_disk("a", b"aaaaaa")
+    assert not path_c.exists()
+    assert cache._disk_size == 6
+
+
+@respx.mock
+async def test_image_cache_keep_handed_out(app: App, tmp_path: Path):
+    from nonebot_bison.utils import http_client
+    from nonebot_bison.utils.image_cache import ImageCache
+
+    cache = ImageCache(max_memory_size=1024, max_disk_size=12, spool_threshold=8, cache_dir=tmp_path)
+    respx.get("https://example.com/a.jpg").mock(return_value=Response(200, content=b"large image a"))
+    respx.get("https://example.com/b.jpg").mock(return_value=Response(200, content=b"large image b"))
+
+    async with http_client() as client:
+        path_a = await cache.get_file("https://example.com/a.jpg", client)
+        path_b = await cache.get_file("https://example.com/b.jpg", client)
+    # 刚返回给调用方的文件还可能被使用，暂不清理
+    assert isinstance(path_a, Path)
+    assert isinstance(path_b, Path)
+    assert path_a.read_bytes() == b"large image a"
+    assert path_b.read_bytes() == b"large image b"
+
+
+@respx.mock
+async def test_image_cache_initiator_closed(app: App, tmp_path: Path, mocker):
+    import asyncio
+
+    from nonebot_bison.utils import http_client
+    from nonebot_bison.utils import image_cache as image_cache_module
+    from nonebot_bison.utils.image_cache import ImageCache
+
+    cache = ImageCache(max_memory_size=1024, max_disk_size=0, cache_dir=tmp_path)
+    route = respx.get("https://example.com/a.jpg").mock(return_value=Response(200, content=b"image"))
+    semaphore = asyncio.Semaphore(1)
+    mocker.patch.object(image_cache_module, "_get_host_semaphore", return_value=semaphore)
+
+    await semaphore.acquire()
+    async with http_client(headers={"referer": "https://example.com"}) as client:
+        first = asyncio.create_task(cache.get("https://example.com/a.jpg", client))
+        await asyncio.sleep(0)
+    # 发起下载的 client 已经关闭，其他等待者仍能拿到结果
+    async with http_client() as other_client:
+        second = asyncio.create_task(cache.get("https://example.com/a.jpg", other_client))
+        await asyncio.sleep(0)
+        semaphore.release()
+        assert await asyncio.gather(first, second) == [b"image", b"image"]
+    assert route.call_count == 1
+    assert route.calls[0].request.headers["referer"] == "https://example.com"
+
+
+@respx.mock
+async def test_image_cache_object_removed(app: App, tmp_path: Path, mocker):
+    from nonebot_bison.utils import http_client
+    from nonebot_bison.utils.image_cache import ImageCache
+
+    cache = ImageCache(max_memory_size=1024, max_disk_size=1024, cache_dir=tmp_path)
+    route = respx.get("https://example.com/a.jpg").mock(return_value=Response(200, content=b"image"))
+    async with http_client() as client:
+        assert await cache.get("https://example.com/a.jpg", client) == b"image"
+        cache.clear()
+        # 读取时文件已被其他线程中的清理删除，重新下载
+        mocker.patch.object(Path, "read_bytes", side_effect=FileNotFoundError)
+        assert await cache.get("https://example.com/a.jpg", client) == b"image"
+    assert route.call_count == 2
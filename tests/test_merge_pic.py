@@ -3,6 +3,7 @@ import typing
 from flaky import flaky
 from nonebug.app import App
 import pytest
+import respx
 
 if typing.TYPE_CHECKING:
     import sys
@@ -114,3 +115,29 @@ async def test_3_merge_only(app: App, downloaded_resource: list[bytes]):
 
     pics = await pic_merge(list(downloaded_resource[0:3]), http_client())
     assert len(pics) == 1
+
+
+@respx.mock
+async def test_merge_from_url(app: App):
+    from io import BytesIO
+
+    from httpx import Response
+    from PIL import Image
+
+    from nonebot_bison.utils import http_client, pic_merge
+
+    def _square_image(color: str) -> bytes:
+        image_io = BytesIO()
+        Image.new("RGB", (100, 100), color).save(image_io, "JPEG")
+        return image_io.getvalue()
+
+    urls = [f"https://img{i % 2}.example.com/{i}.jpg" for i in range(7)]
+    for url in urls:
+        respx.get(url).mock(return_value=Response(200, content=_square_image("red")))
+
+    pics = await pic_merge(list(urls), http_client())
+    # 前 6 张合并为一张，剩下的一张不完整的行保持原样
+    assert len(pics) == 2
+    assert isinstance(pics[0], bytes)
+    assert Image.open(BytesIO(pics[0])).size == (300, 200)
+    assert pics[1] == urls[6]
@@ -0,0 +1,108 @@
+import asyncio
+
+from nonebug.app import App
+from pytest_mock import MockerFixture
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.pages: list["FakePage"] = []
+
+    def is_connected(self):
+        return True
+
+    async def new_page(self, **kwargs):
+        page = FakePage(self, kwargs)
+        self.pages.append(page)
+        return page
+
+
+class FakeContext:
+    def __init__(self, page: "FakePage"):
+        self.page = page
+        self.browser = page.browser
+
+    async def close(self):
+        self.page.closed = True
+
+
+class FakePage:
+    def __init__(self, browser: FakeBrowser, kwargs: dict):
+        self.browser = browser
+        self.kwargs = kwargs
+        self.closed = False
+        self.context = FakeContext(self)
+        self.viewport = None
+
+    def is_closed(self):
+        return self.closed
+
+    async def evaluate(self, _):
+        return 1
+
+    async def set_viewport_size(self, viewport):
+        self.viewport = viewport
+
+
+async def test_page_pool(app: App, mocker: MockerFixture):
+    from nonebot_bison.utils.page_pool import PagePool, record_page_wait
+
+    browser = FakeBrowser()
+    mocker.patch("nonebot_plugin_htmlrender.browser.get_browser", return_value=browser)
+    pool = PagePool(size=2, max_uses=3)
+
+    async with pool.page(viewport={"width": 500, "height": 10}) as page:
+        assert page.viewport == {"width": 500, "height": 10}
+    # 参数相同时复用页面
+    async with pool.page() as page2:
+        assert page2 is page
+        assert page2.viewport == {"width": 1280, "height": 720}
+    # device_scale_factor 不同的页面不能复用
+    async with pool.page(device_scale_factor=1) as page3:
+        assert page3 is not page
+    assert len(browser.pages) == 2
+
+    # 超过 size 时关闭最久未使用的空闲页面
+    async with pool.page(base_url="file:///") as page4:
+        assert page.closed
+    assert len(browser.pages) == 3
+
+    # 出错的页面不再复用
+    try:
+        async with pool.page(device_scale_factor=1) as page5:
+            assert page5 is page3
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    assert page3.closed
+
+    # 使用 max_uses 次后重新创建
+    for _ in range(2):
+        async with pool.page(base_url="file:///") as page6:
+            assert page6 is page4
+    assert page4.closed
+
+    # 同时借出的页面数量不超过 size，超出时排队等待
+    hold = asyncio.Event()
+    borrowed = []
+
+    async def borrow():
+        with record_page_wait() as waits:
+            async with pool.page() as page:
+                borrowed.append(page)
+                await hold.wait()
+        return waits
+
+    tasks = [asyncio.create_task(borrow()) for _ in range(3)]
+    for _ in range(10):
+        await asyncio.sleep(0)
+    assert len(borrowed) == 2
+    assert pool._semaphore.locked()
+    assert not any(task.done() for task in tasks)
+    hold.set()
+    waits = await asyncio.gather(*tasks)
+    # 排队的借用者拿到的是归还的页面，且每次借用都记录了一次等待
+    assert borrowed[2] in borrowed[:2]
+    assert [len(w) for w in waits] == [1, 1, 1]
+    await pool.close()
+    assert all(page.closed for page in browser.pages)
@@ -2,6 +2,7 @@ import importlib
 
 from nonebug import App
 from pytest_mock import MockerFixture
+import respx
 
 
 async def test_without_proxy(app: App):
@@ -25,3 +26,50 @@ async def test_with_proxy(app: App, mocker: MockerFixture):
 
     c = http_client()
     assert c._mounts
+
+
+async def test_shared_transport(app: App):
+    from httpx import URL
+
+    from nonebot_bison.utils.http import get_shared_transport, http_client
+
+    url = URL("http://example.com")
+    c1 = http_client(pool="test")
+    c2 = http_client(pool="test")
+    assert c1._transport_for_url(url) is c2._transport_for_url(url) is get_shared_transport("test")
+    assert http_client(pool="other")._transport_for_url(url) is not get_shared_transport("test")
+
+    await c1.aclose()
+    assert c1.is_closed
+    # 关闭 client 不影响共享连接池
+    assert http_client(pool="test")._transport_for_url(url) is get_shared_transport("test")
+
+
+async def test_transport_args(app: App):
+    from httpx import URL
+
+    from nonebot_bison.utils.http import get_shared_transport, http_client
+
+    url = URL("https://example.com")
+    # 传输层参数无法应用到共享连接池，使用独立的传输层
+    c = http_client(pool="test", verify=False)
+    assert c._transport_for_url(url) is not get_shared_transport("test")
+    assert http_client(pool="test", http2=True)._transport_for_url(url) is not get_shared_transport("test")
+    await c.aclose()
+
+
+@respx.mock
+async def test_pooled_transport_after_close(app: App):
+    from httpx import AsyncClient, Response
+
+    from nonebot_bison.utils.http import PooledTransport, close_shared_transports, get_shared_transport
+
+    respx.get("https://example.com/").mock(return_value=Response(200))
+    client = AsyncClient(transport=PooledTransport("test"))
+    assert (await client.get("https://example.com/")).status_code == 200
+    closed = get_shared_transport("test")
+
+    # 关闭共享连接池后，长期持有的传输层使用新建的连接池
+    await close_shared_transports()
+    assert (await client.get("https://example.com/")).status_code == 200
+    assert get_shared_transport("test") is not closed
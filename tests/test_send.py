@@ -1,4 +1,5 @@
 import asyncio
+from pathlib import Path
 
 from nonebug import App
 from nonebug_saa import should_send_saa
@@ -6,6 +7,20 @@ import pytest
 from pytest_mock.plugin import MockerFixture
 
 
+@pytest.fixture(autouse=True)
+def _select_fake_bot(app: App, mocker: MockerFixture):
+    # nonebug_saa 只替换了 saa 发送时选择 bot 的函数，发送队列按 bot 限速时也需要选到测试中的 bot
+    from nonebot_plugin_saa import abstract_factories
+
+    from nonebot_bison import send
+
+    mocker.patch.object(send, "get_bot", lambda target: abstract_factories.get_bot(target))
+    # 令牌桶中的锁与事件循环绑定，每个测试使用新的令牌桶
+    mocker.patch.dict(send._buckets, clear=True)
+    mocker.patch.object(send, "_PAYLOADS", {})
+    mocker.patch.object(send, "_restored_msgs", [])
+
+
 @pytest.mark.asyncio
 async def test_send_no_queue(app: App, mocker: MockerFixture):
     from nonebot.adapters.onebot.v11.bot import Bot
@@ -130,3 +145,170 @@ async def test_send_merge2_no_queue(app: App, mocker: MockerFixture):
         ]
         should_send_saa(ctx, AggregatedMessageFactory(message), bot, target=target)
         await send_msgs(target, message)
+
+
+async def test_broadcast_no_queue(app: App, mocker: MockerFixture):
+    from nonebot.adapters.onebot.v11.bot import Bot
+    from nonebot_plugin_saa import AggregatedMessageFactory, Image, MessageFactory, TargetQQGroup, Text
+    from nonebot_plugin_saa.auto_select_bot import refresh_bots
+
+    from nonebot_bison import send
+    from nonebot_bison.plugin_config import plugin_config
+
+    mocker.patch.object(plugin_config, "bison_use_pic_merge", 2)
+    mocker.patch.object(plugin_config, "bison_use_queue", False)
+    dispatch = mocker.spy(send, "_send_msgs_dispatch")
+
+    async with app.test_api() as ctx:
+        bot = ctx.create_bot(base=Bot, self_id="8888")
+        await refresh_bots()
+        targets = [TargetQQGroup(group_id=633), TargetQQGroup(group_id=634)]
+
+        message = [
+            MessageFactory(Text("test msg")),
+            MessageFactory(Image("https://picsum.photos/200/300")),
+        ]
+        for target in targets:
+            should_send_saa(ctx, AggregatedMessageFactory(message), bot, target=target)
+        await send.broadcast_msgs(targets, message)
+        assert ctx.wait_list.empty()
+    # 一组发送对象只合并、分发一次
+    dispatch.assert_awaited_once()
+    assert dispatch.await_args.args[0] == targets
+
+
+@pytest.mark.asyncio
+async def test_send_queue_parallel(app: App, mocker: MockerFixture):
+    import nonebot
+    from nonebot.adapters.onebot.v11.bot import Bot
+    from nonebot_plugin_saa import MessageFactory, TargetQQGroup
+    from nonebot_plugin_saa.auto_select_bot import refresh_bots
+
+    from nonebot_bison.plugin_config import plugin_config
+    from nonebot_bison.send import MESSGE_SEND_INTERVAL, send_msgs
+
+    mocker.patch.object(plugin_config, "bison_use_queue", True)
+    async with app.test_api() as ctx:
+        new_bot = ctx.create_bot(base=Bot)
+        await refresh_bots()
+        mocker.patch.object(nonebot, "get_bot", return_value=new_bot)
+
+        target1 = TargetQQGroup(group_id=1233)
+        target2 = TargetQQGroup(group_id=1234)
+        should_send_saa(ctx, MessageFactory("msg1"), new_bot, target=target1)
+        should_send_saa(ctx, MessageFactory("msg2"), new_bot, target=target2)
+
+        await send_msgs(target1, [MessageFactory("msg1")])
+        await send_msgs(target2, [MessageFactory("msg2")])
+        # 不同发送对象的队列互不阻塞
+        await asyncio.sleep(MESSGE_SEND_INTERVAL / 2)
+        assert ctx.wait_list.empty()
+
+
+@pytest.mark.usefixtures("_clear_db")
+async def test_send_queue_persist(app: App, mocker: MockerFixture, tmp_path: Path):
+    from nonebot_plugin_saa import AggregatedMessageFactory, Image, MessageFactory, TargetQQGroup, Text
+
+    from nonebot_bison import send
+    from nonebot_bison.config import config
+    from nonebot_bison.plugin_config import plugin_config
+    from nonebot_bison.utils.image_cache import _hash, image_cache
+
+    mocker.patch.object(plugin_config, "bison_use_queue", True)
+    mocker.patch.object(plugin_config, "bison_resend_times", 1)
+    mocker.patch.object(send, "PENDING_LOAD_PAGE_SIZE", 1)
+    # 只检查入队，不实际发送
+    mocker.patch.object(send, "do_send_msgs", mocker.AsyncMock())
+    save = mocker.spy(config, "save_pending_messages")
+
+    image_path = tmp_path / "image.png"
+    image_path.write_bytes(b"\x89PNG spooled")
+    targets = [TargetQQGroup(group_id=4321), TargetQQGroup(group_id=4322)]
+    msg = MessageFactory([Text("test"), Image("https://example.com/a.jpg"), Image(b"\x89PNG"), Image(image_path)])
+    aggregated = AggregatedMessageFactory([MessageFactory("a"), MessageFactory("b")])
+    try:
+        await send.broadcast_msgs(targets, [msg])
+        await send._send_msgs_dispatch(targets, aggregated)
+        # 入队时不写数据库
+        save.assert_not_called()
+        payloads = [payload for payload, _ in send.QUEUES[targets[0]]]
+        assert [payload for payload, _ in send.QUEUES[targets[1]]] == payloads
+        await send.flush_pending_msgs()
+        save.assert_awaited_once()
+    finally:
+        for target in targets:
+            send.QUEUES.pop(target)
+
+    # 同一条消息只保存一条记录，图片保存为图片缓存中的文件
+    pending = await config.get_pending_messages()
+    assert [pending_id for pending_id, *_ in pending] == [payload.pending_id for payload in payloads]
+    assert [(set(users), retry) for _, users, _, retry in pending] == [(set(targets), 1)] * 2
+    assert "base64" not in str(pending[0][2])
+    assert [send.load_sendable(data) for _, _, data, _ in pending] == [
+        MessageFactory(
+            [
+                Text("test"),
+                Image("https://example.com/a.jpg"),
+                Image(image_cache._object_path(_hash(b"\x89PNG"))),
+                Image(image_cache._object_path(_hash(b"\x89PNG spooled"))),
+            ]
+        ),
+        aggregated,
+    ]
+
+    # 部分发送对象发出后只更新剩余的发送对象
+    payloads[0].finish(targets[0])
+    await send.flush_pending_msgs()
+    assert (await config.get_pending_messages())[0][1] == [targets[1]]
+
+    # 重启后分批读取，恢复到队列
+    send._PAYLOADS.clear()
+    await send.load_pending_msgs()
+    send.restore_pending_msgs()
+    try:
+        assert len(send.QUEUES[targets[0]]) == 1
+        assert len(send.QUEUES[targets[1]]) == 2
+        restored = [payload for payload, _ in send.QUEUES[targets[1]]]
+        assert [payload.pending_id for payload in restored] == [payload.pending_id for payload in payloads]
+    finally:
+        for target in targets:
+            send.QUEUES.pop(target)
+
+    # 全部发出后删除记录
+    for payload in restored:
+        for target in list(payload.targets):
+            payload.finish(target)
+    await send.flush_pending_msgs()
+    assert await config.get_pending_messages() == []
+    assert not send._PAYLOADS
+
+
+@pytest.mark.usefixtures("_clear_db")
+async def test_send_queue_forget_sent(app: App, mocker: MockerFixture):
+    import nonebot
+    from nonebot.adapters.onebot.v11.bot import Bot
+    from nonebot_plugin_saa import MessageFactory, TargetQQGroup
+    from nonebot_plugin_saa.auto_select_bot import refresh_bots
+
+    from nonebot_bison import send
+    from nonebot_bison.config import config
+    from nonebot_bison.plugin_config import plugin_config
+    from nonebot_bison.send import MESSGE_SEND_INTERVAL, send_msgs
+
+    mocker.patch.object(plugin_config, "bison_use_queue", True)
+    save = mocker.spy(config, "save_pending_messages")
+    async with app.test_api() as ctx:
+        new_bot = ctx.create_bot(base=Bot)
+        await refresh_bots()
+        mocker.patch.object(nonebot, "get_bot", return_value=new_bot)
+
+        target = TargetQQGroup(group_id=1235)
+        should_send_saa(ctx, MessageFactory("msg"), new_bot, target=target)
+        await send_msgs(target, [MessageFactory("msg")])
+        await asyncio.sleep(MESSGE_SEND_INTERVAL / 2)
+        assert ctx.wait_list.empty()
+        # 两次写入之间已经发出的消息不写入数据库
+        await send.flush_pending_msgs()
+        save.assert_not_called()
+        assert not send._PAYLOADS
+        await asyncio.sleep(MESSGE_SEND_INTERVAL)
@@ -325,3 +325,21 @@ async def test_ht2i_theme(app: App, mock_post: "Post", MERGEABLE_PNG_DATA, SIMPL
 
     assert len(res2) == 4
     assert res2[1] == Text("详情: http://t.tt/1")
+
+
+async def test_theme_assets_cache(app: App, tmp_path):
+    from nonebot_bison.theme import theme_manager
+    from nonebot_bison.theme.render_helper import get_template_env
+
+    (tmp_path / "test.html.jinja").write_text("hello {{ name }}")
+    env = get_template_env(tmp_path)
+    # 同一个目录只创建一次环境，模板只编译一次
+    assert get_template_env(str(tmp_path)) is env
+    template = env.get_template("test.html.jinja")
+    assert env.get_template("test.html.jinja") is template
+    assert await template.render_async(name="bison") == "hello bison"
+
+    # 注册时已经读取 logo
+    ceobe_theme = theme_manager["ceobecanteen"]
+    assert ceobe_theme._logo_data["bison_logo"].startswith("data:image/png;base64,")
+    assert ceobe_theme._logo_data["ceobe_logo"].startswith("data:image/png;base64,")